@@ -0,0 +1,87 @@
+"""
+Admin slash commands: /poll post, /poll repost, /poll close and /poll status
+Discord drops an interaction that isn't answered within 3 seconds, so each
+command defers first and then starts its bulk work as a background job
+(jobs.py) on the bot's normal posting path. The deferred response is edited
+with the job's progress until it finishes. Commands run in their own tasks,
+so a long job never holds up other interactions or the scheduled run.
+/poll status also shows the live vote counts of the server's newest polls (vote_tally.py).
+"""
+
+import asyncio
+import time
+
+import discord
+from discord import app_commands
+
+from jobs import RUNNING
+
+PROGRESS_INTERVAL = 2.0  # seconds between two progress edits
+INTERACTION_TOKEN_SECONDS = 15 * 60  # Discord's lifetime of an interaction token (edits fail after it)
+STATUS_TALLIES = 10  # channels listed with their live votes, keeps /poll status under the message size limit
+
+
+def describe_tallies(tallies, limit=STATUS_TALLIES):
+    """Lines of /poll status for (channel, poll date, {answer: votes}) items"""
+    lines = []
+    for channel, poll_date, counts in tallies[:limit]:
+        votes = ', '.join(f"{answer}: {count}" for answer, count in counts.items())
+        lines.append(f"📊 #{channel.name} ({poll_date}): {votes}")
+    if len(tallies) > limit:
+        lines.append(f"… and {len(tallies) - limit} more channel(s)")
+    return lines
+
+
+async def follow_progress(interaction, job, interval=PROGRESS_INTERVAL, token_seconds=INTERACTION_TOKEN_SECONDS):
+    """Edit the deferred response with the job's progress until the job finishes or the token is about to expire"""
+    deadline = time.monotonic() + token_seconds - max(interval, 30)
+    while True:
+        finished = job.state != RUNNING
+        content = job.describe()
+        if not finished and time.monotonic() >= deadline:
+            content += "\nStill running, see /poll status"
+        try:
+            await interaction.edit_original_response(content=content)
+        except discord.errors.HTTPException:
+            pass  # Progress is best effort, the job goes on
+        if finished or time.monotonic() >= deadline:
+            return
+        await asyncio.wait([job.task], timeout=interval)
+
+
+def register_commands(bot):
+    """Add the /poll command group to bot.tree"""
+    group = app_commands.Group(name='poll', description='Manage the daily surveys of this server',
+                               guild_only=True, default_permissions=discord.Permissions(manage_guild=True))
+
+    async def run_job(interaction, kind, start):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        job = start(interaction.guild)
+        if job is None:
+            running = bot.jobs.running(interaction.guild.id, kind)
+            await interaction.edit_original_response(
+                content=f"A {kind} job is already running: {running.describe() if running else ''}")
+            return
+        await follow_progress(interaction, job)
+
+    @group.command(name='post', description="Post today's survey now in the channels that don't have it yet")
+    async def post(interaction: discord.Interaction):
+        await run_job(interaction, 'post', bot.start_post_job)
+
+    @group.command(name='repost', description="Post again in the channels where today's survey failed")
+    async def repost(interaction: discord.Interaction):
+        await run_job(interaction, 'repost', bot.start_repost_job)
+
+    @group.command(name='close', description="End today's surveys now and post their results")
+    async def close(interaction: discord.Interaction):
+        await run_job(interaction, 'close', bot.start_close_job)
+
+    @group.command(name='status', description='Show the survey jobs and live votes of this server')
+    async def status(interaction: discord.Interaction):
+        jobs = bot.jobs.for_guild(interaction.guild_id)[:5]
+        lines = [job.describe() for job in jobs] or ["No jobs yet."]
+        lines.extend(describe_tallies(bot.live_tallies(interaction.guild)))
+        await interaction.response.send_message('\n'.join(lines), ephemeral=True)
+
+    bot.tree.add_command(group)
+    return group
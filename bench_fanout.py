@@ -0,0 +1,148 @@
+"""
+Fan-out load benchmark: DailyPollBot against the local fake Discord API
+Posts one run of surveys to 10, 1k and 10k fake channels through the bot's real
+send path (rate limiter, discord.py HTTP client, ledger, outbox, breakers) and
+reports throughput, latency percentiles, 429s and memory per size.
+
+Usage: python bench_fanout.py [--sizes 10,1000,10000] [--latency SECONDS] [--global-rate N]
+                              [--concurrency N] [--json FILE]
+  --sizes        channel counts to run (default 10,1000,10000)
+  --latency      mean fake API latency per request (default 0.04)
+  --global-rate  requests per second allowed by the fake API and the bot (default 50, Discord's limit)
+  --concurrency  channels posted to at the same time (default POLL_CONCURRENCY)
+  --json         also write the results to FILE, to compare runs before deploying
+
+No token needed: the bot's state lives in a temporary directory.
+With the real 50 req/s limit 10k channels take about 200 seconds.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DEFAULT_SIZES = (10, 1000, 10000)
+FORBIDDEN_EVERY = 200  # every 200th channel answers 403, like a server that removed the bot's permissions
+
+
+def rss_mb():
+    """Current and peak RSS of this process in MB from /proc (None, None where unsupported)"""
+    values = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    values[line.split(':')[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def option(name, default, cast):
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+async def bench_size(bot, size, first_id, latency, global_rate, concurrency):
+    """One poll run over `size` fake channels; returns a result dict"""
+    import discord
+    import bot as bot_module
+    from fake_discord import FakeDiscord, fake_channels
+    from fanout import RateLimiter
+
+    forbidden = [first_id + offset for offset in range(FORBIDDEN_EVERY - 1, size, FORBIDDEN_EVERY)]
+    server = FakeDiscord(latency=latency, global_rate=global_rate, forbidden=forbidden, seed=size)
+    discord.http.Route.BASE = await server.start()
+    if not bot.http.token:
+        await bot.http.static_login('fake-token')  # opens the HTTP session (GET /users/@me)
+    bot.rate_limiter = RateLimiter(global_rate=global_rate)
+    bot.metrics.rate_limiter = bot.rate_limiter
+    bot_module.POLL_CONCURRENCY = concurrency
+    channels = fake_channels(bot._connection, size, first_id)
+    run_time = datetime.now(bot_module.TIMEZONE)
+    jobs = [(channel, bot_module.DEFAULT_SCHEDULE, run_time) for channel in channels]
+
+    rss_before, _ = rss_mb()
+    started = time.perf_counter()
+    try:
+        stats, _, _ = await bot.post_missing_polls(jobs)
+    finally:
+        await server.stop()
+    elapsed = time.perf_counter() - started
+    rss_after, peak = rss_mb()
+    return {
+        'channels': size,
+        'created': stats.created,
+        'failed': stats.failed,
+        'rate_limited': server.rate_limited,
+        'elapsed': elapsed,
+        'throughput': stats.created / elapsed if elapsed > 0 else 0.0,
+        'p50_latency': stats.percentile(50),
+        'p99_latency': stats.p99,
+        'rss_growth_mb': (rss_after - rss_before) if rss_before is not None else None,
+        'peak_rss_mb': peak,
+    }
+
+
+def print_results(results):
+    print(f"\n{'='*100}")
+    print(f"{'channels':>9} {'created':>8} {'failed':>7} {'429s':>6} {'time':>9} {'surveys/s':>10} "
+          f"{'p50':>8} {'p99':>8} {'RSS +MB':>8} {'peak MB':>8}")
+    for r in results:
+        growth = f"{r['rss_growth_mb']:.1f}" if r['rss_growth_mb'] is not None else 'n/a'
+        peak = f"{r['peak_rss_mb']:.1f}" if r['peak_rss_mb'] is not None else 'n/a'
+        print(f"{r['channels']:>9} {r['created']:>8} {r['failed']:>7} {r['rate_limited']:>6} "
+              f"{r['elapsed']:>8.2f}s {r['throughput']:>10.1f} {r['p50_latency']:>7.3f}s {r['p99_latency']:>7.3f}s "
+              f"{growth:>8} {peak:>8}")
+    print(f"{'='*100}\n")
+
+
+async def run(sizes, latency, global_rate, concurrency):
+    from bot import DailyPollBot
+    bot = DailyPollBot()
+    results = []
+    first_id = 10_000_000
+    try:
+        for size in sizes:
+            result = await bench_size(bot, size, first_id, latency, global_rate, concurrency)
+            results.append(result)
+            print(f"[INFO] {size} channel(s): {result['created']} created in {result['elapsed']:.2f}s")
+            first_id += size  # new channel IDs, so the ledger doesn't skip them
+    finally:
+        await bot.http.close()
+        bot.close_stores()
+    return results
+
+
+def main():
+    sizes = option('--sizes', DEFAULT_SIZES, lambda value: [int(size) for size in value.split(',')])
+    latency = option('--latency', 0.04, float)
+    global_rate = option('--global-rate', 50, int)
+    output = option('--json', None, str)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the benchmark's ledger, outbox and history away from the real ones
+        os.environ['POLL_STATE_DB'] = os.path.join(tmp, 'bench_state.db')
+        os.environ['HISTORY_DIR'] = os.path.join(tmp, 'poll_history')
+        os.environ['SCHEDULES_FILE'] = os.path.join(tmp, 'no_schedules.json')
+        os.environ.setdefault('DISCORD_BOT_TOKEN', 'fake-token')
+        from bot import POLL_CONCURRENCY
+        concurrency = option('--concurrency', POLL_CONCURRENCY, int)
+        print(f"[INFO] Fake API: {latency * 1000:.0f}ms mean latency, {global_rate} req/s global limit, "
+              f"1 in {FORBIDDEN_EVERY} channels forbidden; concurrency {concurrency}")
+        results = asyncio.run(run(sizes, latency, global_rate, concurrency))
+
+    print_results(results)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
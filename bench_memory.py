@@ -0,0 +1,184 @@
+"""
+Memory benchmark of the client profiles (bot.client_options)
+Loads N synthetic guilds into a DailyPollBot the way the gateway would (a
+GUILD_CREATE per guild, then the MESSAGE_CREATE events the profile's intents
+subscribe to) and reports the RSS per guild of the 'full' and 'lean' profiles.
+Each profile runs in its own process so the baselines don't mix.
+
+Usage: python bench_memory.py [--guilds N] [--channels N] [--messages N] [--json FILE]
+  --guilds    guilds loaded (default 2000)
+  --channels  text channels per guild (default 25)
+  --messages  chat messages received per guild (default 50), only with message intents
+  --json      also write the results to FILE
+
+No token or network needed.
+"""
+
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_fanout import option, rss_mb
+
+PROFILES = ('full', 'lean')
+ROLES_PER_GUILD = 15
+EMOJIS_PER_GUILD = 30
+VOICE_MEMBERS_PER_GUILD = 3
+BOT_USER_ID = 1
+
+
+def user_payload(user_id):
+    return {'id': str(user_id), 'username': f'user{user_id}', 'discriminator': '0',
+            'global_name': f'User {user_id}', 'avatar': None}
+
+
+def member_payload(user_id, role_ids):
+    return {'user': user_payload(user_id), 'roles': role_ids[:2], 'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False, 'mute': False, 'flags': 0}
+
+
+def guild_payload(guild_id, channels, intents):
+    """GUILD_CREATE as Discord sends it for these intents (members: the bot and voice members)"""
+    base = guild_id * 1000
+    role_ids = [str(base + i) for i in range(ROLES_PER_GUILD)]
+    text_channels = [
+        {'id': str(base + 100 + i), 'type': 0, 'name': 'votazioni' if i == 0 else f'chat-{i}',
+         'position': i, 'parent_id': None, 'topic': 'Daily surveys' if i == 0 else None, 'nsfw': False,
+         'permission_overwrites': [{'id': role_ids[1], 'type': 0, 'allow': '1024', 'deny': '0'}],
+         'rate_limit_per_user': 0, 'last_message_id': None, 'guild_id': str(guild_id)}
+        for i in range(channels)
+    ]
+    voice = {'id': str(base + 99), 'type': 2, 'name': 'voice', 'position': 0, 'parent_id': None,
+             'bitrate': 64000, 'user_limit': 0, 'permission_overwrites': [], 'guild_id': str(guild_id)}
+    members = [member_payload(BOT_USER_ID, role_ids)]
+    voice_states = []
+    if intents.voice_states:
+        for i in range(VOICE_MEMBERS_PER_GUILD):
+            member = member_payload(base + 500 + i, role_ids)
+            members.append(member)
+            voice_states.append({'user_id': member['user']['id'], 'channel_id': voice['id'], 'session_id': 's',
+                                 'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+                                 'self_video': False, 'suppress': False, 'request_to_speak_timestamp': None})
+    return {
+        'id': str(guild_id), 'name': f'guild-{guild_id}', 'owner_id': str(base + 500), 'unavailable': False,
+        'member_count': 500, 'large': False, 'features': [], 'premium_tier': 0, 'verification_level': 1,
+        'roles': [{'id': role_id, 'name': f'role-{i}', 'permissions': '1024', 'position': i, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False} for i, role_id in enumerate(role_ids)],
+        'emojis': ([{'id': str(base + 200 + i), 'name': f'emoji{i}', 'roles': [], 'require_colons': True,
+                     'managed': False, 'animated': False, 'available': True} for i in range(EMOJIS_PER_GUILD)]
+                   if intents.emojis_and_stickers else []),
+        'stickers': [], 'channels': text_channels + [voice], 'threads': [], 'members': members,
+        'voice_states': voice_states, 'presences': [], 'stage_instances': [], 'guild_scheduled_events': [],
+    }
+
+
+def message_payload(message_id, guild_id, channel_id, author_id, with_content):
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(guild_id),
+        'author': user_payload(author_id),
+        'member': {key: value for key, value in member_payload(author_id, []).items() if key != 'user'},
+        'content': f'Vote for {message_id % 24}:00 tonight!' if with_content else '',
+        'timestamp': '2025-01-01T12:00:00+00:00', 'edited_timestamp': None, 'tts': False,
+        'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [],
+        'pinned': False, 'type': 0, 'flags': 0,
+    }
+
+
+async def load_guilds(profile, guilds, channels, messages, **options):
+    """Load `guilds` fake guilds into a DailyPollBot; options go to DailyPollBot (e.g. fake_discord.state_paths)"""
+    import bot as bot_module
+    client = bot_module.DailyPollBot(profile=profile, **options)
+    state = client._connection
+    intents = state._intents
+    state.parse_ready({'user': user_payload(BOT_USER_ID) | {'bot': True}, 'guilds': [], 'session_id': 'bench',
+                       'resume_gateway_url': 'wss://localhost', 'shard': [0, 1], 'application': {'id': '1', 'flags': 0}})
+    state._ready_state = None  # READY handled: guilds are dispatched as they come
+    gc.collect()
+    rss_before, _ = rss_mb()
+
+    first_guild = 10_000
+    for guild_id in range(first_guild, first_guild + guilds):
+        state.parse_guild_create(guild_payload(guild_id, channels, intents))
+    client.channel_index.build(client.guilds)
+    await asyncio.sleep(0)
+    gc.collect()
+    rss_guilds, _ = rss_mb()
+
+    if intents.guild_messages:
+        message_id = 10 ** 17
+        for guild_id in range(first_guild, first_guild + guilds):
+            base = guild_id * 1000
+            for i in range(messages):
+                message_id += 1
+                state.parse_message_create(message_payload(
+                    message_id, guild_id, base + 100 + i % channels, base + 600 + i % 20, intents.message_content))
+    await asyncio.sleep(0)
+    gc.collect()
+    rss_after, _ = rss_mb()
+
+    result = {
+        'profile': profile,
+        'guilds': guilds,
+        'intents': intents.value,
+        'cached_messages': len(state._messages) if state._messages is not None else 0,
+        'cached_members': sum(len(guild._members) for guild in client.guilds),
+        'indexed_channels': len(client.channel_index),
+        'guild_rss_mb': rss_guilds - rss_before,
+        'total_rss_mb': rss_after - rss_before,
+        'kb_per_guild': (rss_after - rss_before) * 1024 / guilds,
+    }
+    client.close_stores()
+    return result
+
+
+def run_child():
+    """Benchmark one profile in this process and print the result as JSON"""
+    profile = option('--profile', 'lean', str)
+    result = asyncio.run(load_guilds(profile, option('--guilds', 2000, int), option('--channels', 25, int),
+                                     option('--messages', 50, int)))
+    print(json.dumps(result))
+    return 0
+
+
+def main():
+    if '--child' in sys.argv:
+        return run_child()
+    if rss_mb()[0] is None:
+        print("[ERROR] RSS not available on this platform (needs /proc)")
+        return 1
+    args = [arg for name in ('--guilds', '--channels', '--messages') if name in sys.argv
+            for arg in (name, sys.argv[sys.argv.index(name) + 1])]
+    output = option('--json', None, str)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, POLL_STATE_DB=os.path.join(tmp, 'bench_state.db'),
+                   HISTORY_DIR=os.path.join(tmp, 'poll_history'), SCHEDULES_FILE=os.path.join(tmp, 'none.json'),
+                   LAG_THRESHOLD_SECONDS='0')
+        for profile in PROFILES:
+            child = subprocess.run([sys.executable, __file__, '--child', '--profile', profile] + args,
+                                   capture_output=True, text=True, env=env, check=True)
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'='*84}")
+    print(f"{'profile':>8} {'guilds':>7} {'messages':>9} {'members':>8} {'guilds MB':>10} {'total MB':>9} "
+          f"{'KB/guild':>9}")
+    for r in results:
+        print(f"{r['profile']:>8} {r['guilds']:>7} {r['cached_messages']:>9} {r['cached_members']:>8} "
+              f"{r['guild_rss_mb']:>10.1f} {r['total_rss_mb']:>9.1f} {r['kb_per_guild']:>9.1f}")
+    full, lean = results
+    if lean['kb_per_guild'] > 0:
+        print(f"\n   lean uses {full['kb_per_guild'] / lean['kb_per_guild']:.1f}x less memory per guild")
+    print(f"{'='*84}\n")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
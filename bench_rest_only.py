@@ -0,0 +1,90 @@
+"""
+Startup time and peak RSS: REST-only mode vs the long-running gateway client
+Runs `python bot.py --rest-only --dry-run` to completion, then starts `python bot.py`
+until it reports being logged in, and compares both.
+
+Usage: python bench_rest_only.py [--settle SECONDS] [--post]
+  --settle  seconds the gateway client keeps running after login before its RSS is read (default 15)
+  --post    really post the surveys in REST-only mode (default is a dry run)
+
+Needs DISCORD_BOT_TOKEN in .env, like the bot itself. Peak RSS is read from /proc (Linux only).
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+BOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+
+def read_peak_rss_mb(pid):
+    """VmHWM (peak RSS) of a running process from /proc, in MB"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def bench_rest_only(post):
+    """Run REST-only mode to completion; returns (seconds, peak RSS in MB)"""
+    args = [sys.executable, BOT, '--rest-only']
+    if not post:
+        args.append('--dry-run')
+    started = time.perf_counter()
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    peak = None
+    for line in process.stdout:
+        if 'Peak RSS:' in line:
+            peak = float(line.split('Peak RSS:')[1].split()[0])
+    process.wait()
+    return time.perf_counter() - started, peak
+
+
+def bench_gateway_client(settle):
+    """Start the gateway client; returns (seconds until logged in, peak RSS in MB after `settle` seconds)"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-u', BOT], stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+    connected = None
+    try:
+        for line in process.stdout:
+            if 'Bot logged in' in line:
+                connected = time.perf_counter() - started
+                break
+        # Let the guild cache fill before reading memory
+        time.sleep(settle)
+        return connected, read_peak_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    settle = 15.0
+    if '--settle' in sys.argv:
+        settle = float(sys.argv[sys.argv.index('--settle') + 1])
+    post = '--post' in sys.argv
+
+    print("=" * 60)
+    print("Benchmark: REST-only mode vs gateway client")
+    print("=" * 60)
+
+    rest_seconds, rest_rss = bench_rest_only(post)
+    print(f"REST-only:      finished in {rest_seconds:.2f}s, peak RSS {rest_rss or 0:.1f} MB")
+
+    client_seconds, client_rss = bench_gateway_client(settle)
+    if client_seconds is None:
+        print("[ERROR] Gateway client never logged in (check the token)")
+        return 1
+    print(f"Gateway client: logged in after {client_seconds:.2f}s, "
+          f"peak RSS {client_rss or 0:.1f} MB after {settle:.0f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Startup benchmark: time from process start to each startup phase of DailyPollBot
+Each run is a fresh process: it imports bot.py, logs in to the local fake
+Discord API and replays the gateway (READY, then one GUILD_CREATE per guild).
+It runs twice on the same state: 'cold' without a warm-start snapshot, then
+'warm' with the snapshot the first run left behind.
+
+Phases (seconds since the process started, see PollMetrics.startup_phase):
+  imported         bot.py and its dependencies loaded
+  constructed      DailyPollBot() done (stores opened, config loaded)
+  logged_in        login done (setup_hook)
+  scheduler_armed  the post timer is running
+  connected        on_ready: every guild received
+  reported         the per-server report was logged
+
+Usage: python bench_startup.py [--guilds N] [--channels N] [--budget SECONDS] [--json FILE]
+  --guilds    guilds sent by the fake gateway (default 2000)
+  --channels  text channels per guild (default 25)
+  --budget    exit with 1 if the cold run arms the scheduler later than this (default: no check)
+  --json      also write the results to FILE
+
+No token or network needed.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_fanout import option
+from bench_memory import BOT_USER_ID, guild_payload, user_payload
+
+MODES = ('cold', 'warm')
+PHASES = ('imported', 'constructed', 'logged_in', 'scheduler_armed', 'connected', 'reported')
+FIRST_GUILD = 10_000
+
+
+async def start_bot(guilds, channels, **options):
+    """
+    Start a DailyPollBot against the fake API and gateway; returns its startup phases.
+    options go to DailyPollBot (e.g. fake_discord.state_paths).
+    """
+    import discord
+    import bot as bot_module
+    from metrics import PROCESS_START
+    imported = time.perf_counter() - PROCESS_START
+    from fake_discord import FakeDiscord
+
+    server = FakeDiscord(latency=0.005, global_rate=1000)
+    original_base = discord.http.Route.BASE
+    discord.http.Route.BASE = await server.start()
+    client = bot_module.DailyPollBot(**options)
+    try:
+        await client.login('fake-token')
+        state = client._connection
+        state.parse_ready({'user': user_payload(BOT_USER_ID) | {'bot': True}, 'guilds': [], 'session_id': 'bench',
+                           'resume_gateway_url': 'wss://localhost', 'shard': [0, 1],
+                           'application': {'id': '1', 'flags': 0}})
+        state._ready_state = None  # READY handled: guilds are dispatched as they come
+        for guild_id in range(FIRST_GUILD, FIRST_GUILD + guilds):
+            state.parse_guild_create(guild_payload(guild_id, channels, state._intents))
+            if guild_id % 100 == 0:
+                await asyncio.sleep(0)  # let guild_available events run, as between gateway frames
+        await client.on_ready()
+        await client._report_task
+        return {'imported': imported, **client.metrics.startup, 'channels': len(client.channel_index)}
+    finally:
+        await client.close()
+        await server.stop()
+        discord.http.Route.BASE = original_base
+
+
+def run_child():
+    """Benchmark one startup in this process and print the result as JSON"""
+    result = asyncio.run(start_bot(option('--guilds', 2000, int), option('--channels', 25, int)))
+    print(json.dumps(result))
+    return 0
+
+
+def main():
+    if '--child' in sys.argv:
+        return run_child()
+    args = [arg for name in ('--guilds', '--channels') if name in sys.argv
+            for arg in (name, sys.argv[sys.argv.index(name) + 1])]
+    budget = option('--budget', None, float)
+    output = option('--json', None, str)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, POLL_STATE_DB=os.path.join(tmp, 'bench_state.db'),
+                   HISTORY_DIR=os.path.join(tmp, 'poll_history'), SCHEDULES_FILE=os.path.join(tmp, 'none.json'),
+                   LAG_THRESHOLD_SECONDS='0', CATCH_UP_HOURS='0', SYNC_COMMANDS='0', METRICS_PORT='0',
+                   LOG_LEVEL='WARNING')
+        for mode in MODES:
+            child = subprocess.run([sys.executable, __file__, '--child'] + args,
+                                   capture_output=True, text=True, env=env, check=True)
+            results.append({'mode': mode, **json.loads(child.stdout.strip().splitlines()[-1])})
+
+    print(f"\n{'='*84}")
+    print(f"{'mode':>6} " + ' '.join(f"{phase:>15}" for phase in PHASES))
+    for r in results:
+        print(f"{r['mode']:>6} " + ' '.join(f"{r[phase]:>14.3f}s" if phase in r else f"{'-':>15}"
+                                           for phase in PHASES))
+    print(f"\n   {results[0]['channels']} channel(s); the warm run arms the scheduler "
+          f"{results[1]['connected'] - results[1]['scheduler_armed']:.3f}s before the last guild arrives")
+    print(f"{'='*84}\n")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {output}")
+    if budget is not None and results[0]['scheduler_armed'] > budget:
+        print(f"[ERROR] Scheduler armed after {results[0]['scheduler_armed']:.3f}s, budget {budget:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,31 @@
 import discord
-from discord.ext import tasks
+import aiohttp
 import asyncio
+import logging
 from datetime import datetime, time, timedelta
 import pytz
 import os
+import sys
+from discord import app_commands
 from dotenv import load_dotenv
+from admin_commands import register_commands
+from channel_index import ChannelIndex, ChannelMatcher, DEFAULT_CHANNEL_PATTERNS
+from circuit_breaker import CHANNEL, GUILD, OPEN, CircuitBreakers, is_channel_failure
+from guild_config import ConfigWatcher
+from fanout import RateLimiter, fan_out, poll_route_key, shard_rate, stagger_offset
+from lag_watchdog import LagWatchdog
+from jobs import JobTracker
+from harvester import VOTERS_PATH, ResultStore, format_summary, harvest
+from ledger import PollLedger
+from metrics import MetricsServer, PollMetrics
+from outbox import DEAD, RetryOutbox, is_permanent
+from poll_history import HistoryWriter, process_dir
+from poll_template import POLL_ENDPOINTS, created_message_id, route_exists
+from poll_types import DailyTemplates, time_poll
+from structured_log import CHANNEL_LOGGER_NAME, LOGGER_NAME, setup_logging
+from scheduler import DEFAULT_KEY, PollScheduler, Schedule, SystemClock, guild_key
+from vote_tally import DEFAULT_SNAPSHOT_INTERVAL, RETENTION_DAYS, VoteTally
+from warm_start import TargetSnapshot
 
 # Load environment variables
 load_dotenv()
@@ -14,194 +35,1042 @@ TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 TIMEZONE = pytz.timezone('Europe/Rome')  # GMT+1 (Italy)
 TIME_OPTIONS = [7, 9, 11, 13, 15, 17, 19, 21, 23]
 POLL_DURATION_HOURS = 24
+# Channel name patterns, comma-separated: substring:<text>, prefix:<text> or regex:<expression>
+CHANNEL_PATTERNS = os.getenv('CHANNEL_PATTERNS', DEFAULT_CHANNEL_PATTERNS)
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', '10'))  # Channels posted to at the same time
+POLL_STATE_DB = os.getenv('POLL_STATE_DB', 'poll_state.db')  # SQLite file with the posted-poll ledger
+CATCH_UP_HOURS = float(os.getenv('CATCH_UP_HOURS', '6'))  # After a restart, post missing polls up to this late
+OUTBOX_CONCURRENCY = 2  # Retries run beside the main fan-out, kept small on purpose
+# Spread each run over this many seconds after the post time (e.g. 300 = 00:00-00:05), 0 = all at once
+POSTING_WINDOW_SECONDS = float(os.getenv('POSTING_WINDOW_SECONDS', '0'))
+TALLY_SNAPSHOT_SECONDS = DEFAULT_SNAPSHOT_INTERVAL  # How often live vote counts are saved to POLL_STATE_DB
+HARVEST_CONCURRENCY = int(os.getenv('HARVEST_CONCURRENCY', '10'))  # Voter-list requests in flight when polls close
+HARVEST_GRACE_SECONDS = 30  # Let Discord finalize a poll before reading its results
+HARVEST_RETRY_SECONDS = 300  # Retry delay for polls whose results couldn't be fetched
+# Shortest wait of the harvest and outbox workers: a deadline a fraction of a microsecond ahead
+# (below the clock's resolution) would otherwise wake them before it, again and again
+MIN_WAKEUP_SECONDS = 0.001
+HISTORY_DIR = os.getenv('HISTORY_DIR', 'poll_history')  # Columnar results history, see history_analytics.py
+# lean: only the gateway intents and caches the bot uses; full: discord.py's defaults plus message content
+CLIENT_PROFILE = os.getenv('CLIENT_PROFILE', 'lean')
+# Log output: LOG_FORMAT json, text or auto (text on a terminal); LOG_SAMPLE_RATE keeps that
+# fraction of the per-channel success lines (warnings and errors are always kept)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'auto')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1'))
+# Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics, 0 = no endpoint (still recorded)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# Profile the event loop whenever it is blocked longer than this many seconds (0 = off)
+LAG_THRESHOLD_SECONDS = float(os.getenv('LAG_THRESHOLD_SECONDS', '0.5'))
+LAG_PROFILE_DIR = os.getenv('LAG_PROFILE_DIR', 'lag_profiles')  # See lag_watchdog.py to read them
+# Optional per-guild/per-channel post times, timezones, durations, time options and channel
+# patterns (see scheduler.load_schedules); reloaded while the bot runs when the file changes
+SCHEDULES_FILE = os.getenv('SCHEDULES_FILE', 'schedules.json')
+REPORT_BATCH = 500  # Servers listed in the startup report between two yields to the event loop
+# After a restart, post to the channels of the last run before the guild cache is loaded (see warm_start.py)
+WARM_START = os.getenv('WARM_START', '1') != '0'
+# Admin slash commands (/poll post, repost, close, status), see admin_commands.py
+SYNC_COMMANDS = os.getenv('SYNC_COMMANDS', '1') != '0'  # Publish the commands to Discord at login
+JOB_CHUNK_SIZE = 50  # Channels posted per run-lock hold by a command, so a scheduled run waits one chunk at most
+EXPIRE_PATH = '/channels/{channel_id}/polls/{message_id}/expire'
+# Everyone else: midnight in Italy, POLL_DURATION_HOURS long, TIME_OPTIONS
+DEFAULT_SCHEDULE = Schedule(DEFAULT_KEY, time(0, 0), TIMEZONE, POLL_DURATION_HOURS, tuple(TIME_OPTIONS))
 
-class DailyPollBot(discord.Client):
-    def __init__(self):
+# Handed to a background thread by structured_log.setup_logging(), never written from the event loop
+log = logging.getLogger(LOGGER_NAME)
+channel_log = logging.getLogger(CHANNEL_LOGGER_NAME)
+
+def poll_date_key(run_time):
+    """Ledger key of the local date a poll belongs to"""
+    return run_time.strftime('%Y-%m-%d')
+
+def end_of_poll_day(run_time):
+    """Timestamp of the next local midnight: retries of that day's poll stop there"""
+    tz = pytz.timezone(run_time.tzinfo.zone)
+    next_day = run_time.date() + timedelta(days=1)
+    return tz.localize(datetime.combine(next_day, time(0, 0))).timestamp()
+
+def build_poll_payload(date_str, duration_hours=POLL_DURATION_HOURS, time_options=None):
+    """
+    Build the daily survey payload according to Discord API v10.
+    Shared by the gateway client and the REST-only mode.
+    """
+    # Create time options as strings (clock times: 7, 9, 11, 13, 15, 17, 19, 21, 23 by default)
+    answers = [str(time_option) for time_option in (time_options or TIME_OPTIONS)]
+    return {
+        "question": {
+            "text": date_str  # Survey title = current date (as per client requirement)
+        },
+        "answers": [{"poll_media": {"text": answer}} for answer in answers],  # Multiple clock time options
+        "duration": duration_hours * 3600,  # Duration in seconds (24 hours by default)
+        "allow_multiselect": True  # Users can check multiple answers
+    }
+
+def client_options(profile=CLIENT_PROFILE):
+    """
+    discord.Client keyword arguments of a client profile.
+    lean: guilds (channel discovery and channel events) and guild poll events only,
+    no message or member cache and no member chunking, so a guild costs little more
+    than its channels. full: the default intents with message content and caches.
+    """
+    if profile == 'full':
         intents = discord.Intents.default()
         intents.message_content = True
         intents.guilds = True
-        super().__init__(intents=intents)
+        intents.polls = True  # Raw poll vote events for the live tallies
+        return {'intents': intents}
+    if profile != 'lean':
+        raise ValueError(f"Unknown CLIENT_PROFILE {profile!r}, expected 'lean' or 'full'")
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_polls = True  # Raw poll vote events for the live tallies
+    return {
+        'intents': intents,
+        'max_messages': None,
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+    }
+
+class DailyPollBot(discord.AutoShardedClient):
+    def __init__(self, shard_ids=None, shard_count=None, report_queue=None, clock=None, profile=None,
+                 state_db=None, history_dir=None, schedules_file=None):
+        """
+        With shard_ids/shard_count the bot only connects (and posts) for those shards,
+        see shard_launcher.py. Without them discord.py picks the recommended shard count.
+        report_queue receives a summary dict after every scheduled run.
+        clock provides the current time (virtual_clock.VirtualClock in simulations).
+        profile selects the intents and caches, CLIENT_PROFILE by default (see client_options).
+        state_db, history_dir and schedules_file default to POLL_STATE_DB, HISTORY_DIR and SCHEDULES_FILE.
+        """
+        state_db = state_db or POLL_STATE_DB
+        history_dir = history_dir or HISTORY_DIR
+        schedules_file = schedules_file or SCHEDULES_FILE
+        super().__init__(shard_ids=shard_ids, shard_count=shard_count, **client_options(profile or CLIENT_PROFILE))
+        self.report_queue = report_queue
+        self.clock = clock or SystemClock()
+        # Shared view of Discord's rate-limit buckets for the poll fan-out; the global
+        # limit is per token, so each shard process gets its share of it
+        self.rate_limiter = RateLimiter(shard_rate(shard_ids, shard_count))
+        # Timings and counters of the poll pipeline, see metrics.py
+        self.metrics = PollMetrics(self.rate_limiter)
+        self._metrics_server = None
+        self._lag_task = None
+        # Stack profiles of event-loop stalls, named after the run they happened in
+        self.watchdog = LagWatchdog(LAG_PROFILE_DIR, LAG_THRESHOLD_SECONDS)
+        # Guild -> votazioni channels, kept current by the channel/guild events below
+        # Post times and poll settings: the default plus SCHEDULES_FILE, reloaded when it changes
+        self.config = ConfigWatcher(schedules_file, DEFAULT_SCHEDULE)
+        self.schedules, guild_matchers = self.config.load()
+        self._config_task = None
+        self.channel_index = ChannelIndex(ChannelMatcher.from_string(CHANNEL_PATTERNS), guild_matchers)
+        # Snapshot of the index: a restart starts from the stand-in channels until the cache has the real ones
+        self.targets = TargetSnapshot(state_db, shard_ids, shard_count)
+        self._warm_channels = self.targets.restore(self._connection) if WARM_START else {}
+        for channel in self._warm_channels.values():
+            self.channel_index.add_channel(channel)
+        # (channel, date) pairs that already got their poll, survives restarts
+        self.ledger = PollLedger(state_db, shard_ids=shard_ids, shard_count=shard_count)
+        # Only one run (midnight or catch-up) posts at a time
+        self._run_lock = asyncio.Lock()
+        self._catch_up_task = None
+        # Failed posts waiting for a retry, drained by drain_outbox()
+        self.outbox = RetryOutbox(state_db, shard_ids=shard_ids, shard_count=shard_count)
+        self._outbox_wakeup = asyncio.Event()
+        self._outbox_task = None
+        # Channels/guilds that keep failing with 403/404 are skipped until re-probed
+        self.breakers = CircuitBreakers(state_db)
+        self._permanent_failures = set()
+        # Poll-creation route, resolved once at startup; payload encoded once per day
+        self.poll_endpoint = None
+        self._poll_templates = DailyTemplates()
+        # Post times: one heap-based timer for the default and every per-guild/channel schedule
+        self.scheduler = PollScheduler(self.clock)
+        self._scheduler_task = None
+        # Live vote counts of the bot's polls, from the raw poll vote events
+        self.tallies = VoteTally(state_db, [str(time_option) for time_option in TIME_OPTIONS])
+        self._tally_task = None
+        # Final results of closed polls, collected by harvest_polls()
+        self.results = ResultStore(state_db)
+        self.history = HistoryWriter(process_dir(history_dir, shard_ids if shard_count else None),
+                                     [str(time_option) for time_option in TIME_OPTIONS])
+        self._harvest_wakeup = asyncio.Event()
+        self._harvest_task = None
+        self._report_task = None
+        # message ID -> time a poll was ended early with /poll close (harvested from then on)
+        self._closed_early = {}
+        # Admin slash commands and the background jobs they start
+        self.jobs = JobTracker()
+        self.tree = app_commands.CommandTree(self)
+        register_commands(self)
+        self.metrics.startup_phase('constructed')
         # Don't start task here - will start in on_ready() when event loop is running
 
+    async def setup_hook(self):
+        """
+        After login, before the gateway connects: start from the warm-start snapshot if there
+        is one, then publish the /poll commands (global, Discord may take a while to show them)
+        from the process that owns shard 0
+        """
+        self.metrics.startup_phase('logged_in')
+        # Warm start: schedule, catch up and harvest while the gateway is still delivering guilds
+        if self._warm_channels:
+            log.info(f"[INFO] Warm start: {len(self.channel_index)} channel(s) in "
+                     f"{len(self.channel_index.guild_ids())} server(s) from the last snapshot",
+                     extra={'event': 'warm_start', 'channels': len(self.channel_index)})
+            await self.start_workers()
+        if SYNC_COMMANDS and self.owns_commands():
+            try:
+                await self.tree.sync()
+            except discord.errors.HTTPException as e:
+                log.error(f"[ERROR] Slash commands not synced: {e}", extra={'event': 'commands'})
+
+    def owns_commands(self):
+        """
+        True in the process that publishes the /poll commands: the only one, or with
+        shard_launcher.py the one running shard 0 (the commands are global, one sync is enough)
+        """
+        return self.shard_ids is None or 0 in self.shard_ids
+
     async def on_ready(self):
         """Called when bot successfully connects to Discord"""
-        print(f'\n{"="*60}')
-        print(f'✅ Bot logged in: {self.user}')
-        print(f'✅ Bot ID: {self.user.id}')
-        print(f'{"="*60}')
+        self.metrics.startup_phase('connected')
+        log.info(f'\n{"="*60}\n'
+                 f'✅ Bot logged in: {self.user}\n'
+                 f'✅ Bot ID: {self.user.id}\n'
+                 f'✅ Shards: {sorted(self.shards)} of {self.shard_count}\n'
+                 f'{"="*60}',
+                 extra={'event': 'ready', 'user_id': self.user.id, 'shard_ids': sorted(self.shards)})
+        
+        # Index the matching channels of every guild once (replaces the warm-start stand-ins)
+        self.channel_index.build(self.guilds)
+        self._warm_channels = {}
         
-        # Show connected servers
-        print(f'\n📋 Connected to {len(self.guilds)} server(s):')
-        for guild in self.guilds:
+        # Profile event-loop stalls (no-op once started)
+        self.watchdog.start()
+        
+        # Serve the metrics and watch the event-loop lag (once per process)
+        if METRICS_PORT and self._metrics_server is None:
+            self._metrics_server = MetricsServer(self.metrics, METRICS_HOST, METRICS_PORT)
+            try:
+                await self._metrics_server.start()
+                log.info(f"[INFO] Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics", extra={'event': 'metrics'})
+            except OSError as e:
+                log.error(f"[ERROR] Metrics endpoint not started: {e}", extra={'event': 'metrics'})
+            self._lag_task = asyncio.create_task(self.metrics.watch_loop_lag())
+        
+        await self.start_workers()
+        
+        # Report the connected servers once the scheduler runs
+        self._report_task = asyncio.create_task(self.report_servers())
+
+    async def report_servers(self):
+        """Log the votazioni channels found per server, yielding to the event loop every REPORT_BATCH servers"""
+        lines = [f'\n📋 Connected to {len(self.guilds)} server(s):']
+        for count, guild in enumerate(self.guilds, 1):
             votazioni_channels = self.find_votazioni_channels(guild)
-            print(f'   - {guild.name}: {len(votazioni_channels)} votazioni channel(s) found')
+            lines.append(f'   - {guild.name}: {len(votazioni_channels)} votazioni channel(s) found')
+            if count % REPORT_BATCH == 0:
+                await asyncio.sleep(0)
         
-        print(f'\n🤖 Bot Task: Create daily surveys at midnight (GMT+1, Italy timezone)')
-        print(f'   - Survey title: Current date (DD/MM/YYYY)')
-        print(f'   - Time options: {TIME_OPTIONS}')
-        print(f'   - Multi-select: Enabled')
-        print(f'   - Duration: {POLL_DURATION_HOURS} hours')
-        print(f'   - Uses: Discord native survey/poll feature')
-        print(f'\n{"="*60}\n')
+        lines.append(f'\n🤖 Bot Task: Create daily surveys at midnight (GMT+1, Italy timezone)')
+        lines.append(f'   - Survey title: Current date (DD/MM/YYYY)')
+        lines.append(f'   - Time options: {TIME_OPTIONS}')
+        lines.append(f'   - Multi-select: Enabled')
+        lines.append(f'   - Duration: {POLL_DURATION_HOURS} hours')
+        lines.append(f'   - Uses: Discord native survey/poll feature')
+        lines.append(f'   - Live vote tallies: {len(self.tallies)} poll(s) tracked')
+        if len(self.schedules.by_key) > 1:
+            lines.append(f'   - Custom schedules: {len(self.schedules.by_key) - 1} server(s)/channel(s)')
+        lines.append(f'\n{"="*60}\n')
+        log.info('\n'.join(lines), extra={'event': 'servers', 'guilds': len(self.guilds),
+                                          'channels': len(self.channel_index)})
+        self.metrics.startup_phase('reported')
+        self.targets.save(self.channel_index)
+
+    async def start_workers(self):
+        """Start the scheduler and the background workers (once per process: after a warm start or on the first ready)"""
+        # Arm the scheduler (once per process, on_ready also fires after reconnects)
+        if self._scheduler_task is None:
+            for schedule in self.schedules:
+                self.scheduler.set(schedule)
+            next_run, _ = self.scheduler.next_due()
+            wait_hours = (next_run - self.clock.now()).total_seconds() / 3600
+            log.info(f"⏰ Bot will post next poll in {wait_hours:.2f} hours "
+                     f"({next_run.astimezone(TIMEZONE).strftime('%d/%m/%Y %H:%M %Z')})",
+                     extra={'event': 'next_run', 'next_run': next_run.isoformat()})
+            self._scheduler_task = asyncio.create_task(self.scheduler.run(self.post_poll))
+            self.metrics.startup_phase('scheduler_armed')
+        
+        # Find out once which route creates polls, so the hot loop never probes
+        if self.poll_endpoint is None:
+            await self.resolve_poll_endpoint()
+        
+        # Post polls missed while the bot was down (once per process)
+        if self._catch_up_task is None:
+            self._catch_up_task = asyncio.create_task(self.catch_up())
+        
+        # Retry failed posts in the background
+        if self._outbox_task is None:
+            self._outbox_task = asyncio.create_task(self.drain_outbox())
+        
+        # Save the live vote counts periodically
+        if self._tally_task is None:
+            self._tally_task = asyncio.create_task(self.snapshot_tallies())
         
-        # Ensure the task is running
-        if not self.post_poll.is_running():
-            self.post_poll.start()
+        # Collect the results of each poll when it closes
+        if self._harvest_task is None:
+            self._harvest_task = asyncio.create_task(self.harvest_polls())
+        
+        # Pick up SCHEDULES_FILE edits without restarting
+        if self._config_task is None:
+            self._config_task = asyncio.create_task(self.config.watch(self.apply_config))
+
+    def apply_config(self, table, guild_matchers):
+        """
+        Switch to a reloaded configuration: re-arm the schedules whose post time changed,
+        drop removed ones and re-index the guilds whose channel patterns changed.
+        """
+        old = self.schedules
+        self.schedules = table
+        if self._scheduler_task is not None:
+            for key, schedule in table.by_key.items():
+                previous = old.by_key.get(key)
+                if previous is None or (previous.post_time, previous.tz) != (schedule.post_time, schedule.tz):
+                    self.scheduler.set(schedule)
+            for key in old.by_key.keys() - table.by_key.keys():
+                self.scheduler.remove(key)
+        guild_ids = self.channel_index.guild_matchers.keys() | guild_matchers.keys()
+        changed_guilds = [guild_id for guild_id in guild_ids
+                          if getattr(old.by_key.get(guild_key(guild_id)), 'channel_patterns', None)
+                          != getattr(table.by_key.get(guild_key(guild_id)), 'channel_patterns', None)]
+        self.channel_index.guild_matchers = guild_matchers
+        for guild_id in changed_guilds:
+            guild = self.get_guild(guild_id)
+            if guild is not None:
+                self.channel_index.add_guild(guild)
+
+    async def close(self):
+        """
+        Stop the workers, the poll runs and the running jobs, then write any pending
+        ledger records before disconnecting. The stores close last, so a run cut
+        short still records the polls it created.
+        """
+        await self.stop_workers()
+        await self.jobs.cancel_all()
+        self.targets.save(self.channel_index)
+        self.close_stores()
+        if self._metrics_server is not None:
+            await self._metrics_server.stop()
+        self.watchdog.stop()
+        await super().close()
+
+    async def stop_workers(self):
+        """Cancel the scheduler, the background workers and the scheduled runs, and wait for them"""
+        tasks = [task for task in (self._scheduler_task, self._catch_up_task, self._outbox_task, self._tally_task,
+                                   self._harvest_task, self._config_task, self._report_task, self._lag_task)
+                 if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.scheduler.cancel_runs()
+
+    def close_stores(self):
+        """Write pending records and close the SQLite stores"""
+        for store in (self.ledger, self.outbox, self.breakers, self.tallies, self.results, self.targets):
+            store.close()
 
     def find_votazioni_channels(self, guild):
         """
-        Find all channels with 'votazioni' in their name.
+        Find all channels with 'votazioni' in their name (or matching CHANNEL_PATTERNS).
         The bot will post the same survey to all these different chat channels.
+        Reads the channel index instead of scanning the guild's channels.
         """
-        votazioni_channels = []
-        for channel in guild.text_channels:
-            # Case-insensitive search for 'votazioni' in channel name
-            if 'votazioni' in channel.name.lower():
-                votazioni_channels.append(channel)
-        return votazioni_channels
+        with self.metrics.span('find_channels'):
+            return self.channel_index.get(guild.id)
+
+    async def on_guild_join(self, guild):
+        """Index the votazioni channels of a newly joined server"""
+        self.channel_index.add_guild(guild)
+        self.breakers.reset_guild(guild.id)
+
+    async def on_guild_role_update(self, before, after):
+        """A role's permissions changed: give the server's failing channels another chance"""
+        if before.permissions != after.permissions:
+            self.breakers.reset_guild(after.guild.id)
+
+    async def on_guild_available(self, guild):
+        """A server arrived from the gateway: index its real channels (replacing warm-start stand-ins)"""
+        self.channel_index.add_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        """Forget a server the bot was removed from"""
+        self.channel_index.remove_guild(guild.id)
 
-    async def create_daily_poll(self, channel):
+    async def on_guild_channel_create(self, channel):
+        """Index a new channel if its name matches"""
+        if isinstance(channel, discord.TextChannel):
+            self.channel_index.add_channel(channel)
+
+    async def on_guild_channel_delete(self, channel):
+        """Drop a deleted channel from the index"""
+        self.channel_index.remove_channel(channel)
+
+    async def on_guild_channel_update(self, before, after):
+        """Re-check a renamed (or converted) channel, retry it if its permissions changed"""
+        if before.overwrites != after.overwrites or before.category_id != after.category_id:
+            self.breakers.reset(CHANNEL, after.id)
+        if isinstance(after, discord.TextChannel):
+            self.channel_index.update_channel(before, after)
+        else:
+            self.channel_index.remove_channel(before)
+
+    async def on_raw_poll_vote_add(self, payload):
+        """Count a vote on one of the bot's polls (raw event: works for uncached messages)"""
+        self.tallies.add_vote(payload.message_id, payload.answer_id)
+
+    async def on_raw_poll_vote_remove(self, payload):
+        """Uncount a removed vote"""
+        self.tallies.remove_vote(payload.message_id, payload.answer_id)
+
+    async def snapshot_tallies(self):
+        """Background worker: save changed vote counts, drop the counts of old polls"""
+        while not self.is_closed():
+            await asyncio.sleep(TALLY_SNAPSHOT_SECONDS)
+            self.tallies.snapshot()
+            self.targets.save(self.channel_index)
+            cutoff = self.clock.now(TIMEZONE) - timedelta(days=RETENTION_DAYS)
+            self.tallies.forget_before(poll_date_key(cutoff))
+
+    def remember_poll(self, channel, poll_date, message, schedule=None):
+        """Record a created poll in the ledger and start counting its votes"""
+        message_id = created_message_id(message)
+        self.ledger.record(channel.id, poll_date, message_id, channel.guild.id, now=self.clock.now().timestamp())
+        if message_id is not None:
+            answer_count = len(self.poll_type_for(schedule).answers) if schedule else None
+            self.tallies.track(message_id, channel.id, poll_date, answer_count)
+
+    def live_tallies(self, guild):
+        """
+        (channel, poll date, {answer: votes}) of the newest tracked poll of each votazioni
+        channel of a guild, labelled with the answers of the channel's poll type
+        """
+        results = []
+        for channel in self.find_votazioni_channels(guild):
+            polls = self.tallies.polls_of_channel(channel.id)
+            if not polls:
+                continue
+            schedule = self.schedules.for_channel(guild.id, channel.id)
+            answers = [text for text, _ in self.poll_type_for(schedule).answers]
+            results.append((channel, polls[0].poll_date, self.tallies.tally(polls[0].message_id, answers)))
+        return results
+
+    def target_channel(self, channel_id):
+        """A channel from the cache, or its warm-start stand-in while the cache is loading (None if unknown)"""
+        return self.get_channel(channel_id) or self._warm_channels.get(channel_id)
+
+    async def wait_until_targets(self):
+        """Wait until the channels to post to are known: right away after a warm start, else on ready"""
+        if not self._warm_channels:
+            await self.wait_until_ready()
+
+    def answers_for(self, channel_id):
+        """Answer labels of a channel's polls under the current configuration"""
+        channel = self.target_channel(channel_id)
+        schedule = self.schedules.for_channel(channel.guild.id if channel else 0, channel_id)
+        return self.poll_type_for(schedule).answer_texts
+
+    async def fetch_voters_page(self, channel_id, message_id, answer_id, after, limit):
+        """One page of the users who voted for an answer of a poll"""
+        await self.rate_limiter.acquire(f'GET {VOTERS_PATH}:{channel_id}')
+        route = discord.http.Route('GET', VOTERS_PATH, channel_id=channel_id, message_id=message_id,
+                                   answer_id=answer_id)
+        params = {'limit': limit}
+        if after is not None:
+            params['after'] = after
+        data = await self.http.request(route, params=params)
+        return data.get('users', [])
+
+    def poll_closes_at(self, channel_id, posted_at):
+        """Timestamp when a poll posted at `posted_at` expires (its schedule's duration)"""
+        channel = self.target_channel(channel_id)
+        schedule = self.schedules.for_channel(channel.guild.id if channel else 0, channel_id)
+        return posted_at + schedule.duration_hours * 3600
+
+    def owns_poll(self, channel_id, guild_id):
+        """
+        Whether this process harvests a ledger poll. The ledger already only lists the
+        polls of this process's shards; polls recorded without a guild (before the
+        ledger kept it) are only harvested by a sharded process that sees the channel.
+        """
+        return guild_id is not None or self.shard_ids is None or self.target_channel(channel_id) is not None
+
+    def record_history(self, results):
+        """Append harvested results to the columnar history"""
+        rows = []
+        for result in results:
+            channel = self.target_channel(result.channel_id)
+            if channel is None:
+                continue  # Deleted or not ours: no guild and name to file it under
+            if self.answers_for(result.channel_id) != self.history.answers:
+                continue  # Guild with its own time options: not comparable with the history's columns
+            rows.append((result.poll_date, channel.guild.id, result.channel_id, channel.name, result.counts,
+                         result.voter_count))
+        self.history.append(rows)
+
+    async def harvest_polls(self):
+        """
+        Background worker: when polls close, fetch the final voters of all of them
+        concurrently (HARVEST_CONCURRENCY requests in flight), store the results and
+        post a summary in each channel. Polls that closed while the bot was down are
+        harvested on start.
+        """
+        await self.wait_until_targets()
+        while not self.is_closed():
+            self._harvest_wakeup.clear()
+            now = self.clock.now().timestamp()
+            longest = max(schedule.duration_hours for schedule in self.schedules)
+            posted = [row for row in self.ledger.posted_since(now - (longest + 48) * 3600)
+                      if self.owns_poll(row[0], row[4])]
+            done = self.results.harvested(row[2] for row in posted)
+            pending = [(self._closed_early.get(message_id, self.poll_closes_at(channel_id, posted_at)) + HARVEST_GRACE_SECONDS,
+                        channel_id, poll_date, message_id)
+                       for channel_id, poll_date, message_id, posted_at, _ in posted if message_id not in done]
+            closed = [(channel_id, message_id, poll_date) for closes_at, channel_id, poll_date, message_id in pending
+                      if closes_at <= now]
+            next_at = min((closes_at for closes_at, *_ in pending if closes_at > now), default=None)
+            
+            if closed:
+                results = await harvest(closed, self.fetch_voters_page,
+                                        lambda channel_id: len(self.answers_for(channel_id)), HARVEST_CONCURRENCY)
+                # Unreachable polls (deleted channel/message, no access) are stored as such, others retried
+                finished = [result for result in results
+                            if result.error is None or is_permanent(getattr(result.error, 'status', None))]
+                self.results.save(finished)
+                for result in finished:
+                    self._closed_early.pop(result.message_id, None)
+                complete = [result for result in finished if result.error is None]
+                self.record_history(complete)
+                
+                async def post_summary(result):
+                    channel = self.target_channel(result.channel_id)
+                    if channel is None:
+                        return False
+                    date_str = datetime.strptime(result.poll_date, '%Y-%m-%d').strftime('%d/%m/%Y')
+                    await channel.send(format_summary(result, self.answers_for(result.channel_id), date_str))
+                    return True
+                
+                stats = await fan_out(complete, post_summary, HARVEST_CONCURRENCY)
+                log.info(f"[INFO] Harvested {len(closed)} closed poll(s): {stats.created} summary(ies) posted, "
+                         f"{len(finished) - len(complete)} unreachable, {len(results) - len(finished)} to retry",
+                         extra={'event': 'harvest', 'closed': len(closed), 'summaries': stats.created,
+                                'retry': len(results) - len(finished)})
+                if len(finished) < len(results):
+                    retry_at = now + HARVEST_RETRY_SECONDS
+                    next_at = retry_at if next_at is None else min(next_at, retry_at)
+            
+            timeout = None if next_at is None else max(MIN_WAKEUP_SECONDS, next_at - self.clock.now().timestamp())
+            try:
+                await asyncio.wait_for(self._harvest_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def resolve_poll_endpoint(self):
+        """
+        Pick the route that creates polls by sending an empty body to each candidate
+        on one votazioni channel. Discord rejects the empty body (400) without
+        creating anything, while a missing route answers 404/405. A network error
+        keeps the default route so the workers still start.
+        """
+        self.poll_endpoint = POLL_ENDPOINTS[0]
+        channel = next((c for _, c in self.channel_index.items()), None)
+        if channel is None:
+            return
+        for endpoint in POLL_ENDPOINTS:
+            route = discord.http.Route('POST', endpoint.path, channel_id=channel.id)
+            try:
+                await self.http.request(route, json={})
+                exists = True
+            except discord.errors.HTTPException as http_error:
+                exists = route_exists(http_error.status, http_error.code)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.warning(f"[WARNING] Poll route probe failed ({type(e).__name__}: {e}), "
+                            f"using POST {self.poll_endpoint.path}", extra={'event': 'endpoint'})
+                return
+            if exists:
+                self.poll_endpoint = endpoint
+                log.info(f"[INFO] Creating surveys with POST {endpoint.path}", extra={'event': 'endpoint'})
+                return
+        log.warning(f"[WARNING] No poll route answered the probe, using POST {self.poll_endpoint.path}",
+                    extra={'event': 'endpoint'})
+
+    @staticmethod
+    def poll_type_for(schedule):
+        """The poll type a schedule posts (the TIME_OPTIONS poll when it sets none)"""
+        return schedule.poll_type or time_poll(TIME_OPTIONS, schedule.duration_hours)
+
+    def poll_template(self, run_time, poll_type):
+        """The day's poll of a poll type, built and JSON-encoded once and shared by every channel posting it"""
+        with self.metrics.span('build_payload'):
+            return self._poll_templates.get(poll_type, run_time.date(), self.poll_endpoint or POLL_ENDPOINTS[0])
+
+    async def send_poll(self, channel, template):
+        """
+        Send one poll to Discord, waiting for the rate limits first.
+        Returns the created message; raises discord.errors.HTTPException (or a network error) on failure.
+        """
+        # Use Discord's HTTP API to create poll (native survey feature)
+        http_client = channel._state.http
+        route_key = poll_route_key(channel.id)
+        
+        # Wait for the channel's route bucket and the global rate limit
+        with self.metrics.span('rate_limit_wait'):
+            await self.rate_limiter.acquire(route_key)
+        
+        try:
+            # Pre-encoded body on the route resolved at startup
+            route = discord.http.Route('POST', template.endpoint.path, channel_id=channel.id)
+            with self.metrics.span('http_request'):
+                message = await http_client.request(route, data=template.request_data())
+            self.metrics.response(200)
+            return message
+        except discord.errors.HTTPException as http_error:
+            self.metrics.response(http_error.status)
+            headers = getattr(http_error.response, 'headers', None)
+            if http_error.status == 429:
+                self.rate_limiter.on_429(route_key, headers)
+            else:
+                self.rate_limiter.update(route_key, headers)
+            raise
+        except Exception:
+            self.metrics.response(None)
+            raise
+
+    async def create_daily_poll(self, channel, schedule=None, run_time=None):
         """
         Create a daily poll in the specified channel using Discord's native poll feature.
         This replaces manual work by automating the survey creation process.
+        Failed posts go to the retry outbox instead of being lost for the day.
+        The date comes from run_time (the schedule's local time), by default now.
+        Returns the created message (truthy) on success, False on failure.
         """
-        # Get current date in Italy timezone (GMT+1)
-        now_italy = datetime.now(TIMEZONE)
-        date_str = now_italy.strftime('%d/%m/%Y')
+        if schedule is None:
+            schedule = self.schedules.for_channel(channel.guild.id, channel.id)
+        # Get current date in the schedule's timezone (Italy by default)
+        run_time = run_time or self.clock.now(schedule.tz)
+        date_str = run_time.strftime('%d/%m/%Y')
         
-        # Survey title = current date (as per client requirement)
-        question = date_str
-        
-        # Create time options as strings (clock times: 7, 9, 11, 13, 15, 17, 19, 21, 23)
-        answers = [str(time_option) for time_option in TIME_OPTIONS]
+        fields = {'guild_id': channel.guild.id, 'channel_id': channel.id, 'channel': channel.name,
+                  'poll_date': poll_date_key(run_time)}
         
         # Create the poll using Discord's native poll/survey feature
+        started = asyncio.get_running_loop().time()
         try:
-            # Prepare poll payload according to Discord API v10
-            # This uses Discord's built-in survey function
-            poll_payload = {
-                "question": {
-                    "text": question  # Survey title = current date
-                },
-                "answers": [{"poll_media": {"text": str(answer)}} for answer in answers],  # Multiple clock time options
-                "duration": POLL_DURATION_HOURS * 3600,  # Duration in seconds (24 hours)
-                "allow_multiselect": True  # Users can check multiple answers
-            }
-            
-            # Use Discord's HTTP API to create poll (native survey feature)
-            http_client = channel._state.http
-            
-            # Method 1: Try using discord.py's built-in method if available (v2.3+)
-            if hasattr(http_client, 'create_poll'):
-                try:
-                    await http_client.create_poll(channel.id, poll_payload)
-                    print(f"[SUCCESS] Survey created in #{channel.name} - Date: {date_str}")
-                    return True
-                except Exception as e:
-                    print(f"[WARNING] create_poll method failed, trying direct API: {e}")
-            
-            # Method 2: Use Discord API endpoint directly (most reliable)
-            # POST /channels/{channel.id}/polls
-            route = discord.http.Route('POST', '/channels/{channel_id}/polls', channel_id=channel.id)
-            await http_client.request(route, json=poll_payload)
-            print(f"[SUCCESS] Survey created in #{channel.name} - Date: {date_str}")
-            return True
+            message = await self.send_poll(channel, self.poll_template(run_time, self.poll_type_for(schedule)))
+            latency_ms = round((asyncio.get_running_loop().time() - started) * 1000, 1)
+            channel_log.info(f"[SUCCESS] Survey created in #{channel.name} - Date: {date_str}",
+                             extra={'event': 'poll_created', 'latency_ms': latency_ms, **fields})
+            return message or True
                 
-        except discord.errors.Forbidden:
-            print(f"[ERROR] Permission denied in #{channel.name} - Bot needs 'Send Messages' permission")
+        except discord.errors.Forbidden as forbidden:
+            log.error(f"[ERROR] Permission denied in #{channel.name} - Bot needs 'Send Messages' permission",
+                      extra={'event': 'poll_failed', 'status': forbidden.status, **fields})
+            self.defer_failed_poll(channel, run_time, forbidden.status, forbidden)
             return False
         except discord.errors.HTTPException as http_error:
             error_msg = str(http_error)
-            print(f"[ERROR] HTTP error creating survey in #{channel.name}: {error_msg}")
+            lines = [f"[ERROR] HTTP error creating survey in #{channel.name}: {error_msg}"]
             
             # Provide specific error messages
             if http_error.status == 400:
-                print(f"   [INFO] This might indicate:")
-                print(f"   - Discord API version issue (need API v10+)")
-                print(f"   - Poll format issue")
-                print(f"   - Server doesn't support polls yet")
+                lines.append(f"   [INFO] This might indicate:")
+                lines.append(f"   - Discord API version issue (need API v10+)")
+                lines.append(f"   - Poll format issue")
+                lines.append(f"   - Server doesn't support polls yet")
             elif http_error.status == 403:
-                print(f"   [INFO] Bot lacks permissions. Ensure bot has:")
-                print(f"   - Send Messages permission")
-                print(f"   - Proper channel access")
+                lines.append(f"   [INFO] Bot lacks permissions. Ensure bot has:")
+                lines.append(f"   - Send Messages permission")
+                lines.append(f"   - Proper channel access")
             elif http_error.status == 404:
-                print(f"   [INFO] Channel not found or bot not in server")
+                lines.append(f"   [INFO] Channel not found or bot not in server")
+            log.error('\n'.join(lines), extra={'event': 'poll_failed', 'status': http_error.status, **fields})
+            headers = getattr(http_error.response, 'headers', None) or {}
+            self.defer_failed_poll(channel, run_time, http_error.status, http_error, headers.get('Retry-After'))
             return False
         except Exception as e:
-            print(f"[ERROR] Unexpected error creating survey in #{channel.name}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception(f"[ERROR] Unexpected error creating survey in #{channel.name}: {str(e)}",
+                          extra={'event': 'poll_failed', **fields})
+            self.defer_failed_poll(channel, run_time, None, e)
             return False
 
-    @tasks.loop(time=time(0, 0))  # Midnight (00:00)
-    async def post_poll(self):
+    def defer_failed_poll(self, channel, run_time, status, error, retry_after=None):
         """
-        Post surveys daily at midnight (GMT+1, Italy timezone).
+        Put a failed post (channel or channel ID) in the outbox:
+        retried later if transient, parked if permanent. Only 403/404 count
+        towards the channel's breaker: a rejected body (400) is the config's fault.
+        """
+        channel_id = getattr(channel, 'id', channel)
+        guild = getattr(channel, 'guild', None)
+        now = self.clock.now().timestamp()
+        if is_channel_failure(status):
+            breaker = self.breakers.record_failure(CHANNEL, channel_id, guild.id if guild else 0, now=now)
+            self._permanent_failures.add(channel_id)
+            if breaker.state == OPEN:
+                log.warning(f"   [INFO] Channel {channel_id} skipped until "
+                            f"{datetime.fromtimestamp(breaker.next_probe_at, TIMEZONE).strftime('%d/%m/%Y')} "
+                            f"after {breaker.failures} failures (circuit open)",
+                            extra={'event': 'circuit_open', 'channel_id': channel_id})
+        entry = self.outbox.add_failure(channel_id, poll_date_key(run_time), status, error,
+                                        end_of_poll_day(run_time), retry_after, now=now,
+                                        guild_id=guild.id if guild else None)
+        if entry.state == DEAD:
+            log.info(f"   [INFO] Not retrying channel {channel_id} today ({status or 'error'}, attempt {entry.attempts})",
+                     extra={'event': 'retry_dropped', 'channel_id': channel_id, 'status': status})
+        else:
+            self._outbox_wakeup.set()
+
+    async def drain_outbox(self):
+        """
+        Background worker: retry failed posts when their backoff expires.
+        Uses its own small concurrency so it never holds up the main fan-out.
+        """
+        await self.wait_until_targets()
+        while not self.is_closed():
+            self._outbox_wakeup.clear()
+            self.outbox.purge_expired(self.clock.now().timestamp())
+            next_at = self.outbox.next_attempt_at()
+            timeout = None if next_at is None else max(MIN_WAKEUP_SECONDS, next_at - self.clock.now().timestamp())
+            try:
+                await asyncio.wait_for(self._outbox_wakeup.wait(), timeout)
+                continue  # new failure queued: recompute the next due time
+            except asyncio.TimeoutError:
+                pass
+            
+            entries = self.outbox.due(self.clock.now().timestamp())
+            if entries:
+                stats = await fan_out(entries, self.retry_failed_poll, OUTBOX_CONCURRENCY)
+                self.ledger.flush()
+                self._harvest_wakeup.set()  # new polls to harvest when they close
+                log.info(f"[INFO] Outbox: {stats.created} survey(s) recovered, {stats.failed} still failing",
+                         extra={'event': 'outbox', 'polls_created': stats.created, 'failed': stats.failed})
+
+    async def retry_failed_poll(self, entry):
+        """Retry one outbox entry; returns True when the poll is now posted"""
+        channel = self.target_channel(entry.channel_id)
+        schedule = self.schedules.for_channel(channel.guild.id if channel else 0, entry.channel_id)
+        now_local = self.clock.now(schedule.tz)
+        if poll_date_key(now_local) != entry.poll_date:
+            # The day is over, don't post yesterday's survey
+            self.outbox.succeeded(entry.channel_id, entry.poll_date)
+            return False
+        if self.ledger.is_posted(entry.channel_id, entry.poll_date):
+            self.outbox.succeeded(entry.channel_id, entry.poll_date)
+            return True
+        
+        if channel is None:
+            self.defer_failed_poll(entry.channel_id, now_local, 404, 'Channel no longer visible')
+            return False
+        
+        try:
+            message = await self.send_poll(channel, self.poll_template(now_local, self.poll_type_for(schedule)))
+        except discord.errors.HTTPException as http_error:
+            headers = getattr(http_error.response, 'headers', None) or {}
+            self.defer_failed_poll(channel, now_local, http_error.status, http_error, headers.get('Retry-After'))
+            return False
+        except Exception as e:
+            self.defer_failed_poll(channel, now_local, None, e)
+            return False
+        
+        self.remember_poll(channel, entry.poll_date, message, schedule)
+        self.outbox.succeeded(channel.id, entry.poll_date)
+        self.breakers.record_success(CHANNEL, channel.id)
+        channel_log.info(f"[SUCCESS] Survey created in #{channel.name} on retry {entry.attempts}",
+                         extra={'event': 'poll_created', 'guild_id': channel.guild.id, 'channel_id': channel.id,
+                                'channel': channel.name, 'poll_date': entry.poll_date, 'attempt': entry.attempts})
+        return True
+
+    def channels_for_schedule(self, schedule):
+        """Indexed channels whose effective schedule is `schedule`"""
+        kind = schedule.key[0]
+        if kind == 'channel':
+            channel = self.target_channel(schedule.key[1])
+            if channel is None or not self.channel_index.has(channel.guild.id, channel.id):
+                return []
+            return [channel]
+        guild_ids = [schedule.key[1]] if kind == 'guild' else self.channel_index.guild_ids()
+        with self.metrics.span('find_channels'):
+            return [
+                channel
+                for guild_id in guild_ids
+                for channel in self.channel_index.get(guild_id)
+                if self.schedules.for_channel(guild_id, channel.id).key == schedule.key
+            ]
+
+    async def post_poll(self, due_items):
+        """
+        Post the surveys of every schedule that is due: daily at midnight (GMT+1, Italy timezone)
+        by default, or at a server's/channel's own time. Called by the scheduler.
         This automates the daily survey creation task.
         """
-        # Wait until we're connected
-        await self.wait_until_ready()
+        # Wait until we know the channels (snapshot or guild cache)
+        await self.wait_until_targets()
         
         # Get current time in Italy timezone (GMT+1)
-        now_italy = datetime.now(TIMEZONE)
-        print(f"\n{'='*60}")
-        print(f"🕛 Daily Survey Task - {now_italy.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        print(f"{'='*60}")
+        now_italy = self.clock.now(TIMEZONE)
+        log.info(f"\n{'='*60}\n🕛 Daily Survey Task - {now_italy.strftime('%Y-%m-%d %H:%M:%S %Z')}\n{'='*60}",
+                 extra={'event': 'run_start'})
         
-        # Post surveys to all guilds (servers) the bot is in
-        total_polls_created = 0
-        total_polls_failed = 0
+        # Collect the channels of every due schedule; the date comes from the schedule's due time
+        jobs = []
+        for due, schedule in due_items:
+            # The scheduler may hold the entry from before a reload with the same post time
+            schedule = self.schedules.by_key.get(schedule.key, schedule)
+            run_time = due.astimezone(schedule.tz)
+            channels = self.channels_for_schedule(schedule)
+            log.info(f"[INFO] {run_time.strftime('%H:%M %Z')} schedule ({'/'.join(map(str, schedule.key))}): "
+                     f"{len(channels)} channel(s)",
+                     extra={'event': 'schedule_due', 'schedule': '/'.join(map(str, schedule.key)),
+                            'channels': len(channels)})
+            jobs.extend((channel, schedule, run_time) for channel in channels)
         
-        for guild in self.guilds:
-            # Find all channels with 'votazioni' in their name
-            votazioni_channels = self.find_votazioni_channels(guild)
+        # Create the same survey in all different chat channels, several at a time
+        hits_before = self.rate_limiter.hits_429
+        run_id = due_items[0][0].isoformat()
+        with self.watchdog.labelled(run_id):
+            stats, already_posted, circuit_open = await self.post_missing_polls(jobs)
+        
+        # Summary
+        lines = [f"\n{'='*60}", f"📊 Daily Survey Summary:",
+                 f"   ✅ Successfully created: {stats.created} survey(s)"]
+        if already_posted:
+            lines.append(f"   ⏭️ Already posted today: {already_posted} survey(s)")
+        if circuit_open:
+            lines.append(f"   🚧 Skipped (failing channel, circuit open): {circuit_open} channel(s)")
+        if stats.failed > 0:
+            lines.append(f"   ❌ Failed: {stats.failed} survey(s)")
+        lines.append(f"   ⏱️ Wall-clock time: {stats.elapsed:.2f}s ({stats.throughput:.1f} surveys/s)")
+        lines.append(f"   ⏱️ p99 post latency: {stats.p99:.2f}s after the channel's slot")
+        rate_limited = self.rate_limiter.hits_429 - hits_before
+        if rate_limited:
+            lines.append(f"   ⚠️ Rate limited (429): {rate_limited} time(s)")
+        lines.append(f"{'='*60}\n")
+        log.info('\n'.join(lines), extra={
+            'event': 'run_summary', 'polls_created': stats.created, 'failed': stats.failed,
+            'already_posted': already_posted, 'circuit_open': circuit_open, 'rate_limited': rate_limited,
+            'elapsed_s': round(stats.elapsed, 3), 'p99_latency_ms': round(stats.p99 * 1000, 1),
+        })
+        
+        # Let the shard launcher combine the totals of all processes
+        if self.report_queue is not None:
+            first_due, first_schedule = due_items[0]
+            self.report_queue.put({
+                'run': run_id,
+                'poll_date': poll_date_key(first_due.astimezone(first_schedule.tz)),
+                'shard_ids': self.shard_ids,
+                'created': stats.created,
+                'failed': stats.failed,
+                'already_posted': already_posted,
+                'circuit_open': circuit_open,
+                'rate_limited': rate_limited,
+                'elapsed': stats.elapsed,
+                'p99_latency': stats.p99,
+            })
+
+    async def post_missing_polls(self, jobs, window=None):
+        """
+        Post the survey of each (channel, schedule, run_time) job whose channel doesn't have
+        that day's poll yet according to the ledger, skipping channels and guilds whose
+        circuit breaker is open. Posts are spread over `window` seconds (POSTING_WINDOW_SECONDS by default).
+        Returns the fan-out stats, how many channels were already posted
+        and how many were skipped by an open circuit.
+        """
+        async with self._run_lock:
+            missing = [job for job in jobs if not self.ledger.is_posted(job[0].id, poll_date_key(job[2]))]
+            now = self.clock.now().timestamp()
+            allowed = [
+                job for job in missing
+                if self.breakers.allow(GUILD, job[0].guild.id, now) and self.breakers.allow(CHANNEL, job[0].id, now)
+            ]
+            self._permanent_failures.clear()
+            succeeded_guilds = set()
             
-            if not votazioni_channels:
-                print(f"[INFO] No 'votazioni' channels found in server: {guild.name}")
-                continue
+            async def post(job):
+                channel, schedule, run_time = job
+                message = await self.create_daily_poll(channel, schedule, run_time)
+                success = bool(message)
+                if success:
+                    self.remember_poll(channel, poll_date_key(run_time), message, schedule)
+                    self.breakers.record_success(CHANNEL, channel.id)
+                    succeeded_guilds.add(channel.guild.id)
+                return success
             
-            print(f"[INFO] Found {len(votazioni_channels)} channel(s) in {guild.name}")
-            print(f"[INFO] Creating surveys in {len(votazioni_channels)} different chat channels...")
+            # Each channel gets a stable slot inside the posting window after its run time
+            window = POSTING_WINDOW_SECONDS if window is None else window
+            loop_now = asyncio.get_running_loop().time()
+            wall_now = self.clock.now()
             
-            # Create the same survey in all different chat channels
-            for channel in votazioni_channels:
-                success = await self.create_daily_poll(channel)
-                if success:
-                    total_polls_created += 1
-                else:
-                    total_polls_failed += 1
-                
-                # Small delay between posts to avoid rate limiting
-                await asyncio.sleep(1)
+            def slot(job):
+                channel, _, run_time = job
+                delay = (run_time - wall_now).total_seconds() + stagger_offset(channel.id, window)
+                return loop_now + delay
+            
+            spread = f", spread over {window:.0f}s" if window > 0 else ""
+            log.info(f"[INFO] Creating surveys in {len(allowed)} channel(s), {POLL_CONCURRENCY} at a time{spread}...",
+                     extra={'event': 'fan_out', 'channels': len(allowed)})
+            try:
+                stats = await fan_out(allowed, post, POLL_CONCURRENCY, start_at=slot)
+                self.metrics.record_run(stats)
+            finally:
+                self.ledger.flush()
+                self._harvest_wakeup.set()  # new polls to harvest when they close
+            
+            # A guild where every attempted channel failed permanently counts as one guild failure
+            attempted_guilds = {job[0].guild.id for job in allowed}
+            for guild_id in attempted_guilds:
+                if guild_id in succeeded_guilds:
+                    self.breakers.record_success(GUILD, guild_id)
+                elif all(job[0].id in self._permanent_failures
+                         for job in allowed if job[0].guild.id == guild_id):
+                    self.breakers.record_failure(GUILD, guild_id, guild_id, now=self.clock.now().timestamp())
+        return stats, len(jobs) - len(missing), len(missing) - len(allowed)
+
+    async def catch_up(self):
+        """
+        After a (re)start, post the surveys that are missing from the ledger for every
+        schedule whose last run was less than CATCH_UP_HOURS ago.
+        """
+        now = self.clock.now()
+        jobs = []
+        for schedule in self.schedules:
+            last_run = schedule.previous_run(now)
+            if now - last_run > timedelta(hours=CATCH_UP_HOURS):
+                continue
+            run_time = last_run.astimezone(schedule.tz)
+            poll_date = poll_date_key(run_time)
+            jobs.extend(
+                (channel, schedule, run_time)
+                for channel in self.channels_for_schedule(schedule)
+                if not self.ledger.is_posted(channel.id, poll_date)
+            )
+        if not jobs:
+            return
         
-        # Summary
-        print(f"\n{'='*60}")
-        print(f"📊 Daily Survey Summary:")
-        print(f"   ✅ Successfully created: {total_polls_created} survey(s)")
-        if total_polls_failed > 0:
-            print(f"   ❌ Failed: {total_polls_failed} survey(s)")
-        print(f"{'='*60}\n")
-
-    @post_poll.before_loop
-    async def before_post_poll(self):
-        """Wait until midnight GMT+1 before starting the loop"""
-        await self.wait_until_ready()
+        log.info(f"[INFO] Catch-up: posting {len(jobs)} survey(s) missed while the bot was down...",
+                 extra={'event': 'catch_up', 'channels': len(jobs)})
+        with self.watchdog.labelled('catch-up'):
+            stats, already_posted, circuit_open = await self.post_missing_polls(jobs)
+        log.info(f"[INFO] Catch-up done: {stats.created} created, {stats.failed} failed, "
+                 f"{already_posted} already posted, {circuit_open} skipped (circuit open)",
+                 extra={'event': 'catch_up_done', 'polls_created': stats.created, 'failed': stats.failed})
+
+    def todays_jobs(self, guild):
+        """(channel, schedule, run_time) of every votazioni channel of a guild, run_time being now in its schedule's timezone"""
+        jobs = []
+        for channel in self.find_votazioni_channels(guild):
+            schedule = self.schedules.for_channel(guild.id, channel.id)
+            jobs.append((channel, schedule, self.clock.now(schedule.tz)))
+        return jobs
+
+    async def post_in_chunks(self, job, items):
+        """
+        Post (channel, schedule, run_time) items for a command job through post_missing_polls,
+        JOB_CHUNK_SIZE at a time and without the posting window. The run lock is released
+        between chunks, so the scheduled run never waits for a whole command.
+        """
+        with self.watchdog.labelled(f'job-{job.id}'):
+            for start in range(0, len(items), JOB_CHUNK_SIZE):
+                stats, already_posted, circuit_open = await self.post_missing_polls(
+                    items[start:start + JOB_CHUNK_SIZE], window=0)
+                job.succeeded += stats.created
+                job.failed += stats.failed
+                job.skipped += already_posted + circuit_open
+
+    def start_post_job(self, guild):
+        """/poll post: post today's survey now in the guild's channels that don't have it yet. None if already running."""
+        items = self.todays_jobs(guild)
+        return self.jobs.start('post', guild.id, len(items), lambda job: self.post_in_chunks(job, items))
+
+    def start_repost_job(self, guild):
+        """
+        /poll repost: post again in the channels whose survey failed today (waiting in the
+        outbox, or skipped by an open circuit breaker), closing their breakers first.
+        None if already running.
+        """
+        guild_open = self.breakers.is_open(GUILD, guild.id)
+        items = [
+            (channel, schedule, run_time) for channel, schedule, run_time in self.todays_jobs(guild)
+            if self.outbox.get(channel.id, poll_date_key(run_time)) is not None
+            or self.breakers.is_open(CHANNEL, channel.id)
+            or (guild_open and not self.ledger.is_posted(channel.id, poll_date_key(run_time)))
+        ]
         
-        # Calculate next midnight in Italy timezone
-        now_italy = datetime.now(TIMEZONE)
-        midnight_italy = now_italy.replace(hour=0, minute=0, second=0, microsecond=0)
+        async def work(job):
+            self.breakers.reset(GUILD, guild.id)
+            for channel, _, run_time in items:
+                self.breakers.reset(CHANNEL, channel.id)
+                self.outbox.succeeded(channel.id, poll_date_key(run_time))  # A new failure is queued again
+            await self.post_in_chunks(job, items)
         
-        # If it's already past midnight today, schedule for tomorrow
-        if now_italy >= midnight_italy:
-            midnight_italy += timedelta(days=1)
+        return self.jobs.start('repost', guild.id, len(items), work)
+
+    async def expire_poll(self, channel, message_id):
+        """End a poll now; returns True when Discord closed it"""
+        await self.rate_limiter.acquire(f'POST {EXPIRE_PATH}:{channel.id}')
+        route = discord.http.Route('POST', EXPIRE_PATH, channel_id=channel.id, message_id=message_id)
+        try:
+            await self.http.request(route)
+        except discord.errors.HTTPException as http_error:
+            log.error(f"[ERROR] Survey in #{channel.name} not closed: {http_error}",
+                      extra={'event': 'close_failed', 'status': http_error.status, 'channel_id': channel.id})
+            return False
+        self._closed_early[message_id] = self.clock.now().timestamp()
+        return True
+
+    def start_close_job(self, guild):
+        """/poll close: end today's surveys of the guild now; their results are harvested right after. None if already running."""
+        polls = []
+        for channel, _, run_time in self.todays_jobs(guild):
+            message_id = self.ledger.message_id(channel.id, poll_date_key(run_time))
+            if message_id is not None and message_id not in self._closed_early:
+                polls.append((channel, message_id))
         
-        # Calculate seconds until next midnight
-        wait_seconds = (midnight_italy - now_italy).total_seconds()
+        async def work(job):
+            async def close_one(poll):
+                closed = False
+                try:
+                    closed = await self.expire_poll(*poll)
+                finally:
+                    if closed:
+                        job.succeeded += 1
+                    else:
+                        job.failed += 1
+                return closed
+            
+            await fan_out(polls, close_one, POLL_CONCURRENCY)
+            self._harvest_wakeup.set()
         
-        print(f"⏰ Bot will post first poll in {wait_seconds/3600:.2f} hours (at midnight GMT+1)")
-        await asyncio.sleep(wait_seconds)
+        return self.jobs.start('close', guild.id, len(polls), work)
 
 # Run the bot
+def rest_only_polls(schedules, now):
+    """
+    poll_for of a REST-only run (rest_runner): the (local date, PollType) of the last
+    run of the channel's schedule, or None when it was more than CATCH_UP_HOURS ago.
+    """
+    due = {}  # schedule key -> poll or None
+    
+    def poll_for(guild_id, channel_id):
+        schedule = schedules.for_channel(guild_id, channel_id)
+        if schedule.key not in due:
+            last_run = schedule.previous_run(now)
+            due[schedule.key] = None
+            if now - last_run <= timedelta(hours=CATCH_UP_HOURS):
+                due[schedule.key] = (last_run.astimezone(schedule.tz).date(), DailyPollBot.poll_type_for(schedule))
+        return due[schedule.key]
+    
+    return poll_for
+
+
 if __name__ == "__main__":
     if not TOKEN:
         print("\n" + "="*60)
@@ -236,7 +1105,25 @@ if __name__ == "__main__":
         print("\n" + "="*60 + "\n")
         exit(1)
     
+    # REST-only mode: post the surveys of the schedules that are due without a gateway session, then exit
+    if '--rest-only' in sys.argv[1:]:
+        import rest_runner
+        setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)
+        schedules, guild_matchers = ConfigWatcher(SCHEDULES_FILE, DEFAULT_SCHEDULE).load()
+        rest_runner.main(
+            TOKEN,
+            ChannelMatcher.from_string(CHANNEL_PATTERNS),
+            None,
+            POLL_CONCURRENCY,
+            dry_run='--dry-run' in sys.argv[1:],
+            ledger=PollLedger(POLL_STATE_DB),
+            guild_matchers=guild_matchers,
+            poll_for=rest_only_polls(schedules, datetime.now(pytz.utc)),
+        )
+        exit(0)
+    
     try:
+        setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)
         bot = DailyPollBot()
         bot.run(TOKEN)
     except discord.errors.LoginFailure as e:
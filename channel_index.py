@@ -0,0 +1,121 @@
+"""
+In-memory index of the channels that receive the daily poll
+Built once from the guild cache and kept current through gateway events,
+so a poll run reads a ready list instead of rescanning every guild.
+"""
+
+import re
+
+DEFAULT_CHANNEL_PATTERNS = 'substring:votazioni'
+PATTERN_KINDS = ('substring', 'prefix', 'regex')
+
+
+class ChannelMatcher:
+    """
+    Case-insensitive channel name matcher built from patterns like
+    'substring:votazioni', 'prefix:vote-' or 'regex:^poll-\\d+$'.
+    Patterns are compiled once; a name matches if any pattern matches.
+    """
+
+    def __init__(self, patterns):
+        self.substrings = []
+        self.prefixes = []
+        self.regexes = []
+        for pattern in patterns:
+            kind, sep, value = pattern.partition(':')
+            if not sep:
+                # A bare word keeps the original behavior: substring match
+                kind, value = 'substring', pattern
+            kind = kind.strip().lower()
+            if kind not in PATTERN_KINDS or not value:
+                raise ValueError(f"Invalid channel pattern '{pattern}' (use {', '.join(PATTERN_KINDS)})")
+            if kind == 'substring':
+                self.substrings.append(value.lower())
+            elif kind == 'prefix':
+                self.prefixes.append(value.lower())
+            else:
+                self.regexes.append(re.compile(value, re.IGNORECASE))
+        self.prefixes = tuple(self.prefixes)
+
+    @classmethod
+    def from_string(cls, value):
+        """Build a matcher from a comma-separated pattern list (e.g. the CHANNEL_PATTERNS env var)"""
+        return cls([part.strip() for part in value.split(',') if part.strip()])
+
+    def matches(self, name):
+        lowered = name.lower()
+        if self.prefixes and lowered.startswith(self.prefixes):
+            return True
+        if any(substring in lowered for substring in self.substrings):
+            return True
+        return any(regex.search(name) for regex in self.regexes)
+
+
+class ChannelIndex:
+    """Guild ID -> matching channels, maintained incrementally"""
+
+    def __init__(self, matcher, guild_matchers=None):
+        self.matcher = matcher
+        self.guild_matchers = guild_matchers or {}  # guild_id -> ChannelMatcher overriding `matcher`
+        self._guilds = {}  # guild_id -> {channel_id: channel}
+        self.version = 0  # bumped on every change (see warm_start.TargetSnapshot.save)
+
+    def matcher_for(self, guild_id):
+        return self.guild_matchers.get(guild_id, self.matcher)
+
+    def build(self, guilds):
+        """(Re)build the whole index from the guild cache"""
+        self._guilds = {}
+        self.version += 1
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add_guild(self, guild):
+        matcher = self.matcher_for(guild.id)
+        self._guilds[guild.id] = {
+            channel.id: channel
+            for channel in guild.text_channels
+            if matcher.matches(channel.name)
+        }
+        self.version += 1
+
+    def remove_guild(self, guild_id):
+        if self._guilds.pop(guild_id, None) is not None:
+            self.version += 1
+
+    def add_channel(self, channel):
+        """Index `channel` if its name matches; returns True when indexed"""
+        if not self.matcher_for(channel.guild.id).matches(channel.name):
+            return False
+        self._guilds.setdefault(channel.guild.id, {})[channel.id] = channel
+        self.version += 1
+        return True
+
+    def remove_channel(self, channel):
+        channels = self._guilds.get(channel.guild.id)
+        if channels is not None and channels.pop(channel.id, None) is not None:
+            self.version += 1
+
+    def update_channel(self, before, after):
+        """Handle a rename (or any other change): re-evaluate the new name"""
+        self.remove_channel(before)
+        self.add_channel(after)
+
+    def get(self, guild_id):
+        """Matching channels of one guild"""
+        channels = self._guilds.get(guild_id)
+        return list(channels.values()) if channels else []
+
+    def guild_ids(self):
+        return list(self._guilds)
+
+    def items(self):
+        """(guild_id, channel) of every indexed channel"""
+        return [(guild_id, channel) for guild_id, channels in self._guilds.items() for channel in channels.values()]
+
+    def has(self, guild_id, channel_id):
+        channels = self._guilds.get(guild_id)
+        return channels is not None and channel_id in channels
+
+    def __len__(self):
+        return sum(len(channels) for channels in self._guilds.values())
@@ -0,0 +1,136 @@
+"""
+Per-channel and per-guild circuit breakers for the nightly poll run
+A channel (or a whole guild) that keeps answering 403/404 is skipped instead of
+wasting rate-limit budget every night. Open breakers are re-probed on a growing
+schedule and closed early when a permission change suggests the problem is fixed.
+"""
+
+import sqlite3
+import time
+
+CHANNEL = 'channel'
+GUILD = 'guild'
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+FAILURE_THRESHOLD = 3             # consecutive permanent failures before opening
+PROBE_INTERVAL = 3 * 86400        # first re-probe 3 days after opening
+MAX_PROBE_INTERVAL = 30 * 86400   # re-probe at least once a month
+
+# Statuses that say the channel itself is unusable; a 400 only says the body was rejected
+CHANNEL_FAILURE_STATUSES = frozenset({403, 404})
+
+
+def is_channel_failure(status):
+    """True for HTTP statuses that count towards a channel's breaker"""
+    return status in CHANNEL_FAILURE_STATUSES
+
+
+class Breaker:
+    """State of one breaker"""
+
+    __slots__ = ('scope', 'target_id', 'guild_id', 'failures', 'opens', 'state', 'next_probe_at')
+
+    def __init__(self, scope, target_id, guild_id, failures=0, opens=0, state=CLOSED, next_probe_at=0.0):
+        self.scope = scope
+        self.target_id = target_id
+        self.guild_id = guild_id
+        self.failures = failures
+        self.opens = opens
+        self.state = state
+        self.next_probe_at = next_probe_at
+
+
+class CircuitBreakers:
+    """
+    All breakers, kept in memory and persisted to SQLite on every change
+    (changes only happen on failures, recoveries and permission events).
+    """
+
+    def __init__(self, path, threshold=FAILURE_THRESHOLD, probe_interval=PROBE_INTERVAL,
+                 max_probe_interval=MAX_PROBE_INTERVAL):
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS circuit_breakers ('
+            ' scope TEXT NOT NULL,'
+            ' target_id INTEGER NOT NULL,'
+            ' guild_id INTEGER NOT NULL,'
+            ' failures INTEGER NOT NULL,'
+            ' opens INTEGER NOT NULL,'
+            ' state TEXT NOT NULL,'
+            ' next_probe_at REAL NOT NULL,'
+            ' PRIMARY KEY (scope, target_id)'
+            ') WITHOUT ROWID'
+        )
+        self._conn.commit()
+        self._breakers = {
+            (row[0], row[1]): Breaker(*row)
+            for row in self._conn.execute('SELECT * FROM circuit_breakers')
+        }
+
+    def _save(self, breaker):
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO circuit_breakers VALUES (?, ?, ?, ?, ?, ?, ?)',
+                tuple(getattr(breaker, name) for name in Breaker.__slots__))
+
+    def _delete(self, keys):
+        with self._conn:
+            self._conn.executemany('DELETE FROM circuit_breakers WHERE scope = ? AND target_id = ?', keys)
+        for key in keys:
+            self._breakers.pop(key, None)
+
+    def allow(self, scope, target_id, now=None):
+        """True if a request may go out: breaker closed, or open and due for a probe"""
+        breaker = self._breakers.get((scope, target_id))
+        if breaker is None or breaker.state == CLOSED:
+            return True
+        now = time.time() if now is None else now
+        return now >= breaker.next_probe_at
+
+    def is_open(self, scope, target_id):
+        breaker = self._breakers.get((scope, target_id))
+        return breaker is not None and breaker.state == OPEN
+
+    def record_success(self, scope, target_id):
+        if (scope, target_id) in self._breakers:
+            self._delete([(scope, target_id)])
+
+    def record_failure(self, scope, target_id, guild_id, now=None):
+        """
+        Record a permanent failure. Opens the breaker at the threshold;
+        a failed probe re-opens it with a doubled probe interval. Returns the breaker.
+        """
+        now = time.time() if now is None else now
+        breaker = self._breakers.get((scope, target_id))
+        if breaker is None:
+            breaker = self._breakers[(scope, target_id)] = Breaker(scope, target_id, guild_id)
+        breaker.failures += 1
+        if breaker.state == OPEN or breaker.failures >= self.threshold:
+            interval = min(self.max_probe_interval, self.probe_interval * 2 ** breaker.opens)
+            breaker.state = OPEN
+            breaker.opens += 1
+            breaker.next_probe_at = now + interval
+        self._save(breaker)
+        return breaker
+
+    def reset(self, scope, target_id):
+        """Close one breaker (e.g. its permissions changed)"""
+        self.record_success(scope, target_id)
+
+    def reset_guild(self, guild_id):
+        """Close the guild breaker and every channel breaker of that guild"""
+        keys = [key for key, breaker in self._breakers.items() if breaker.guild_id == guild_id]
+        if keys:
+            self._delete(keys)
+
+    def open_count(self, scope=CHANNEL):
+        return sum(1 for (s, _), breaker in self._breakers.items() if s == scope and breaker.state == OPEN)
+
+    def close(self):
+        self._conn.close()
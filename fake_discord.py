@@ -0,0 +1,202 @@
+"""
+Local stand-in for the Discord REST API
+Implements the poll-creation routes (POST /channels/{id}/polls and
+/channels/{id}/messages) with realistic latency, the global 50 req/s limit,
+per-channel rate-limit buckets with X-RateLimit-* headers, 429s with
+Retry-After and 403/404 channels, plus the poll expire route, so DailyPollBot
+can be exercised and benchmarked without a real bot account (see bench_fanout.py).
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from aiohttp import web
+
+API_PREFIX = '/api/v10'
+GLOBAL_RATE_LIMIT = 50
+BUCKET_LIMIT = 5
+BUCKET_WINDOW = 5.0  # seconds
+
+
+def _json(data, status=200, headers=None):
+    # discord.py only parses bodies whose content type is exactly 'application/json'
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                        content_type='application/json')
+
+
+class FakeDiscord:
+    """
+    Fake Discord API server.
+    latency:       mean seconds per request (exponentially distributed around `latency`, at least half of it)
+    global_rate:   requests per second before a global 429
+    forbidden:     channel IDs answered with 403 Missing Permissions
+    missing:       channel IDs answered with 404 Unknown Channel
+    throttle_every: every Nth poll request gets a route 429 (0 = only real limits)
+    """
+
+    def __init__(self, latency=0.04, global_rate=GLOBAL_RATE_LIMIT, forbidden=(), missing=(),
+                 throttle_every=0, retry_after=0.05, seed=None):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.forbidden = {int(channel_id) for channel_id in forbidden}
+        self.missing = {int(channel_id) for channel_id in missing}
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1_000_000_000_000_000_000)
+        self._window_start = 0.0
+        self._window_count = 0
+        self._buckets = {}  # channel_id -> (window start, requests)
+        self._poll_requests = 0
+        self.created = []  # (channel_id, body) of every created poll
+        self.expired = []  # (channel_id, message_id) of every poll ended early
+        self.statuses = {}  # HTTP status -> count
+        self._runner = None
+        self.base_url = None
+
+    async def _delay(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency / 2 + self._random.expovariate(2 / self.latency))
+
+    def _count(self, status):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def rate_limited(self):
+        return self.statuses.get(429, 0)
+
+    def _over_global_limit(self):
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        if self._window_count > self.global_rate:
+            return max(0.001, self._window_start + 1.0 - now)
+        return None
+
+    def _bucket_headers(self, channel_id):
+        """Per-channel bucket: BUCKET_LIMIT requests per BUCKET_WINDOW; returns (headers, retry_after)"""
+        now = time.monotonic()
+        start, used = self._buckets.get(channel_id, (now, 0))
+        if now - start >= BUCKET_WINDOW:
+            start, used = now, 0
+        used += 1
+        self._buckets[channel_id] = (start, used)
+        reset_after = start + BUCKET_WINDOW - now
+        headers = {
+            'X-RateLimit-Bucket': 'fakepollbucket',
+            'X-RateLimit-Limit': str(BUCKET_LIMIT),
+            'X-RateLimit-Remaining': str(max(0, BUCKET_LIMIT - used)),
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+        }
+        return headers, (reset_after if used > BUCKET_LIMIT else None)
+
+    def _rate_limited(self, retry_after, headers=None, is_global=False):
+        self._count(429)
+        headers = dict(headers or {})
+        headers.update({'Retry-After': f'{retry_after:.3f}', 'Via': '1.1 google'})
+        if is_global:
+            headers.update({'X-RateLimit-Global': 'true', 'X-RateLimit-Scope': 'global'})
+        return _json({'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': is_global},
+                     status=429, headers=headers)
+
+    async def create_poll(self, request):
+        # Limits count requests as they arrive, the latency delays the answer
+        channel_id = int(request.match_info['channel_id'])
+        body = await request.json() if request.can_read_body else {}
+        response = self._answer(channel_id, body)
+        await self._delay()
+        return response
+
+    def _answer(self, channel_id, body):
+        retry_after = self._over_global_limit()
+        if retry_after is not None:
+            return self._rate_limited(retry_after, is_global=True)
+        headers, retry_after = self._bucket_headers(channel_id)
+        if retry_after is not None:
+            return self._rate_limited(retry_after, headers)
+        self._poll_requests += 1
+        if self.throttle_every and self._poll_requests % self.throttle_every == 0:
+            return self._rate_limited(self.retry_after, headers)
+        if channel_id in self.missing:
+            self._count(404)
+            return _json({'message': 'Unknown Channel', 'code': 10003}, status=404, headers=headers)
+        if channel_id in self.forbidden:
+            self._count(403)
+            return _json({'message': 'Missing Permissions', 'code': 50013}, status=403, headers=headers)
+        if not body:
+            self._count(400)
+            return _json({'message': 'Invalid Form Body', 'code': 50035}, status=400, headers=headers)
+        self._count(200)
+        self.created.append((channel_id, body))
+        message_id = next(self._message_ids)
+        poll = body.get('poll', body)
+        return _json({'id': str(message_id), 'channel_id': str(channel_id), 'poll': poll}, headers=headers)
+
+    async def expire_poll(self, request):
+        channel_id = int(request.match_info['channel_id'])
+        message_id = int(request.match_info['message_id'])
+        await self._delay()
+        if channel_id in self.missing:
+            return _json({'message': 'Unknown Channel', 'code': 10003}, status=404)
+        self.expired.append((channel_id, message_id))
+        return _json({'id': str(message_id), 'channel_id': str(channel_id)})
+
+    async def current_user(self, request):
+        return _json({'id': '1', 'username': 'fake-bot', 'discriminator': '0', 'avatar': None, 'bot': True})
+
+    async def application(self, request):
+        # What Client.login() reads after the token check
+        return _json({'id': '1', 'name': 'fake-bot', 'description': '', 'icon': None, 'bot_public': True,
+                      'bot_require_code_grant': False, 'verify_key': '', 'flags': 0,
+                      'owner': {'id': '2', 'username': 'owner', 'discriminator': '0', 'avatar': None}})
+
+    async def start(self):
+        """Start listening on a free local port; returns the API base URL (for Route.BASE)"""
+        app = web.Application()
+        app.router.add_get(API_PREFIX + '/users/@me', self.current_user)
+        app.router.add_get(API_PREFIX + '/oauth2/applications/@me', self.application)
+        app.router.add_post(API_PREFIX + '/channels/{channel_id}/polls', self.create_poll)
+        app.router.add_post(API_PREFIX + '/channels/{channel_id}/messages', self.create_poll)
+        app.router.add_post(API_PREFIX + '/channels/{channel_id}/polls/{message_id}/expire', self.expire_poll)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}{API_PREFIX}'
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def state_paths(tmp, schedules_file=None):
+    """DailyPollBot keyword arguments keeping its state files in the directory `tmp`"""
+    return {'state_db': os.path.join(tmp, 'state.db'), 'history_dir': os.path.join(tmp, 'history'),
+            'schedules_file': schedules_file or os.path.join(tmp, 'schedules.json')}
+
+
+def fake_channels(state, count, first_id, per_guild=50, name='votazioni'):
+    """
+    Minimal stand-ins for discord.TextChannel with what the poll run uses:
+    id, name, guild.id and the connection state (whose .http sends the request)
+    """
+    guilds = {}
+    channels = []
+    for offset in range(count):
+        channel_id = first_id + offset
+        guild_id = first_id + offset // per_guild
+        guild = guilds.get(guild_id)
+        if guild is None:
+            guild = guilds[guild_id] = SimpleNamespace(id=guild_id, name=f'guild-{guild_id}')
+        channels.append(SimpleNamespace(id=channel_id, name=f'{name}-{offset}', guild=guild, _state=state))
+    return channels
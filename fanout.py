@@ -0,0 +1,235 @@
+"""
+Concurrent fan-out engine for the daily poll run
+Posts to many channels at once with a bounded concurrency limit, following
+Discord's per-route and global rate-limit buckets instead of a fixed sleep.
+"""
+
+import asyncio
+import hashlib
+import math
+import time
+
+# Discord allows 50 requests per second per bot across all routes
+GLOBAL_RATE_LIMIT = 50
+DEFAULT_CONCURRENCY = 10
+# Requests the global bucket lets through back to back
+GLOBAL_BURST = 1.0
+
+POLL_ROUTE = 'POST /channels/{channel_id}/polls'
+
+
+def poll_route_key(channel_id):
+    """Rate-limit key for the poll route (channel_id is the major parameter)"""
+    return f'{POLL_ROUTE}:{channel_id}'
+
+
+def stagger_offset(channel_id, window):
+    """
+    Deterministic delay in [0, window) seconds for a channel inside the posting window.
+    Hashed from the channel ID (snowflakes aren't uniform in their low bits), so a
+    channel keeps its slot across restarts and processes.
+    """
+    if window <= 0:
+        return 0.0
+    digest = hashlib.blake2b(str(channel_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64 * window
+
+
+def _now():
+    return asyncio.get_running_loop().time()
+
+
+class RateLimitBucket:
+    """State of one Discord rate-limit bucket, as reported by the response headers"""
+
+    def __init__(self):
+        self.limit = 1
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+def shard_rate(shard_ids, shard_count, global_rate=GLOBAL_RATE_LIMIT):
+    """
+    Share of the global rate limit for a process running `shard_ids` of `shard_count`:
+    the limit applies to the bot token, so the processes' shares add up to global_rate
+    """
+    if shard_ids is None or not shard_count:
+        return global_rate
+    return global_rate * len(shard_ids) / shard_count
+
+
+class RateLimiter:
+    """
+    Client-side view of Discord's rate limits.
+    Per-route buckets are filled from the X-RateLimit-* response headers,
+    the global limit is a token bucket refilled at `global_rate` requests per second.
+    The bucket holds a single token, so requests are paced 1/global_rate apart and no
+    rolling second goes over the limit (a full bucket of `global_rate` tokens would let
+    the midnight burst send twice the limit in its first second).
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE_LIMIT):
+        self.global_rate = global_rate
+        self._tokens = GLOBAL_BURST
+        self._last_refill = None
+        self._global_reset_at = 0.0
+        self._global_lock = asyncio.Lock()
+        self._buckets = {}          # bucket key -> RateLimitBucket
+        self._route_to_bucket = {}  # route key -> bucket key (from X-RateLimit-Bucket)
+        self.hits_429 = 0
+
+    def _bucket(self, route_key):
+        key = self._route_to_bucket.get(route_key, route_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RateLimitBucket()
+        return bucket
+
+    async def acquire(self, route_key):
+        """Wait until a request on `route_key` is allowed by both its bucket and the global limit"""
+        bucket = self._bucket(route_key)
+        async with bucket.lock:
+            if bucket.remaining <= 0:
+                delay = bucket.reset_at - _now()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                bucket.remaining = bucket.limit
+            bucket.remaining -= 1
+        await self._acquire_global()
+
+    async def _acquire_global(self):
+        async with self._global_lock:
+            while True:
+                now = _now()
+                if self._global_reset_at > now:
+                    await asyncio.sleep(self._global_reset_at - now)
+                    continue
+                if self._last_refill is not None:
+                    refill = (now - self._last_refill) * self.global_rate
+                    self._tokens = min(GLOBAL_BURST, self._tokens + refill)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.global_rate)
+
+    def update(self, route_key, headers):
+        """Record the bucket state Discord reported for `route_key`"""
+        if not headers:
+            return
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash:
+            # Routes sharing a Discord bucket hash share limits per major parameter
+            key = f'{bucket_hash}:{route_key.rpartition(":")[2]}'
+            if self._route_to_bucket.get(route_key) != key:
+                self._route_to_bucket[route_key] = key
+                previous = self._buckets.pop(route_key, None)
+                if key not in self._buckets:
+                    self._buckets[key] = previous or RateLimitBucket()
+        bucket = self._bucket(route_key)
+        if 'X-RateLimit-Limit' in headers:
+            bucket.limit = int(headers['X-RateLimit-Limit'])
+        if 'X-RateLimit-Remaining' in headers:
+            bucket.remaining = int(headers['X-RateLimit-Remaining'])
+        if 'X-RateLimit-Reset-After' in headers:
+            bucket.reset_at = _now() + float(headers['X-RateLimit-Reset-After'])
+
+    def occupancy(self):
+        """Snapshot for the metrics: tokens left in the global bucket, route buckets tracked and exhausted"""
+        now = _now()
+        tokens = self._tokens
+        if self._last_refill is not None:
+            tokens = min(GLOBAL_BURST, tokens + (now - self._last_refill) * self.global_rate)
+        exhausted = sum(1 for bucket in self._buckets.values() if bucket.remaining <= 0 and bucket.reset_at > now)
+        return {'global_tokens': tokens, 'buckets': len(self._buckets), 'exhausted': exhausted}
+
+    def on_429(self, route_key, headers):
+        """Handle a 429 response: block the route bucket or every request, returns the retry delay"""
+        self.hits_429 += 1
+        headers = headers or {}
+        retry_after = float(headers.get('Retry-After', 1))
+        is_global = (str(headers.get('X-RateLimit-Global', '')).lower() == 'true'
+                     or headers.get('X-RateLimit-Scope') == 'global')
+        if is_global:
+            self._global_reset_at = max(self._global_reset_at, _now() + retry_after)
+        else:
+            self.update(route_key, headers)
+            bucket = self._bucket(route_key)
+            bucket.remaining = 0
+            bucket.reset_at = _now() + retry_after
+        return retry_after
+
+
+class FanOutStats:
+    """Counters and timings for one fan-out run"""
+
+    def __init__(self, total):
+        self.total = total
+        self.created = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self.latencies = []  # seconds from each item's slot (or the run start) to its completion
+
+    @property
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def throughput(self):
+        """Completed posts per second"""
+        elapsed = self.elapsed
+        done = self.created + self.failed
+        return done / elapsed if elapsed > 0 else 0.0
+
+    def percentile(self, p):
+        """Nearest-rank percentile of the post latencies (0.0 without any)"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+
+async def fan_out(items, worker, concurrency=DEFAULT_CONCURRENCY, start_at=None):
+    """
+    Run `await worker(item)` for every item with at most `concurrency` in flight.
+    The worker returns True on success and False on failure.
+    With `start_at(item)` (a loop.time() value) no item starts before its time:
+    items are taken in start order and the run becomes a steady stream instead of a burst.
+    """
+    items = list(items)
+    stats = FanOutStats(len(items))
+    run_start = _now()
+    if start_at is not None:
+        # Slots already past (e.g. a late catch-up) start right away
+        scheduled = sorted(((max(run_start, start_at(item)), item) for item in items), key=lambda pair: pair[0])
+    else:
+        scheduled = [(run_start, item) for item in items]
+    pending = iter(scheduled)
+
+    async def run_worker():
+        # All workers share one iterator, so each item is taken exactly once
+        for ready_at, item in pending:
+            delay = ready_at - _now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                ok = await worker(item)
+            except Exception:
+                ok = False
+            stats.latencies.append(_now() - ready_at)
+            if ok:
+                stats.created += 1
+            else:
+                stats.failed += 1
+
+    workers = min(max(1, concurrency), len(items))
+    await asyncio.gather(*(run_worker() for _ in range(workers)))
+    stats.finished = time.perf_counter()
+    return stats
@@ -0,0 +1,77 @@
+"""
+Hot reload of the per-guild/per-channel configuration (SCHEDULES_FILE)
+The file is only stat()ed on the event loop; when it changes it is parsed in a
+worker thread and the bot swaps in the new ScheduleTable in one assignment,
+so lookups stay two dict gets and a run in progress keeps the settings it
+started with. An invalid file is reported and the previous configuration kept.
+"""
+
+import asyncio
+import logging
+import os
+import re
+
+from channel_index import ChannelMatcher
+from scheduler import load_schedules
+
+RELOAD_INTERVAL = 5.0  # seconds between two checks of the file
+
+log = logging.getLogger('dailypoll.config')
+
+
+def file_signature(path):
+    """(mtime, size, inode) of the file, None when it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def channel_matchers(table):
+    """Guild ID -> ChannelMatcher of the guilds with their own channel_patterns"""
+    return {
+        schedule.key[1]: ChannelMatcher.from_string(schedule.channel_patterns)
+        for schedule in table
+        if schedule.key[0] == 'guild' and schedule.channel_patterns
+    }
+
+
+class ConfigWatcher:
+    """Loads SCHEDULES_FILE and reloads it whenever its signature changes"""
+
+    def __init__(self, path, default, interval=RELOAD_INTERVAL):
+        self.path = path
+        self.default = default
+        self.interval = interval
+        self.signature = None
+        self.reloads = 0
+
+    def load(self):
+        """Parse the file (raises on an invalid one); returns (ScheduleTable, guild channel matchers)"""
+        signature = file_signature(self.path)
+        table = load_schedules(self.path, self.default)
+        matchers = channel_matchers(table)
+        self.signature = signature
+        return table, matchers
+
+    def changed(self):
+        return file_signature(self.path) != self.signature
+
+    async def watch(self, apply):
+        """Background task: call apply(table, matchers) after each successful reload"""
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.changed():
+                continue
+            try:
+                table, matchers = await asyncio.to_thread(self.load)
+            except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+                self.signature = file_signature(self.path)  # Don't retry until the file changes again
+                log.error(f"[ERROR] {self.path} not reloaded, keeping the current settings: {e}",
+                          extra={'event': 'config_error', 'path': self.path})
+                continue
+            apply(table, matchers)
+            self.reloads += 1
+            log.info(f"[INFO] Reloaded {self.path}: {len(table.by_key) - 1} server(s)/channel(s) configured",
+                     extra={'event': 'config_reload', 'path': self.path})
@@ -0,0 +1,151 @@
+"""
+Poll-close harvester
+When a poll expires, its final voter lists are fetched page by page for every
+answer of every closed poll at once, bounded by one semaphore, and the
+results are stored so each poll is harvested exactly once (also across restarts).
+"""
+
+import asyncio
+import sqlite3
+import time
+from array import array
+
+VOTERS_PAGE_SIZE = 100  # Discord's maximum for GET .../polls/{message_id}/answers/{answer_id}
+DEFAULT_HARVEST_CONCURRENCY = 10
+VOTERS_PATH = '/channels/{channel_id}/polls/{message_id}/answers/{answer_id}'
+
+
+class PollResult:
+    """Final voters of one poll: voters[i] = user IDs of answer ID i + 1"""
+
+    __slots__ = ('channel_id', 'message_id', 'poll_date', 'voters', 'error')
+
+    def __init__(self, channel_id, message_id, poll_date, voters, error=None):
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.poll_date = poll_date
+        self.voters = voters
+        self.error = error
+
+    @property
+    def counts(self):
+        return [len(user_ids) for user_ids in self.voters]
+
+    @property
+    def voter_count(self):
+        """Distinct users who voted (multi-select: one user can vote for several answers)"""
+        return len(set().union(*self.voters)) if self.voters else 0
+
+    def winners(self, answers):
+        """Answers with the most votes (several on a tie, none without votes)"""
+        counts = self.counts
+        best = max(counts, default=0)
+        if best == 0:
+            return []
+        return [answer for answer, count in zip(answers, counts) if count == best]
+
+
+async def fetch_voters(fetch_page, semaphore, channel_id, message_id, answer_id, page_size=VOTERS_PAGE_SIZE):
+    """
+    All user IDs that voted for one answer. Pages depend on each other (`after` = last ID),
+    so they are fetched in order; the semaphore is held per request only.
+    """
+    user_ids = []
+    after = None
+    while True:
+        async with semaphore:
+            users = await fetch_page(channel_id, message_id, answer_id, after, page_size)
+        user_ids.extend(int(user['id']) for user in users)
+        if len(users) < page_size:
+            return user_ids
+        after = user_ids[-1]
+
+
+async def harvest(polls, fetch_page, answer_count, concurrency=DEFAULT_HARVEST_CONCURRENCY):
+    """
+    Fetch the voters of every answer of every (channel_id, message_id, poll_date) poll
+    concurrently, with at most `concurrency` requests in flight.
+    answer_count is the number of answers, or a function of the channel ID returning it.
+    A poll whose fetch fails is returned with `error` set instead of voters.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def harvest_one(channel_id, message_id, poll_date):
+        count = answer_count(channel_id) if callable(answer_count) else answer_count
+        try:
+            voters = await asyncio.gather(*(
+                fetch_voters(fetch_page, semaphore, channel_id, message_id, answer_id)
+                for answer_id in range(1, count + 1)
+            ))
+        except Exception as e:
+            return PollResult(channel_id, message_id, poll_date, [], error=e)
+        return PollResult(channel_id, message_id, poll_date, list(voters))
+
+    return await asyncio.gather(*(harvest_one(*poll) for poll in polls))
+
+
+def format_summary(result, answers, date_str):
+    """Results message posted in the poll's channel"""
+    winners = result.winners(answers)
+    if not winners:
+        return f"📊 Results {date_str}: no votes"
+    best = max(result.counts)
+    lines = [f"📊 Results {date_str}: **{', '.join(winners)}** with {best} vote(s) "
+             f"({result.voter_count} voter(s))"]
+    lines.append(' · '.join(f"{answer}: {count}" for answer, count in zip(answers, result.counts)))
+    return '\n'.join(lines)
+
+
+class ResultStore:
+    """SQLite table of harvested polls: final counts per answer, one row per poll message"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS poll_results ('
+            ' message_id INTEGER PRIMARY KEY,'
+            ' channel_id INTEGER NOT NULL,'
+            ' poll_date TEXT NOT NULL,'
+            ' counts BLOB,'
+            ' voters INTEGER NOT NULL,'
+            ' harvested_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        self._conn.commit()
+
+    def harvested(self, message_ids):
+        """The subset of `message_ids` that already have a stored result"""
+        message_ids = list(message_ids)
+        found = set()
+        for start in range(0, len(message_ids), 500):
+            chunk = message_ids[start:start + 500]
+            rows = self._conn.execute(
+                f'SELECT message_id FROM poll_results WHERE message_id IN ({",".join("?" * len(chunk))})', chunk)
+            found.update(row[0] for row in rows)
+        return found
+
+    def save(self, results):
+        """Store harvested results in one transaction (counts NULL = poll no longer reachable)"""
+        now = time.time()
+        rows = [
+            (result.message_id, result.channel_id, result.poll_date,
+             None if result.error else array('I', result.counts).tobytes(), result.voter_count, now)
+            for result in results
+        ]
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO poll_results VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def counts(self, message_id):
+        """Stored final counts of one poll, or None"""
+        row = self._conn.execute('SELECT counts FROM poll_results WHERE message_id = ?', (message_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        counts = array('I')
+        counts.frombytes(row[0])
+        return list(counts)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,174 @@
+"""
+Vectorized analytics over the poll history (poll_history.py)
+The column files are memory-mapped as NumPy arrays: a query builds a boolean
+row mask and reduces the counts matrix, no per-poll Python objects are created.
+
+Usage: python history_analytics.py [channel name] [--weekends]
+"""
+
+import os
+import sys
+from datetime import timedelta
+
+import numpy as np
+
+from poll_history import COLUMNS, EPOCH, committed_rows, day_number, history_parts, read_channels, read_meta
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+WEEKEND = (5, 6)
+_DTYPES = {'i': '<i4', 'I': '<u4'}
+
+
+def _map_column(path, name, typecode, rows, width=1):
+    shape = (rows, width) if width > 1 else (rows,)
+    if rows == 0:
+        return np.zeros(shape, dtype=_DTYPES[typecode])
+    return np.memmap(os.path.join(path, name), dtype=_DTYPES[typecode], mode='r', shape=shape)
+
+
+def _read_part(path, answers):
+    """(columns, channel dictionary) of one history directory"""
+    rows = committed_rows(path, answers)
+    columns = {name: _map_column(path, name, typecode, rows, len(answers) if name == 'counts.u32' else 1)
+               for name, typecode in COLUMNS}
+    return columns, read_channels(path)
+
+
+class PollHistory:
+    """
+    Read-only, memory-mapped view of a history directory. The parts written
+    by shard processes are concatenated (in memory) with the main directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        parts = history_parts(path) or [path]
+        self.answers = read_meta(parts[0])['answers']
+        for part in parts[1:]:
+            if read_meta(part)['answers'] != self.answers:
+                raise ValueError(f"History in {part} has answers {read_meta(part)['answers']}, not {self.answers}")
+        loaded = [_read_part(part, self.answers) for part in parts]
+        if len(loaded) == 1:
+            columns, channels = loaded[0]
+        else:
+            # Channel indexes of each part point into that part's dictionary: shift them past the earlier ones
+            offsets = np.cumsum([0] + [len(part_channels) for _, part_channels in loaded[:-1]])
+            columns = {name: np.concatenate([part_columns[name] for part_columns, _ in loaded])
+                       for name, _ in COLUMNS}
+            columns['channel.i32'] = np.concatenate([part_columns['channel.i32'] + np.int32(offset)
+                                                     for (part_columns, _), offset in zip(loaded, offsets)])
+            channels = [entry for _, part_channels in loaded for entry in part_channels]
+        self.rows = len(columns['day.i32'])
+        self.day = columns['day.i32']
+        self.channel = columns['channel.i32']
+        self.counts = columns['counts.u32']
+        self.voters = columns['voters.u32']
+        # 1970-01-01 was a Thursday: Monday = 0
+        self.weekday = (self.day + 3) % 7
+        self.channel_ids = np.array([entry['channel_id'] for entry in channels], dtype=np.uint64)
+        self.guild_ids = np.array([entry['guild_id'] for entry in channels], dtype=np.uint64)
+        self.channel_names = [entry['name'] for entry in channels]
+
+    def channel_indexes(self, channel):
+        """Dictionary indexes of a channel given by ID or name (a name can exist in several guilds)"""
+        if isinstance(channel, str):
+            return np.array([i for i, name in enumerate(self.channel_names) if name == channel], dtype=np.int32)
+        return np.flatnonzero(self.channel_ids == np.uint64(channel)).astype(np.int32)
+
+    def select(self, channel=None, guild_id=None, start=None, end=None, weekdays=None):
+        """Boolean row mask; start/end are inclusive dates or 'YYYY-MM-DD' strings"""
+        mask = np.ones(self.rows, dtype=bool)
+        if channel is not None:
+            mask &= np.isin(self.channel, self.channel_indexes(channel))
+        if guild_id is not None:
+            mask &= np.isin(self.channel, np.flatnonzero(self.guild_ids == np.uint64(guild_id)))
+        if start is not None:
+            mask &= self.day >= day_number(start)
+        if end is not None:
+            mask &= self.day <= day_number(end)
+        if weekdays is not None:
+            mask &= np.isin(self.weekday, weekdays)
+        return mask
+
+    def totals(self, mask=None):
+        """Votes per answer over the selected polls"""
+        counts = self.counts if mask is None else self.counts[mask]
+        return counts.sum(axis=0, dtype=np.int64)
+
+    def wins(self, mask=None):
+        """Polls won per answer (every answer sharing the top count wins; polls without votes don't count)"""
+        counts = self.counts if mask is None else self.counts[mask]
+        best = counts.max(axis=1, initial=0)
+        return ((counts == best[:, None]) & (best[:, None] > 0)).sum(axis=0)
+
+    def top_answer(self, mask=None):
+        """(answer, polls won) of the answer that wins most often, None without votes"""
+        wins = self.wins(mask)
+        if not wins.any():
+            return None
+        best = int(wins.argmax())
+        return self.answers[best], int(wins[best])
+
+    def heatmap(self, mask=None):
+        """7 x answers matrix: votes per weekday (Monday first) and answer"""
+        counts = self.counts if mask is None else self.counts[mask]
+        weekday = self.weekday if mask is None else self.weekday[mask]
+        width = len(self.answers)
+        cells = (weekday.astype(np.int64)[:, None] * width + np.arange(width)).ravel()
+        return np.bincount(cells, weights=counts.ravel(), minlength=7 * width).reshape(7, width).astype(np.int64)
+
+    def trend(self, mask=None, period_days=7):
+        """(first day of each period, periods x answers votes) in periods of `period_days` days"""
+        counts = self.counts if mask is None else self.counts[mask]
+        day = self.day if mask is None else self.day[mask]
+        if len(day) == 0:
+            return [], np.zeros((0, len(self.answers)), dtype=np.int64)
+        first = int(day.min())
+        period = (day - first) // period_days
+        periods = int(period.max()) + 1
+        width = len(self.answers)
+        cells = (period.astype(np.int64)[:, None] * width + np.arange(width)).ravel()
+        totals = np.bincount(cells, weights=counts.ravel(), minlength=periods * width)
+        starts = [EPOCH + timedelta(days=first + i * period_days) for i in range(periods)]
+        return starts, totals.reshape(periods, width).astype(np.int64)
+
+    def ranking(self, mask=None, top=10):
+        """Most active channels: [(channel_id, name, polls, average voters per poll)], best first"""
+        channel = self.channel if mask is None else self.channel[mask]
+        voters = self.voters if mask is None else self.voters[mask]
+        size = len(self.channel_names)
+        polls = np.bincount(channel, minlength=size)
+        total = np.bincount(channel, weights=voters, minlength=size)
+        average = np.divide(total, polls, out=np.zeros(size), where=polls > 0)
+        order = np.argsort(-average, kind='stable')[:top]
+        return [(int(self.channel_ids[i]), self.channel_names[i], int(polls[i]), float(average[i]))
+                for i in order if polls[i] > 0]
+
+
+def main():
+    from bot import HISTORY_DIR
+    if not history_parts(HISTORY_DIR):
+        print(f"[ERROR] No poll history in {HISTORY_DIR} yet")
+        return 1
+    history = PollHistory(HISTORY_DIR)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    weekdays = WEEKEND if '--weekends' in sys.argv else None
+    mask = history.select(channel=args[0] if args else None, weekdays=weekdays)
+    scope = (args[0] if args else 'all channels') + (' on weekends' if weekdays else '')
+
+    print(f"\n📊 {int(mask.sum())} poll(s) in {scope}")
+    top = history.top_answer(mask)
+    if top:
+        print(f"   🏆 Most frequent winner: {top[0]} ({top[1]} poll(s))")
+    print(f"\n   {'':4}" + ''.join(f'{answer:>6}' for answer in history.answers))
+    for weekday, row in zip(WEEKDAYS, history.heatmap(mask)):
+        print(f"   {weekday:4}" + ''.join(f'{value:>6}' for value in row))
+    if not args:
+        print("\n   Most active channels:")
+        for channel_id, name, polls, average in history.ranking(mask):
+            print(f"   - #{name} ({channel_id}): {average:.1f} voter(s) per poll over {polls} poll(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
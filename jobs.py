@@ -0,0 +1,105 @@
+"""
+Background jobs started by the admin slash commands (admin_commands.py)
+A job is an asyncio task with counters the command reads to show progress.
+The tracker keeps the running jobs and the last few finished ones per guild,
+and runs at most one job of each kind per guild at a time.
+"""
+
+import asyncio
+import itertools
+import time
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+KEEP_FINISHED = 20  # finished jobs remembered (for /poll status)
+
+
+class Job:
+    """Progress of one bulk operation over `total` channels"""
+
+    def __init__(self, job_id, kind, guild_id, total):
+        self.id = job_id
+        self.kind = kind
+        self.guild_id = guild_id
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.state = RUNNING
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def done(self):
+        return self.succeeded + self.failed + self.skipped
+
+    def describe(self):
+        """One-line status shown to the admin"""
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        line = (f"Job #{self.id} {self.kind}: {self.done}/{self.total} channel(s) "
+                f"({self.succeeded} ok, {self.failed} failed, {self.skipped} skipped) in {elapsed:.0f}s")
+        if self.state == RUNNING:
+            return f"⏳ {line}"
+        if self.state == FAILED:
+            return f"❌ {line}: {self.error}"
+        return f"✅ {line}"
+
+
+class JobTracker:
+    """Starts jobs as tasks and remembers them; one running job per (guild, kind)"""
+
+    def __init__(self, keep_finished=KEEP_FINISHED):
+        self.keep_finished = keep_finished
+        self._ids = itertools.count(1)
+        self._jobs = {}  # job id -> Job, oldest first
+
+    def running(self, guild_id, kind):
+        return next((job for job in self._jobs.values()
+                     if job.guild_id == guild_id and job.kind == kind and job.state == RUNNING), None)
+
+    def for_guild(self, guild_id):
+        """Jobs of a guild, newest first"""
+        return [job for job in reversed(self._jobs.values()) if job.guild_id == guild_id]
+
+    def start(self, kind, guild_id, total, work):
+        """
+        Run `await work(job)` in the background; work updates the job's counters.
+        Returns the new Job, or None when the same kind of job already runs for the guild.
+        """
+        if self.running(guild_id, kind) is not None:
+            return None
+        job = Job(next(self._ids), kind, guild_id, total)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work), name=f'job-{job.id}-{kind}')
+        return job
+
+    async def _run(self, job, work):
+        try:
+            await work(job)
+            job.state = DONE
+        except asyncio.CancelledError:
+            job.state, job.error = FAILED, 'cancelled'
+            raise
+        except Exception as e:
+            job.state, job.error = FAILED, str(e) or type(e).__name__
+        finally:
+            job.finished_at = time.time()
+            self._forget_old()
+
+    def _forget_old(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state != RUNNING]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    async def wait(self, job):
+        """Wait for a job to finish (without raising its error)"""
+        await asyncio.gather(job.task, return_exceptions=True)
+
+    async def cancel_all(self):
+        running = [job.task for job in self._jobs.values() if job.state == RUNNING]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
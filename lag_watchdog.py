@@ -0,0 +1,252 @@
+"""
+Event-loop lag watchdog
+A heartbeat task on the event loop stamps the time every HEARTBEAT_INTERVAL.
+A watchdog thread checks the stamp; once the loop is late by more than the
+threshold (something is blocking it) the thread samples the loop thread's
+stack every few milliseconds until the loop recovers, then writes the
+aggregated stacks, the running task and the GC time of the stall to
+<directory>/<run id>-<time>.json. Slow runs can be diagnosed afterwards
+without reproducing them:
+
+    python lag_watchdog.py lag_profiles/<file>.json
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+HEARTBEAT_INTERVAL = 0.05  # seconds between two heartbeats of the loop
+SAMPLE_INTERVAL = 0.005  # seconds between two stack samples during a stall
+MAX_PROFILES = 50  # oldest profiles are deleted beyond this
+MAX_DEPTH = 64  # frames kept per sample, innermost first
+
+log = logging.getLogger('dailypoll.watchdog')
+
+
+def _stack(frame):
+    """Frames of a stack, outermost first, as 'file:function:line'"""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+def _describe_task(task):
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f'{task.get_name()} ({getattr(coro, "__qualname__", coro)})'
+
+
+class _Stall:
+    def __init__(self, run_id, lag, gc_seconds, task):
+        self.run_id = run_id or 'idle'
+        self.started = time.time() - lag
+        self.lag = lag
+        self.gc_at_start = gc_seconds
+        self.task = task
+        self.samples = Counter()
+
+
+class LagWatchdog:
+    """
+    Detects event-loop stalls longer than `threshold` seconds and profiles them.
+    threshold 0 disables it. labelled() names the profiles after a run ID. Labels
+    are kept per task (tasks created inside the block inherit them), so runs and
+    jobs overlapping on the loop each get their own; the watchdog thread looks up
+    the task running when the stall starts.
+    """
+
+    def __init__(self, directory, threshold=0.5, sample_interval=SAMPLE_INTERVAL,
+                 heartbeat_interval=HEARTBEAT_INTERVAL, max_profiles=MAX_PROFILES):
+        self.directory = directory
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.max_profiles = max_profiles
+        self.profiles = []  # paths written by this process
+        self._loop = None
+        self._loop_thread = None
+        self._beat = None
+        self._gc_seconds = 0.0
+        self._gc_started = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._heartbeat_task = None
+        self._labels = {}  # task -> run ID
+        self._previous_factory = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def start(self):
+        """Start the heartbeat and the watchdog thread; call from the event loop"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        gc.callbacks.append(self._on_gc)
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='lag-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._heartbeat_task.cancel()
+        if self._loop.get_task_factory() == self._task_factory:
+            self._loop.set_task_factory(self._previous_factory)
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def labelled(self, run_id):
+        """Context manager naming the profiles of stalls inside the block after `run_id`"""
+        return _Label(self, run_id)
+
+    def run_id(self, task):
+        """Run ID of `task` (None outside labelled blocks)"""
+        return self._labels.get(task)
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        run_id = self._labels.get(asyncio.current_task(loop))
+        if run_id is not None:
+            self._labels[task] = run_id
+            task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task):
+        self._labels.pop(task, None)
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _on_gc(self, phase, info):
+        # Only collections on the loop thread stall the loop
+        if threading.get_ident() != self._loop_thread:
+            return
+        if phase == 'start':
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            self._gc_seconds += time.perf_counter() - self._gc_started
+            self._gc_started = None
+
+    def _lag(self):
+        return time.monotonic() - self._beat - self.heartbeat_interval
+
+    def _watch(self):
+        stall = None
+        while not self._stop.wait(self.sample_interval):
+            lag = self._lag()
+            if lag > self.threshold:
+                if stall is None:
+                    task = asyncio.current_task(self._loop)
+                    stall = _Stall(self.run_id(task), lag, self._gc_seconds, _describe_task(task))
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    stall.samples[_stack(frame)] += 1
+                del frame
+            elif stall is not None:
+                self._write(stall)
+                stall = None
+        if stall is not None:
+            self._write(stall)
+
+    def _write(self, stall):
+        duration = time.time() - stall.started
+        run_id = stall.run_id
+        started = datetime.fromtimestamp(stall.started, timezone.utc)
+        profile = {
+            'run_id': run_id,
+            'started': started.isoformat(timespec='milliseconds'),
+            'duration': round(duration, 4),
+            'threshold': self.threshold,
+            'gc_seconds': round(self._gc_seconds - stall.gc_at_start, 4),
+            'task': stall.task,
+            'samples': sum(stall.samples.values()),
+            'sample_interval': self.sample_interval,
+            'stacks': [{'count': count, 'frames': list(frames)} for frames, count in stall.samples.most_common()],
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)}-{started.strftime('%Y%m%dT%H%M%S.%f')}.json"
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=1)
+        self.profiles.append(path)
+        self._prune()
+        top = profile['stacks'][0]['frames'][-1] if profile['stacks'] else 'no sample'
+        log.warning(f"[WARNING] Event loop blocked for {duration:.2f}s (at {top}), profile written to {path}",
+                    extra={'event': 'loop_stall', 'run_id': run_id, 'duration_s': round(duration, 3),
+                           'gc_seconds': profile['gc_seconds'], 'profile': path})
+
+    def _prune(self):
+        files = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:max(0, len(files) - self.max_profiles)]:
+            os.remove(entry.path)
+
+
+class _Label:
+    def __init__(self, watchdog, run_id):
+        self.watchdog = watchdog
+        self.run_id = run_id
+
+    def __enter__(self):
+        self.task = asyncio.current_task()
+        labels = self.watchdog._labels
+        self.previous = labels.get(self.task)
+        labels[self.task] = self.run_id
+        return self.watchdog
+
+    def __exit__(self, *exc_info):
+        labels = self.watchdog._labels
+        if self.previous is None:
+            labels.pop(self.task, None)
+        else:
+            labels[self.task] = self.previous
+        return False
+
+
+def main():
+    """Print a profile: where the loop was blocked, hottest stacks first"""
+    if len(sys.argv) < 2:
+        print("Usage: python lag_watchdog.py <profile.json>")
+        return 1
+    with open(sys.argv[1], encoding='utf-8') as f:
+        profile = json.load(f)
+    print(f"\n⏱️ Run {profile['run_id']}: loop blocked {profile['duration']:.2f}s from {profile['started']}")
+    print(f"   Task: {profile['task'] or 'none (callback)'}; GC: {profile['gc_seconds']:.3f}s; "
+          f"{profile['samples']} sample(s)")
+    for stack in profile['stacks'][:5]:
+        share = stack['count'] / profile['samples'] * 100 if profile['samples'] else 0
+        print(f"\n   {share:.0f}% of samples:")
+        for frame in stack['frames'][-8:]:
+            print(f"      {frame}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Durable idempotency ledger for the daily polls
+One SQLite row per (channel_id, Italian date) that already got its poll, so a
+restart around midnight neither skips the day nor posts it twice.
+"""
+
+import sqlite3
+import time
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+CACHED_DATES = 4  # schedules in different timezones can be on different dates
+
+
+def shard_rows(shard_ids, shard_count, include_unknown=False):
+    """
+    WHERE clause and parameters selecting the rows of the guilds on `shard_ids`
+    (all rows without sharding). include_unknown also selects rows without a
+    guild_id (written before the column existed), for the process with shard 0.
+    """
+    if shard_ids is None or not shard_count:
+        return '1', ()
+    marks = ', '.join('?' * len(shard_ids))
+    clause = f'((guild_id >> 22) % ?) IN ({marks})'
+    if include_unknown and 0 in shard_ids:
+        clause = f'({clause} OR guild_id IS NULL)'
+    return clause, (shard_count, *shard_ids)
+
+
+def add_guild_column(conn, table):
+    """Add the nullable guild_id column to a table created before it existed"""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if 'guild_id' not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN guild_id INTEGER')
+
+
+class PollLedger:
+    """
+    Posted-poll ledger. Lookups are served from in-memory sets of the
+    recent dates; new records are written in batched transactions.
+    With shard_ids/shard_count (shard_launcher.py) posted_since only returns
+    the polls of this process's guilds.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 shard_ids=None, shard_count=None):
+        self.path = path
+        self.shard_ids = list(shard_ids) if shard_ids is not None and shard_count else None
+        self.shard_count = shard_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path)
+        # WAL + NORMAL: commits are durable against crashes of the bot, disk syncs only at checkpoints
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS posted_polls ('
+            ' channel_id INTEGER NOT NULL,'
+            ' poll_date TEXT NOT NULL,'
+            ' message_id INTEGER,'
+            ' posted_at REAL NOT NULL,'
+            ' guild_id INTEGER,'
+            ' PRIMARY KEY (channel_id, poll_date)'
+            ') WITHOUT ROWID'
+        )
+        add_guild_column(self._conn, 'posted_polls')
+        self._conn.commit()
+        self._cached = {}  # poll date -> set of channel IDs
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.commits = 0
+
+    def posted_channels(self, poll_date):
+        """Channel IDs that already have the poll of `poll_date` (loaded once per date)"""
+        posted = self._cached.get(poll_date)
+        if posted is None:
+            rows = self._conn.execute('SELECT channel_id FROM posted_polls WHERE poll_date = ?', (poll_date,))
+            posted = {row[0] for row in rows}
+            posted.update(channel_id for channel_id, day, *_ in self._pending if day == poll_date)
+            if len(self._cached) >= CACHED_DATES:
+                del self._cached[min(self._cached)]  # oldest date
+            self._cached[poll_date] = posted
+        return posted
+
+    def is_posted(self, channel_id, poll_date):
+        return channel_id in self.posted_channels(poll_date)
+
+    def record(self, channel_id, poll_date, message_id=None, guild_id=None, now=None):
+        """Mark a poll as posted at `now` (epoch, default the current time); written to disk with the next batch"""
+        now = time.time() if now is None else now
+        self._pending.append((channel_id, poll_date, message_id, now, guild_id))
+        if poll_date in self._cached:
+            self._cached[poll_date].add(channel_id)
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def posted_since(self, since):
+        """
+        (channel_id, poll_date, message_id, posted_at, guild_id) of the polls posted
+        after `since` (epoch) with a known message
+        """
+        self.flush()
+        where, params = shard_rows(self.shard_ids, self.shard_count, include_unknown=True)
+        return self._conn.execute(
+            'SELECT channel_id, poll_date, message_id, posted_at, guild_id FROM posted_polls'
+            f' WHERE posted_at >= ? AND message_id IS NOT NULL AND {where}', (since, *params)).fetchall()
+
+    def message_id(self, channel_id, poll_date):
+        """Message ID of the poll posted in a channel for `poll_date` (None if unknown or not posted)"""
+        self.flush()
+        row = self._conn.execute('SELECT message_id FROM posted_polls WHERE channel_id = ? AND poll_date = ?',
+                                 (channel_id, poll_date)).fetchone()
+        return row[0] if row else None
+
+    def flush(self):
+        """Write all pending records in one transaction"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO posted_polls (channel_id, poll_date, message_id, posted_at, guild_id)'
+                ' VALUES (?, ?, ?, ?, ?)', self._pending)
+        self._pending = []
+        self.commits += 1
+
+    def close(self):
+        self.flush()
+        self._conn.close()
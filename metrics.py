@@ -0,0 +1,289 @@
+"""
+Metrics for the poll pipeline, served in the Prometheus text format
+Counters, gauges and histograms are plain Python objects updated in place
+(a dict lookup and an add per observation), so recording stays on in
+production. MetricsServer exposes them on a small local aiohttp endpoint
+(aiohttp.web is only imported when it starts):
+
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import asyncio
+import bisect
+import math
+import os
+import time
+
+# Seconds; covers a 1ms channel lookup up to a 10s rate-limited request
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_INTERVAL = 0.5  # seconds between two event-loop lag samples
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _process_start():
+    """time.perf_counter() value when the process started (from /proc; elsewhere when this module was imported)"""
+    now = time.perf_counter()
+    try:
+        with open('/proc/self/stat', encoding='ascii') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', encoding='ascii') as f:
+            uptime = float(f.read().split()[0])
+        return now - max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return now
+
+
+PROCESS_START = _process_start()
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """Monotonic count, one value per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self.values.get(labels, 0)
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Current value. With `function` the value is read when the metrics are scraped:
+    a callable returning a number, or {label tuple: number} for labelled gauges.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+        self.function = function
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def value(self, *labels):
+        return self.values.get(labels, 0)
+
+    def render(self):
+        values = self.values
+        if self.function is not None:
+            result = self.function()
+            values = result if isinstance(result, dict) else {(): result}
+        lines = self.header()
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Observations counted in cumulative `le` buckets, with their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self.series = {}  # labels -> [per-bucket counts (last = +Inf), sum]
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.bounds) + 1), 0.0]
+        series[0][bisect.bisect_left(self.bounds, value)] += 1
+        series[1] += value
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block"""
+        return Span(self, labels)
+
+    def count(self, *labels):
+        series = self.series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = self.header()
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                le = ('le', _format_value(float(bound)))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Span:
+    """Times a block with time.perf_counter() into a histogram (also when the block raises)"""
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class Registry:
+    """The metrics of one process, rendered together"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class PollMetrics:
+    """The poll pipeline's metrics; the rate limiter is read at scrape time"""
+
+    def __init__(self, rate_limiter=None):
+        self.registry = registry = Registry()
+        self.rate_limiter = rate_limiter
+        self.spans = registry.register(Histogram(
+            'dailypoll_span_seconds', 'Duration of instrumented steps of the poll run', ['span']))
+        self.responses = registry.register(Counter(
+            'dailypoll_http_responses_total', 'Poll-creation responses by HTTP status (error = no response)',
+            ['status']))
+        self.polls = registry.register(Counter(
+            'dailypoll_polls_total', 'Polls posted by the fan-out, by result', ['result']))
+        self.post_latency = registry.register(Histogram(
+            'dailypoll_post_latency_seconds', "Time from a channel's slot to its poll being posted",
+            buckets=DEFAULT_BUCKETS + (30.0, 60.0, 120.0, 300.0)))
+        self.loop_lag = registry.register(Gauge(
+            'dailypoll_event_loop_lag_seconds', 'Delay of the latest event-loop lag probe'))
+        self.loop_lag_histogram = registry.register(Histogram(
+            'dailypoll_event_loop_lag_distribution_seconds', 'Delays of the event-loop lag probes'))
+        self.startup = {}  # phase -> seconds after the process started
+        registry.register(Gauge(
+            'dailypoll_startup_seconds', 'Time from process start to each startup phase', ['phase'],
+            function=lambda: {(phase,): seconds for phase, seconds in self.startup.items()}))
+        registry.register(Gauge(
+            'dailypoll_ratelimit_global_tokens', 'Requests left in the global token bucket',
+            function=lambda: self.rate_limiter.occupancy()['global_tokens'] if self.rate_limiter else 0))
+        registry.register(Gauge(
+            'dailypoll_ratelimit_buckets', 'Route rate-limit buckets known to the client, by state', ['state'],
+            function=self._bucket_states))
+
+    def _bucket_states(self):
+        if self.rate_limiter is None:
+            return {}
+        occupancy = self.rate_limiter.occupancy()
+        return {('tracked',): occupancy['buckets'], ('exhausted',): occupancy['exhausted']}
+
+    def span(self, name):
+        return Span(self.spans, (name,))
+
+    def startup_phase(self, phase):
+        """Record when a startup phase is first reached (later calls, e.g. after a reconnect, are ignored)"""
+        self.startup.setdefault(phase, time.perf_counter() - PROCESS_START)
+
+    def response(self, status):
+        self.responses.inc(str(status) if status else 'error')
+
+    def record_run(self, stats):
+        """Add one fan-out run (fanout.FanOutStats)"""
+        self.polls.inc('created', amount=stats.created)
+        self.polls.inc('failed', amount=stats.failed)
+        for latency in stats.latencies:
+            self.post_latency.observe(latency)
+
+    async def watch_loop_lag(self, interval=LAG_INTERVAL):
+        """
+        Background task: sleep `interval` and record how late the wake-up was.
+        A large lag means something blocked the event loop (slow callback, sync I/O).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            self.loop_lag.set(lag)
+            self.loop_lag_histogram.observe(lag)
+
+    def render(self):
+        return self.registry.render()
+
+
+class MetricsServer:
+    """GET /metrics on host:port, running on the bot's event loop"""
+
+    def __init__(self, metrics, host='127.0.0.1', port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle(self, request):
+        from aiohttp import web
+        return web.Response(body=self.metrics.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        """Start listening; returns the bound port (useful with port 0)"""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
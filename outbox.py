@@ -0,0 +1,168 @@
+"""
+Durable retry outbox for failed poll creations
+Failed posts are stored in SQLite and retried by a background worker with
+jittered exponential backoff, so a lost poll recovers without holding up the
+main fan-out. Permanent errors (403/404/...) are parked instead of retried.
+"""
+
+import random
+import sqlite3
+import time
+
+from ledger import add_guild_column, shard_rows
+
+# Errors that will not fix themselves by retrying
+PERMANENT_STATUSES = frozenset({400, 401, 403, 404})
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 5.0     # seconds before the first retry
+BACKOFF_CAP = 900.0    # never wait more than 15 minutes between retries
+
+PENDING = 'pending'
+DEAD = 'dead'
+
+
+def is_permanent(status):
+    """True for HTTP statuses that should not be retried (None = network error, retried)"""
+    return status in PERMANENT_STATUSES
+
+
+def backoff_delay(attempts, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """
+    Delay before retry number `attempts` (1-based): exponential with equal jitter,
+    never shorter than the server's Retry-After.
+    """
+    delay = min(cap, base * 2 ** (attempts - 1))
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+class OutboxEntry:
+    """One failed poll waiting for a retry"""
+
+    __slots__ = ('channel_id', 'poll_date', 'attempts', 'next_attempt_at', 'expires_at',
+                 'last_status', 'last_error', 'state', 'guild_id')
+
+    def __init__(self, channel_id, poll_date, attempts, next_attempt_at, expires_at,
+                 last_status, last_error, state, guild_id=None):
+        self.channel_id = channel_id
+        self.poll_date = poll_date
+        self.attempts = attempts
+        self.next_attempt_at = next_attempt_at
+        self.expires_at = expires_at
+        self.last_status = last_status
+        self.last_error = last_error
+        self.state = state
+        self.guild_id = guild_id
+
+
+COLUMNS = ', '.join(OutboxEntry.__slots__)
+
+
+class RetryOutbox:
+    """
+    SQLite-backed queue of failed posts keyed by (channel_id, poll_date).
+    With shard_ids/shard_count (shard_launcher.py) each process only retries
+    the entries of its own guilds.
+    """
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS, shard_ids=None, shard_count=None):
+        self.path = path
+        self.shard_ids = list(shard_ids) if shard_ids is not None and shard_count else None
+        self.shard_count = shard_count
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS poll_outbox ('
+            ' channel_id INTEGER NOT NULL,'
+            ' poll_date TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL,'
+            ' next_attempt_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' last_status INTEGER,'
+            ' last_error TEXT,'
+            ' state TEXT NOT NULL,'
+            ' guild_id INTEGER,'
+            ' PRIMARY KEY (channel_id, poll_date)'
+            ') WITHOUT ROWID'
+        )
+        add_guild_column(self._conn, 'poll_outbox')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS poll_outbox_due ON poll_outbox (state, next_attempt_at)')
+        self._conn.commit()
+
+    def _own_rows(self):
+        """WHERE clause and parameters selecting this process's guilds"""
+        return shard_rows(self.shard_ids, self.shard_count, include_unknown=True)
+
+    def _get(self, channel_id, poll_date):
+        row = self._conn.execute(
+            f'SELECT {COLUMNS} FROM poll_outbox WHERE channel_id = ? AND poll_date = ?',
+            (channel_id, poll_date)).fetchone()
+        return OutboxEntry(*row) if row else None
+
+    def get(self, channel_id, poll_date):
+        """The entry of a failed post, None if that poll has no failure recorded"""
+        return self._get(channel_id, poll_date)
+
+    def add_failure(self, channel_id, poll_date, status, error, expires_at, retry_after=None, now=None,
+                    guild_id=None):
+        """
+        Record a failed attempt. Transient failures are scheduled for a retry,
+        permanent ones (or too many attempts) are parked as dead. Returns the entry.
+        """
+        now = time.time() if now is None else now
+        entry = self._get(channel_id, poll_date)
+        attempts = (entry.attempts if entry else 0) + 1
+        if is_permanent(status) or attempts >= self.max_attempts:
+            state, next_attempt_at = DEAD, now
+        else:
+            state, next_attempt_at = PENDING, now + backoff_delay(attempts, retry_after)
+        if guild_id is None and entry is not None:
+            guild_id = entry.guild_id
+        entry = OutboxEntry(channel_id, poll_date, attempts, next_attempt_at, expires_at,
+                            status, str(error)[:500], state, guild_id)
+        with self._conn:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO poll_outbox ({", ".join(OutboxEntry.__slots__)})'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                tuple(getattr(entry, name) for name in OutboxEntry.__slots__))
+        return entry
+
+    def due(self, now=None, limit=100):
+        """Pending entries of this process's guilds whose retry time has come"""
+        now = time.time() if now is None else now
+        where, params = self._own_rows()
+        rows = self._conn.execute(
+            f'SELECT {COLUMNS} FROM poll_outbox WHERE state = ? AND next_attempt_at <= ? AND expires_at > ?'
+            f' AND {where} ORDER BY next_attempt_at LIMIT ?', (PENDING, now, now, *params, limit))
+        return [OutboxEntry(*row) for row in rows]
+
+    def next_attempt_at(self):
+        """Time of the earliest pending retry of this process's guilds (None if nothing is pending)"""
+        where, params = self._own_rows()
+        row = self._conn.execute(
+            f'SELECT MIN(next_attempt_at) FROM poll_outbox WHERE state = ? AND {where}', (PENDING, *params)).fetchone()
+        return row[0]
+
+    def succeeded(self, channel_id, poll_date):
+        with self._conn:
+            self._conn.execute(
+                'DELETE FROM poll_outbox WHERE channel_id = ? AND poll_date = ?', (channel_id, poll_date))
+
+    def purge_expired(self, now=None):
+        """Drop entries whose poll date is over; returns how many were dropped"""
+        now = time.time() if now is None else now
+        with self._conn:
+            cursor = self._conn.execute('DELETE FROM poll_outbox WHERE expires_at <= ?', (now,))
+        return cursor.rowcount
+
+    def count(self, state=PENDING):
+        where, params = self._own_rows()
+        return self._conn.execute(f'SELECT COUNT(*) FROM poll_outbox WHERE state = ? AND {where}',
+                                  (state, *params)).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,160 @@
+"""
+Append-only columnar history of poll results
+One row per harvested poll, stored as one flat binary file per column so the
+analytics (history_analytics.py) can memory-map them as arrays. Writing only
+needs the standard library, the bot never loads the history into memory.
+
+Layout of the history directory:
+  meta.json       format version and the answers (TIME_OPTIONS) of the counts columns
+  channels.jsonl  channel dictionary, one line per new channel or rename: index, IDs, name
+  day.i32         poll date as days since 1970-01-01
+  channel.i32     index into the channel dictionary
+  counts.u32      votes per answer, len(answers) values per row
+  voters.u32      distinct voters of the poll
+
+Shard processes (shard_launcher.py) each write their own history directory,
+shards-<first>-<last> inside the main one; the analytics read all of them.
+"""
+
+import json
+import os
+import sys
+from array import array
+from datetime import date
+
+FORMAT_VERSION = 1
+EPOCH = date(1970, 1, 1)
+
+# (file name, array typecode) of the per-row columns; day is written last and commits the row
+COLUMNS = (('channel.i32', 'i'), ('counts.u32', 'I'), ('voters.u32', 'I'), ('day.i32', 'i'))
+
+
+def day_number(poll_date):
+    """'YYYY-MM-DD' (or a date) -> days since 1970-01-01"""
+    if isinstance(poll_date, str):
+        poll_date = date.fromisoformat(poll_date)
+    return (poll_date - EPOCH).days
+
+
+def _values_per_row(name, answers):
+    return len(answers) if name == 'counts.u32' else 1
+
+
+def process_dir(path, shard_ids=None):
+    """History directory written by one process: `path`, or its part for a shard process"""
+    if shard_ids is None:
+        return path
+    return os.path.join(path, f'shards-{min(shard_ids)}-{max(shard_ids)}')
+
+
+def history_parts(path):
+    """History directories under `path`: itself and the parts written by shard processes"""
+    parts = [path] if os.path.exists(os.path.join(path, 'meta.json')) else []
+    if os.path.isdir(path):
+        parts += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                  if name.startswith('shards-') and os.path.exists(os.path.join(path, name, 'meta.json'))]
+    return parts
+
+
+def read_meta(path):
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_channels(path):
+    """Channel dictionary: list indexed by channel index of {channel_id, guild_id, name} (last rename wins)"""
+    channels = []
+    file_path = os.path.join(path, 'channels.jsonl')
+    if not os.path.exists(file_path):
+        return channels
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            index = entry.pop('index')
+            if index == len(channels):
+                channels.append(entry)
+            elif index < len(channels):
+                channels[index] = entry
+    return channels
+
+
+def committed_rows(path, answers):
+    """Rows present in every column (a crash can leave a partial row behind)"""
+    rows = None
+    for name, typecode in COLUMNS:
+        file_path = os.path.join(path, name)
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        count = size // (array(typecode).itemsize * _values_per_row(name, answers))
+        rows = count if rows is None else min(rows, count)
+    return rows
+
+
+class HistoryWriter:
+    """Appends poll results to the column files of a history directory (one writer per directory)"""
+
+    def __init__(self, path, answers):
+        self.path = path
+        self.answers = list(answers)
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            meta = read_meta(path)
+            if meta['answers'] != self.answers:
+                raise ValueError(f"History in {path} has answers {meta['answers']}, not {self.answers}")
+        else:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': FORMAT_VERSION, 'answers': self.answers}, f)
+        self._channels = {}  # channel_id -> (index, guild_id, name)
+        for index, entry in enumerate(read_channels(path)):
+            self._channels[entry['channel_id']] = (index, entry['guild_id'], entry['name'])
+        self.rows = committed_rows(path, self.answers)
+        self._repair()
+
+    def _repair(self):
+        """Cut every column back to the last complete row"""
+        for name, typecode in COLUMNS:
+            file_path = os.path.join(self.path, name)
+            size = self.rows * array(typecode).itemsize * _values_per_row(name, self.answers)
+            if os.path.exists(file_path) and os.path.getsize(file_path) != size:
+                with open(file_path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _channel_index(self, channel_id, guild_id, name, new_entries):
+        known = self._channels.get(channel_id)
+        if known is not None and known[1:] == (guild_id, name):
+            return known[0]
+        index = known[0] if known is not None else len(self._channels)
+        self._channels[channel_id] = (index, guild_id, name)
+        new_entries.append({'index': index, 'channel_id': channel_id, 'guild_id': guild_id, 'name': name})
+        return index
+
+    def append(self, rows):
+        """
+        Append (poll_date, guild_id, channel_id, channel_name, counts, voters) rows.
+        Each column gets one write per call, whatever the number of rows.
+        """
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        new_entries = []
+        for poll_date, guild_id, channel_id, name, counts, voters in rows:
+            if len(counts) != len(self.answers):
+                raise ValueError(f'Expected {len(self.answers)} counts, got {len(counts)}')
+            columns['channel.i32'].append(self._channel_index(channel_id, guild_id, name, new_entries))
+            columns['counts.u32'].extend(counts)
+            columns['voters.u32'].append(voters)
+            columns['day.i32'].append(day_number(poll_date))
+        if not columns['day.i32']:
+            return 0
+        if new_entries:
+            with open(os.path.join(self.path, 'channels.jsonl'), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry) + '\n' for entry in new_entries)
+        for name, _ in COLUMNS:
+            column = columns[name]
+            if sys.byteorder != 'little':
+                column.byteswap()  # files are little-endian everywhere
+            with open(os.path.join(self.path, name), 'ab') as f:
+                column.tofile(f)
+        added = len(columns['day.i32'])
+        self.rows += added
+        return added
@@ -0,0 +1,67 @@
+"""
+Per-run poll template and poll-creation endpoint
+The poll body is built and JSON-encoded once per run and reused for every channel.
+The endpoint that accepts it is resolved once at startup and cached.
+"""
+
+import json
+
+import aiohttp
+
+
+class PollEndpoint:
+    """A Discord route that can create a poll"""
+
+    def __init__(self, name, path, wrap_in_message):
+        self.name = name
+        self.path = path
+        self.wrap_in_message = wrap_in_message
+
+    def body(self, poll_payload):
+        """Request body for this endpoint"""
+        return {'poll': poll_payload} if self.wrap_in_message else poll_payload
+
+    def __repr__(self):
+        return f'<PollEndpoint {self.name} POST {self.path}>'
+
+
+# Documented API: a message carrying a poll object
+MESSAGES_ENDPOINT = PollEndpoint('messages', '/channels/{channel_id}/messages', wrap_in_message=True)
+# Dedicated poll route used by earlier versions of the bot
+POLLS_ENDPOINT = PollEndpoint('polls', '/channels/{channel_id}/polls', wrap_in_message=False)
+# Probed in this order at startup
+POLL_ENDPOINTS = (MESSAGES_ENDPOINT, POLLS_ENDPOINT)
+
+# Probing a route with an empty body: 400 means the route exists and validated the body
+# (403 = exists but no permission), 404/405 without a Discord error code means no such route
+ROUTE_EXISTS_STATUSES = frozenset({400, 403})
+
+
+def route_exists(status, code):
+    """Interpret the answer to an empty-body probe request"""
+    if status in ROUTE_EXISTS_STATUSES:
+        return True
+    # 404 with a Discord error code (e.g. 10003 Unknown Channel) still comes from a real route
+    return status == 404 and bool(code)
+
+
+def created_message_id(data):
+    """Message ID from a poll-creation response (None if the route doesn't return the message)"""
+    if isinstance(data, dict) and data.get('id'):
+        return int(data['id'])
+    return None
+
+
+class PollTemplate:
+    """A poll payload encoded once for one endpoint, ready to send to any channel"""
+
+    __slots__ = ('payload', 'endpoint', 'body')
+
+    def __init__(self, payload, endpoint):
+        self.payload = payload
+        self.endpoint = endpoint
+        self.body = json.dumps(endpoint.body(payload), separators=(',', ':'), ensure_ascii=True).encode()
+
+    def request_data(self):
+        """aiohttp body for one request (wraps the encoded bytes, no copy or re-encoding)"""
+        return aiohttp.BytesPayload(self.body, content_type='application/json')
@@ -0,0 +1,144 @@
+"""
+Poll types: named poll definitions compiled once per day into ready-to-send templates
+A poll type holds a title format (strftime, e.g. "%d/%m/%Y"), the answers with
+optional emoji, multiselect and duration. It is checked against Discord's poll
+limits when the configuration is loaded, so a bad definition is rejected then
+instead of as a 400 on every channel at post time. DailyTemplates compiles each
+(poll type, date) once and shares the encoded body with every channel.
+"""
+
+import re
+from datetime import date
+
+from poll_template import PollTemplate
+
+DEFAULT_TITLE = '%d/%m/%Y'  # Survey title = current date (as per client requirement)
+
+# Discord poll limits
+MAX_QUESTION_LENGTH = 300
+MAX_ANSWERS = 10
+MAX_ANSWER_LENGTH = 55
+MAX_DURATION_HOURS = 32 * 24
+
+# Longest English day and month names: a title that fits on this date fits every day
+LONGEST_DATE = date(2000, 9, 27)
+CUSTOM_EMOJI = re.compile(r'<a?:\w+:(\d+)>|(\d+)')
+
+
+def emoji_payload(emoji):
+    """Poll media emoji: {"id": ...} for a server emoji ("<:name:id>" or its ID), else {"name": ...}"""
+    match = CUSTOM_EMOJI.fullmatch(emoji)
+    if match:
+        return {'id': match.group(1) or match.group(2)}
+    return {'name': emoji}
+
+
+class PollType:
+    """
+    One kind of poll. answers are (text, emoji or None) pairs. Poll types with
+    the same settings are equal, so schedules sharing them share one build a day.
+    """
+
+    __slots__ = ('name', 'title', 'answers', 'multiselect', 'duration_hours')
+
+    def __init__(self, name, answers, title=DEFAULT_TITLE, multiselect=True, duration_hours=24):
+        self.name = name
+        self.title = title
+        self.answers = tuple((str(text), emoji or None) for text, emoji in answers)
+        self.multiselect = bool(multiselect)
+        self.duration_hours = int(duration_hours)
+        self.check()
+
+    def check(self):
+        """Raise ValueError if Discord would refuse the poll"""
+        if not 1 <= len(self.answers) <= MAX_ANSWERS:
+            raise ValueError(f'Poll type {self.name!r} needs 1 to {MAX_ANSWERS} answers')
+        texts = self.answer_texts
+        if len(set(texts)) != len(texts):
+            raise ValueError(f'Poll type {self.name!r} has duplicate answers: {texts}')
+        for text in texts:
+            if not 1 <= len(text) <= MAX_ANSWER_LENGTH:
+                raise ValueError(f'Poll type {self.name!r}: answer {text!r} must be 1 to {MAX_ANSWER_LENGTH} characters')
+        if not 1 <= self.duration_hours <= MAX_DURATION_HOURS:
+            raise ValueError(f'Poll type {self.name!r}: duration_hours must be 1 to {MAX_DURATION_HOURS}')
+        self.render_title(LONGEST_DATE)
+
+    @property
+    def answer_texts(self):
+        return [text for text, _ in self.answers]
+
+    def render_title(self, day):
+        """The question of the poll posted on `day`"""
+        title = day.strftime(self.title).strip()
+        if not 1 <= len(title) <= MAX_QUESTION_LENGTH:
+            raise ValueError(f'Poll type {self.name!r}: title must be 1 to {MAX_QUESTION_LENGTH} characters, '
+                             f'got {title!r}')
+        return title
+
+    def compile(self, day):
+        """Poll payload of `day` (Discord API v10)"""
+        answers = []
+        for text, emoji in self.answers:
+            media = {'text': text}
+            if emoji:
+                media['emoji'] = emoji_payload(emoji)
+            answers.append({'poll_media': media})
+        return {
+            'question': {'text': self.render_title(day)},
+            'answers': answers,
+            'duration': self.duration_hours * 3600,  # Same unit as build_poll_payload
+            'allow_multiselect': self.multiselect,
+        }
+
+    def _settings(self):
+        return self.title, self.answers, self.multiselect, self.duration_hours
+
+    def __eq__(self, other):
+        return isinstance(other, PollType) and self._settings() == other._settings()
+
+    def __hash__(self):
+        return hash(self._settings())
+
+    def __repr__(self):
+        return f'<PollType {self.name} {len(self.answers)} answers {self.duration_hours}h>'
+
+
+def time_poll(time_options, duration_hours):
+    """The original daily survey: the date as title, one answer per clock time"""
+    return PollType('daily', [(str(option), None) for option in time_options], duration_hours=duration_hours)
+
+
+def poll_type_from_dict(name, entry):
+    """
+    One poll type from its JSON form (see scheduler.load_schedules), e.g.
+    {"title": "Raid night %d/%m", "answers": ["Yes", {"text": "No", "emoji": "❌"}],
+     "multiselect": false, "duration_hours": 12}
+    """
+    answers = []
+    for answer in entry.get('answers', ()):
+        if isinstance(answer, dict):
+            answers.append((answer['text'], answer.get('emoji')))
+        else:
+            answers.append((answer, None))
+    return PollType(name, answers, title=entry.get('title', DEFAULT_TITLE),
+                    multiselect=entry.get('multiselect', True), duration_hours=entry.get('duration_hours', 24))
+
+
+class DailyTemplates:
+    """(poll type, date) -> PollTemplate, built once however many channels post it"""
+
+    def __init__(self, limit=64):
+        self.limit = limit
+        self.builds = 0
+        self._templates = {}
+
+    def get(self, poll_type, day, endpoint):
+        key = (poll_type, day)
+        template = self._templates.get(key)
+        if template is None or template.endpoint is not endpoint:
+            if len(self._templates) > self.limit:
+                self._templates.clear()  # Old days
+            template = PollTemplate(poll_type.compile(day), endpoint)
+            self._templates[key] = template
+            self.builds += 1
+        return template
@@ -0,0 +1,260 @@
+"""
+Gateway-less REST-only poll run
+Lists guilds and channels over pooled REST calls, posts the daily polls and exits.
+Meant for a cron/scheduler job instead of keeping a gateway session open all day.
+With `poll_for` each channel gets the poll of its own schedule (see
+bot.rest_only_polls), and servers with their own channel patterns are matched
+with `guild_matchers`. Output goes through the bot's loggers (structured_log), so
+LOG_FORMAT and LOG_SAMPLE_RATE apply as in the long-running bot.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import aiohttp
+
+from fanout import RateLimiter, fan_out, poll_route_key
+from poll_template import POLL_ENDPOINTS, PollTemplate, created_message_id, route_exists
+from poll_types import DailyTemplates
+from structured_log import CHANNEL_LOGGER_NAME, LOGGER_NAME
+
+API_BASE = 'https://discord.com/api/v10'
+TEXT_CHANNEL = 0  # Discord channel type for guild text channels
+GUILDS_PAGE_SIZE = 200
+MAX_RETRIES = 3
+
+log = logging.getLogger(LOGGER_NAME)
+channel_log = logging.getLogger(CHANNEL_LOGGER_NAME)
+
+
+class RestError(Exception):
+    """Discord answered a REST call with an error status"""
+
+    def __init__(self, status, data):
+        self.status = status
+        self.data = data
+        message = data.get('message') if isinstance(data, dict) else data
+        super().__init__(f'{status}: {message}')
+
+
+def _decode(body):
+    # Error pages from proxies are not always JSON
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+class RestClient:
+    """Minimal pooled Discord REST client that follows the rate-limit headers"""
+
+    def __init__(self, token, concurrency, api_base=API_BASE):
+        self.token = token
+        self.concurrency = concurrency
+        self.api_base = api_base
+        self.rate_limiter = RateLimiter()
+        self._session = None
+
+    async def __aenter__(self):
+        # One keep-alive connection pool for the whole run
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'Authorization': f'Bot {self.token}'},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    async def request(self, method, path, route_key, json=None, params=None, data=None):
+        """Send one request, waiting for the rate limits and retrying 429s"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(route_key)
+            async with self._session.request(method, self.api_base + path, json=json, params=params,
+                                             data=data) as response:
+                if response.status == 429 and attempt < MAX_RETRIES:
+                    self.rate_limiter.on_429(route_key, response.headers)
+                    continue
+                self.rate_limiter.update(route_key, response.headers)
+                data = _decode(await response.text())
+                if response.status >= 400:
+                    raise RestError(response.status, data)
+                return data
+
+    async def list_guilds(self):
+        """All guilds the bot is in (paginated)"""
+        guilds = []
+        after = None
+        while True:
+            params = {'limit': GUILDS_PAGE_SIZE}
+            if after:
+                params['after'] = after
+            page = await self.request('GET', '/users/@me/guilds', 'GET /users/@me/guilds', params=params)
+            guilds.extend(page)
+            if len(page) < GUILDS_PAGE_SIZE:
+                return guilds
+            after = page[-1]['id']
+
+    async def list_channels(self, guild_id):
+        return await self.request(
+            'GET', f'/guilds/{guild_id}/channels', f'GET /guilds/{{guild_id}}/channels:{guild_id}')
+
+    async def resolve_poll_endpoint(self, channel_id):
+        """Pick the route that creates polls by probing each candidate with an empty body"""
+        for endpoint in POLL_ENDPOINTS:
+            path = endpoint.path.format(channel_id=channel_id)
+            try:
+                await self.request('POST', path, poll_route_key(channel_id), json={})
+                return endpoint
+            except RestError as e:
+                code = e.data.get('code') if isinstance(e.data, dict) else None
+                if route_exists(e.status, code):
+                    return endpoint
+        return POLL_ENDPOINTS[0]
+
+    async def create_poll(self, channel_id, template):
+        """Send a pre-encoded PollTemplate to one channel"""
+        return await self.request(
+            'POST', template.endpoint.path.format(channel_id=channel_id), poll_route_key(channel_id),
+            data=template.request_data())
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+async def run_rest_only(token, matcher, poll_payload, concurrency, dry_run=False, api_base=API_BASE,
+                        ledger=None, poll_date=None, guild_matchers=None, poll_for=None):
+    """
+    Discover the matching channels of every guild and post `poll_payload` to each.
+    With a ledger, channels that already have the poll of `poll_date` are skipped.
+    guild_matchers: guild ID -> ChannelMatcher replacing `matcher` in that guild.
+    poll_for(guild_id, channel_id): (local date, PollType) of the poll a channel is due,
+    or None when it has none due; it replaces `poll_payload` and `poll_date`.
+    Returns the FanOutStats of the posting phase.
+    """
+    started = time.perf_counter()
+    async with RestClient(token, concurrency, api_base) as client:
+        guilds = await client.list_guilds()
+        target_channels = []
+
+        async def collect(guild):
+            try:
+                channels = await client.list_channels(guild['id'])
+            except RestError as e:
+                log.error(f"[ERROR] Could not list channels of server {guild.get('name')}: {e}",
+                          extra={'event': 'channels_failed', 'status': e.status, 'guild_id': int(guild['id'])})
+                return False
+            guild_matcher = (guild_matchers or {}).get(int(guild['id']), matcher)
+            for channel in channels:
+                if channel.get('type') == TEXT_CHANNEL and guild_matcher.matches(channel['name']):
+                    target_channels.append(channel | {'guild_id': guild['id']})
+            return True
+
+        await fan_out(guilds, collect, concurrency)
+        startup_seconds = time.perf_counter() - started
+        log.info(f"[INFO] Found {len(target_channels)} channel(s) in {len(guilds)} server(s) "
+                 f"in {startup_seconds:.2f}s",
+                 extra={'event': 'channels_found', 'channels': len(target_channels), 'guilds': len(guilds),
+                        'startup_s': round(startup_seconds, 3)})
+
+        # Resolve the poll route once and encode each poll once for every channel posting it
+        endpoint = POLL_ENDPOINTS[0]
+        if target_channels and not dry_run:
+            endpoint = await client.resolve_poll_endpoint(target_channels[0]['id'])
+        if poll_for is None:
+            template = PollTemplate(poll_payload, endpoint)
+            for channel in target_channels:
+                channel['poll'] = (poll_date, template)
+        else:
+            templates = DailyTemplates()
+            due = []
+            for channel in target_channels:
+                poll = poll_for(int(channel['guild_id']), int(channel['id']))
+                if poll is not None:
+                    day, poll_type = poll
+                    channel['poll'] = (day.isoformat(), templates.get(poll_type, day, endpoint))
+                    due.append(channel)
+            log.info(f"[INFO] {len(due)} channel(s) due, {len(target_channels) - len(due)} not at their post time",
+                     extra={'event': 'channels_due', 'channels': len(due),
+                            'not_due': len(target_channels) - len(due)})
+            target_channels = due
+
+        already_posted = 0
+        if ledger is not None:
+            posted = {}  # poll date -> channel IDs already posted
+            for day in {channel['poll'][0] for channel in target_channels}:
+                posted[day] = ledger.posted_channels(day)
+            missing = [channel for channel in target_channels
+                       if int(channel['id']) not in posted[channel['poll'][0]]]
+            already_posted = len(target_channels) - len(missing)
+            target_channels = missing
+
+        async def post(channel):
+            if dry_run:
+                return True
+            channel_date, template = channel['poll']
+            fields = {'guild_id': int(channel['guild_id']), 'channel_id': int(channel['id']),
+                      'channel': channel['name'], 'poll_date': channel_date}
+            started = asyncio.get_running_loop().time()
+            try:
+                message = await client.create_poll(channel['id'], template)
+            except (RestError, aiohttp.ClientError) as e:
+                log.error(f"[ERROR] Could not create survey in #{channel['name']}: {e}",
+                          extra={'event': 'poll_failed', 'status': getattr(e, 'status', None), **fields})
+                return False
+            latency_ms = round((asyncio.get_running_loop().time() - started) * 1000, 1)
+            if ledger is not None:
+                ledger.record(int(channel['id']), channel_date, created_message_id(message), int(channel['guild_id']))
+            channel_log.info(f"[SUCCESS] Survey created in #{channel['name']} - {template.payload['question']['text']}",
+                             extra={'event': 'poll_created', 'latency_ms': latency_ms, **fields})
+            return True
+
+        try:
+            stats = await fan_out(target_channels, post, concurrency)
+        finally:
+            if ledger is not None:
+                ledger.close()
+
+    rss = peak_rss_mb()
+    total_seconds = time.perf_counter() - started
+    lines = [f"\n{'='*60}", f"📊 REST-only Survey Summary{' (dry run)' if dry_run else ''}:",
+             f"   ✅ Successfully created: {stats.created} survey(s)"]
+    if already_posted:
+        lines.append(f"   ⏭️ Already posted today: {already_posted} survey(s)")
+    if stats.failed > 0:
+        lines.append(f"   ❌ Failed: {stats.failed} survey(s)")
+    lines.append(f"   🚀 Startup (guild + channel discovery): {startup_seconds:.2f}s")
+    lines.append(f"   ⏱️ Posting: {stats.elapsed:.2f}s ({stats.throughput:.1f} surveys/s, p99 latency {stats.p99:.2f}s)")
+    lines.append(f"   ⏱️ Total: {total_seconds:.2f}s")
+    if rss is not None:
+        lines.append(f"   💾 Peak RSS: {rss:.1f} MB")
+    lines.append(f"{'='*60}\n")
+    log.info('\n'.join(lines), extra={
+        'event': 'run_summary', 'dry_run': dry_run, 'polls_created': stats.created, 'failed': stats.failed,
+        'already_posted': already_posted, 'startup_s': round(startup_seconds, 3),
+        'elapsed_s': round(stats.elapsed, 3), 'total_s': round(total_seconds, 3),
+        'p99_latency_ms': round(stats.p99 * 1000, 1), 'peak_rss_mb': rss and round(rss, 1),
+    })
+    return stats
+
+
+def main(token, matcher, poll_payload, concurrency, dry_run=False, ledger=None, poll_date=None, api_base=API_BASE,
+         guild_matchers=None, poll_for=None):
+    """Entry point used by `python bot.py --rest-only`"""
+    return asyncio.run(run_rest_only(token, matcher, poll_payload, concurrency, dry_run=dry_run, api_base=api_base,
+                                     ledger=ledger, poll_date=poll_date, guild_matchers=guild_matchers,
+                                     poll_for=poll_for))
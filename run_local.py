@@ -1,14 +1,49 @@
 """
 Local Testing Script - Run this to test the bot locally
 This script helps you test the bot before deploying it live
+The checks read installed versions from the package metadata instead of
+importing the packages; discord.py is only loaded once, by bot.py.
 """
 
 import os
+import re
 import sys
-from dotenv import load_dotenv
+from importlib import metadata
 
-# Load environment variables
-load_dotenv()
+# (distribution, minimum version) of the packages the bot needs
+REQUIREMENTS = [
+    ('discord.py', '2.4.0'),
+    ('pytz', None),
+    ('python-dotenv', None),
+]
+
+def version_tuple(version):
+    """'2.3.2' -> (2, 3, 2); stops at the first non-numeric part ('2.4.0a1' -> (2, 4, 0))"""
+    numbers = []
+    for part in version.split('.'):
+        match = re.match(r'\d+', part)
+        if match is None:
+            break
+        numbers.append(int(match.group()))
+        if match.end() < len(part):
+            break
+    return tuple(numbers)
+
+def check_dependencies():
+    """Check that every requirement is installed (and new enough) without importing it"""
+    print("Checking dependencies...")
+    for distribution, minimum in REQUIREMENTS:
+        try:
+            version = metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            print(f"[ERROR] {distribution} not installed!")
+            print("Run: pip install -r requirements.txt")
+            return False
+        print(f"[OK] {distribution} version: {version}")
+        if minimum and version_tuple(version) < version_tuple(minimum):
+            print(f"[WARNING] {distribution} version is too old. Please update:")
+            print(f"  pip install --upgrade {distribution}")
+    return True
 
 def check_setup():
     """Check if everything is set up correctly"""
@@ -17,6 +52,14 @@ def check_setup():
     print("=" * 60)
     print()
     
+    if not check_dependencies():
+        return False
+    print()
+    
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     # Check if .env file exists
     if not os.path.exists('.env'):
         print("[WARNING] .env file not found!")
@@ -44,36 +87,6 @@ def check_setup():
     
     print("[OK] Bot token found in .env")
     
-    # Check dependencies
-    print()
-    print("Checking dependencies...")
-    try:
-        import discord
-        print(f"[OK] discord.py version: {discord.__version__}")
-        if discord.__version__ < "2.3.0":
-            print("[WARNING] discord.py version is too old. Please update:")
-            print("  pip install --upgrade discord.py")
-    except ImportError:
-        print("[ERROR] discord.py not installed!")
-        print("Run: pip install -r requirements.txt")
-        return False
-    
-    try:
-        import pytz
-        print("[OK] pytz installed")
-    except ImportError:
-        print("[ERROR] pytz not installed!")
-        print("Run: pip install -r requirements.txt")
-        return False
-    
-    try:
-        from dotenv import load_dotenv
-        print("[OK] python-dotenv installed")
-    except ImportError:
-        print("[ERROR] python-dotenv not installed!")
-        print("Run: pip install -r requirements.txt")
-        return False
-    
     print()
     print("=" * 60)
     print("[SUCCESS] Setup looks good!")
@@ -96,12 +109,15 @@ def main():
     
     # Import and run the bot
     try:
-        from bot import DailyPollBot, TOKEN
+        from bot import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, DailyPollBot, TOKEN
+        from structured_log import setup_logging
         
         if not TOKEN:
             print("[ERROR] Bot token not found!")
             sys.exit(1)
         
+        # The bot logs through the 'dailypoll' loggers: without this its output is dropped
+        setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)
         bot = DailyPollBot()
         bot.run(TOKEN)
     except KeyboardInterrupt:
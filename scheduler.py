@@ -0,0 +1,248 @@
+"""
+Heap-based multi-schedule engine for the daily polls
+Every guild or channel can have its own post time, timezone and poll duration.
+All schedules share one priority queue and one timer that only wakes up for the
+next due item, however many schedules there are.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytz
+
+from poll_types import MAX_ANSWERS, poll_type_from_dict, time_poll
+
+DEFAULT_KEY = ('default',)
+MAX_TIME_OPTIONS = MAX_ANSWERS
+
+
+class SystemClock:
+    """The real wall clock; tests pass a virtual_clock.VirtualClock instead"""
+
+    def now(self, tz=pytz.utc):
+        return datetime.now(tz)
+
+
+def guild_key(guild_id):
+    return ('guild', guild_id)
+
+
+def channel_key(channel_id):
+    return ('channel', channel_id)
+
+
+class Schedule:
+    """
+    Daily post time in a timezone, for the default, one guild or one channel,
+    with the poll's settings: duration, time options (None = TIME_OPTIONS),
+    the poll type (None = the time poll of the time options) and, for guilds,
+    channel name patterns (None = CHANNEL_PATTERNS)
+    """
+
+    __slots__ = ('key', 'post_time', 'tz', 'duration_hours', 'time_options', 'channel_patterns', 'poll_type')
+
+    def __init__(self, key, post_time, tz, duration_hours, time_options=None, channel_patterns=None, poll_type=None):
+        self.key = key
+        self.post_time = post_time
+        self.tz = tz
+        self.duration_hours = duration_hours
+        self.time_options = time_options
+        self.channel_patterns = channel_patterns
+        if poll_type is None and time_options:
+            poll_type = time_poll(time_options, duration_hours)
+        self.poll_type = poll_type
+
+    def occurrence(self, day):
+        """Aware local datetime of the post on local date `day` (DST-correct)"""
+        naive = datetime.combine(day, self.post_time)
+        try:
+            return self.tz.localize(naive, is_dst=None)
+        except pytz.NonExistentTimeError:
+            # Clocks jump forward over the post time: post at the same wall offset after the jump
+            return self.tz.normalize(self.tz.localize(naive, is_dst=False))
+        except pytz.AmbiguousTimeError:
+            # Clocks fall back over the post time: post at the first of the two
+            return self.tz.localize(naive, is_dst=True)
+
+    def next_run(self, after):
+        """First occurrence strictly after the aware datetime `after`"""
+        day = after.astimezone(self.tz).date()
+        for offset in range(-1, 3):
+            candidate = self.occurrence(day + timedelta(days=offset))
+            if candidate > after:
+                return candidate
+        raise ValueError(f'No occurrence of {self.key} after {after}')
+
+    def previous_run(self, now):
+        """Last occurrence at or before the aware datetime `now`"""
+        day = now.astimezone(self.tz).date()
+        for offset in range(1, -3, -1):
+            candidate = self.occurrence(day + timedelta(days=offset))
+            if candidate <= now:
+                return candidate
+        raise ValueError(f'No occurrence of {self.key} before {now}')
+
+    def __repr__(self):
+        return f'<Schedule {self.key} {self.post_time:%H:%M} {self.tz.zone} {self.duration_hours}h>'
+
+
+class ScheduleTable:
+    """Resolves which schedule applies to a channel: channel > guild > default"""
+
+    def __init__(self, default, schedules=()):
+        self.default = default
+        self.by_key = {schedule.key: schedule for schedule in schedules}
+        self.by_key[DEFAULT_KEY] = default
+
+    def __iter__(self):
+        return iter(self.by_key.values())
+
+    def for_channel(self, guild_id, channel_id):
+        return (self.by_key.get(channel_key(channel_id))
+                or self.by_key.get(guild_key(guild_id))
+                or self.default)
+
+
+def load_schedules(path, default):
+    """
+    Read per-guild/per-channel schedules from a JSON list, e.g.
+    [{"guild_id": 123, "time": "21:00", "timezone": "America/New_York", "duration_hours": 12,
+      "time_options": [18, 20, 22], "channel_patterns": "prefix:sondaggi"},
+     {"channel_id": 456, "time": "07:30"}]
+    or from an object that also defines poll types (see poll_types.poll_type_from_dict):
+    {"poll_types": {"raid": {"title": "Raid %d/%m", "answers": ["Yes", "No"]}},
+     "schedules": [{"guild_id": 123, "poll": "raid"}]}
+    Missing fields are taken from the default schedule. A missing file means no overrides.
+    """
+    if not path or not os.path.exists(path):
+        return ScheduleTable(default)
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    poll_types = {}
+    if isinstance(entries, dict):
+        poll_types = {name: poll_type_from_dict(name, entry) for name, entry in entries.get('poll_types', {}).items()}
+        entries = entries.get('schedules', [])
+    return ScheduleTable(default, [schedule_from_dict(entry, default, poll_types) for entry in entries])
+
+
+def schedule_from_dict(entry, default, poll_types=None):
+    """One schedule from its JSON form (see load_schedules); "poll" names one of `poll_types`"""
+    if 'channel_id' in entry:
+        key = channel_key(int(entry['channel_id']))
+    elif 'guild_id' in entry:
+        key = guild_key(int(entry['guild_id']))
+    else:
+        raise ValueError(f'Schedule needs a guild_id or channel_id: {entry}')
+    post_time = default.post_time
+    if 'time' in entry:
+        post_time = datetime.strptime(entry['time'], '%H:%M').time()
+    tz = pytz.timezone(entry['timezone']) if 'timezone' in entry else default.tz
+    duration_hours = int(entry.get('duration_hours', default.duration_hours))
+    time_options = default.time_options
+    if 'time_options' in entry:
+        time_options = tuple(int(option) for option in entry['time_options'])
+        if not 1 <= len(time_options) <= MAX_TIME_OPTIONS or len(set(time_options)) != len(time_options):
+            raise ValueError(f'time_options needs 1 to {MAX_TIME_OPTIONS} different hours: {entry}')
+        if not all(0 <= option <= 23 for option in time_options):
+            raise ValueError(f'time_options are hours from 0 to 23: {entry}')
+    channel_patterns = entry.get('channel_patterns')
+    if channel_patterns is not None and key[0] != 'guild':
+        raise ValueError(f'channel_patterns can only be set for a guild: {entry}')
+    poll_type = None
+    if 'poll' in entry:
+        if 'time_options' in entry or 'duration_hours' in entry:
+            raise ValueError(f'A poll type sets its own answers and duration: {entry}')
+        poll_type = (poll_types or {}).get(entry['poll'])
+        if poll_type is None:
+            raise ValueError(f'Unknown poll type {entry["poll"]!r}: {entry}')
+        duration_hours, time_options = poll_type.duration_hours, None
+    return Schedule(key, post_time, tz, duration_hours, time_options, channel_patterns, poll_type)
+
+
+class PollScheduler:
+    """
+    One timer for any number of schedules. The heap holds (due timestamp, sequence, key);
+    replaced or removed schedules leave stale heap items that are skipped lazily.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+        self._heap = []
+        self._entries = {}  # key -> (due datetime, schedule, sequence)
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, schedule, now=None):
+        """Add or replace a schedule; its next run is computed from `now`"""
+        now = now or self.clock.now()
+        due = schedule.next_run(now)
+        sequence = next(self._sequence)
+        self._entries[schedule.key] = (due, schedule, sequence)
+        heapq.heappush(self._heap, (due.timestamp(), sequence, schedule.key))
+        self._changed.set()
+
+    def remove(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._changed.set()
+
+    def _is_current(self, item):
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[2] == item[1]
+
+    def next_due(self):
+        """(due datetime, schedule) of the next item, or None"""
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        due, schedule, _ = self._entries[self._heap[0][2]]
+        return due, schedule
+
+    def pop_due(self, now):
+        """All (due datetime, schedule) pairs due at `now`; each is rescheduled for its next run"""
+        due_items = []
+        while True:
+            item = self.next_due()
+            if item is None or item[0] > now:
+                return due_items
+            due, schedule = item
+            due_items.append(item)
+            self.set(schedule, now=due)
+
+    async def run(self, callback):
+        """
+        Sleep until the next due item, then start `callback(due_items)` as a task
+        so a long poll run never delays the next schedule.
+        """
+        while True:
+            self._changed.clear()
+            item = self.next_due()
+            timeout = None
+            if item is not None:
+                timeout = max(0.0, (item[0] - self.clock.now()).total_seconds())
+            try:
+                # Woken early when schedules change
+                await asyncio.wait_for(self._changed.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            due_items = self.pop_due(self.clock.now())
+            if due_items:
+                task = asyncio.create_task(callback(due_items))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def cancel_runs(self):
+        """Cancel the callbacks started by run() and wait for them to finish"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,162 @@
+"""
+Multi-process shard launcher
+Splits the bot's shards into contiguous ranges, runs one DailyPollBot process per
+range (each posts only to the guilds of its own shards) and combines the totals
+of every scheduled run across processes.
+
+Usage: python shard_launcher.py [--processes N] [--shards N]
+  --processes  worker processes (default: number of CPU cores, at most one per shard)
+  --shards     total shard count (default: Discord's recommendation from /gateway/bot)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import aiohttp
+
+from rest_runner import API_BASE
+
+# Discord allows max_concurrency IDENTIFYs per 5 seconds
+IDENTIFY_INTERVAL = 5.5
+
+
+def fetch_gateway_info(token):
+    """Recommended shard count and identify concurrency from GET /gateway/bot"""
+    async def fetch():
+        async with aiohttp.ClientSession(headers={'Authorization': f'Bot {token}'}) as session:
+            async with session.get(API_BASE + '/gateway/bot') as response:
+                response.raise_for_status()
+                return await response.json()
+
+    data = asyncio.run(fetch())
+    return data['shards'], data.get('session_start_limit', {}).get('max_concurrency', 1)
+
+
+def split_shards(shard_count, processes):
+    """Contiguous shard ID ranges, as even as possible, one per process"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def run_worker(shard_ids, shard_count, report_queue, start_delay, index=0):
+    """Worker process: one AutoShardedClient for `shard_ids`"""
+    # Shards of earlier processes identify first, so IDENTIFYs don't collide across processes
+    time.sleep(start_delay)
+    import bot as bot_module
+    from bot import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, DailyPollBot, TOKEN
+    from structured_log import setup_logging
+    if bot_module.METRICS_PORT:
+        bot_module.METRICS_PORT += index  # One metrics endpoint per process: METRICS_PORT, +1, +2...
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)
+    bot = DailyPollBot(shard_ids=shard_ids, shard_count=shard_count, report_queue=report_queue)
+    bot.run(TOKEN)
+
+
+class ReportAggregator:
+    """Combines the per-process summaries of each scheduled run"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.runs = {}  # run (due time of the schedule) -> list of reports
+
+    def add(self, report):
+        """Add one report; returns the combined totals once every process reported"""
+        reports = self.runs.setdefault(report['run'], [])
+        reports.append(report)
+        if len(reports) < self.workers:
+            return None
+        del self.runs[report['run']]
+        combined = {'poll_date': report['poll_date'], 'processes': len(reports)}
+        for key in ('created', 'failed', 'already_posted', 'circuit_open', 'rate_limited'):
+            combined[key] = sum(r[key] for r in reports)
+        # Processes run in parallel: the run takes as long as the slowest one
+        combined['elapsed'] = max(r['elapsed'] for r in reports)
+        # Percentiles don't add up across processes: report the worst process
+        combined['p99_latency'] = max(r['p99_latency'] for r in reports)
+        return combined
+
+
+def print_combined(combined):
+    throughput = combined['created'] / combined['elapsed'] if combined['elapsed'] > 0 else 0.0
+    print(f"\n{'='*60}")
+    print(f"📊 Combined Survey Summary ({combined['processes']} processes) - {combined['poll_date']}:")
+    print(f"   ✅ Successfully created: {combined['created']} survey(s)")
+    if combined['already_posted']:
+        print(f"   ⏭️ Already posted today: {combined['already_posted']} survey(s)")
+    if combined['circuit_open']:
+        print(f"   🚧 Skipped (failing channel, circuit open): {combined['circuit_open']} channel(s)")
+    if combined['failed']:
+        print(f"   ❌ Failed: {combined['failed']} survey(s)")
+    print(f"   ⏱️ Wall-clock time: {combined['elapsed']:.2f}s ({throughput:.1f} surveys/s)")
+    print(f"   ⏱️ p99 post latency: {combined['p99_latency']:.2f}s (slowest process)")
+    if combined['rate_limited']:
+        print(f"   ⚠️ Rate limited (429): {combined['rate_limited']} time(s)")
+    print(f"{'='*60}\n")
+
+
+def collect_reports(report_queue, aggregator):
+    """Parent-side thread: print the combined summary of each run"""
+    while True:
+        report = report_queue.get()
+        if report is None:
+            return
+        combined = aggregator.add(report)
+        if combined is not None:
+            print_combined(combined)
+
+
+def main():
+    from bot import TOKEN
+    if not TOKEN:
+        print("[ERROR] DISCORD_BOT_TOKEN not found! See README.md")
+        return 1
+
+    processes = os.cpu_count() or 1
+    if '--processes' in sys.argv:
+        processes = int(sys.argv[sys.argv.index('--processes') + 1])
+    shard_count, max_concurrency = fetch_gateway_info(TOKEN)
+    if '--shards' in sys.argv:
+        shard_count = int(sys.argv[sys.argv.index('--shards') + 1])
+
+    ranges = split_shards(shard_count, processes)
+    print(f"[INFO] {shard_count} shard(s) across {len(ranges)} process(es): "
+          + ', '.join(f'{r[0]}-{r[-1]}' for r in ranges))
+
+    report_queue = multiprocessing.Queue()
+    aggregator = ReportAggregator(len(ranges))
+    collector = threading.Thread(target=collect_reports, args=(report_queue, aggregator), daemon=True)
+    collector.start()
+
+    workers = []
+    for index, shard_ids in enumerate(ranges):
+        start_delay = (shard_ids[0] // max_concurrency) * IDENTIFY_INTERVAL
+        worker = multiprocessing.Process(target=run_worker,
+                                         args=(shard_ids, shard_count, report_queue, start_delay, index),
+                                         name=f'shards-{shard_ids[0]}-{shard_ids[-1]}')
+        worker.start()
+        workers.append(worker)
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopping workers...")
+        for worker in workers:
+            worker.terminate()
+    report_queue.put(None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
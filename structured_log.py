@@ -0,0 +1,123 @@
+"""
+Non-blocking logging for the bot
+Log calls only put the record on an in-memory queue; a background thread
+(logging.handlers.QueueListener) formats it and writes to stdout, so a slow or
+piped stdout never stalls the event loop in the middle of a poll run.
+Records are JSON lines with their structured fields (guild_id, channel_id,
+latency_ms, ...) or plain text on a terminal. Per-channel success lines can be
+sampled.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'dailypoll'
+# Per-channel success lines: the only high-volume logger, sampled by LOG_SAMPLE_RATE
+CHANNEL_LOGGER_NAME = 'dailypoll.channel'
+DEFAULT_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_STANDARD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and the record's extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Lets through a `rate` fraction of INFO-and-below records; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep the extra fields for the JSON formatter, only resolve the message and traceback
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() can be called twice (explicitly and at exit) and waits for room in a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_logging(level='INFO', log_format='auto', sample_rate=1.0, stream=None, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Route the bot's loggers through a queue to a background writer thread.
+    log_format: 'json', 'text' or 'auto' (text on a terminal, JSON lines when piped).
+    Returns the started QueueListener; it is stopped (and flushed) at exit.
+    """
+    stream = stream or sys.stdout
+    if log_format == 'auto':
+        log_format = 'text' if stream.isatty() else 'json'
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter('%(message)s'))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = _QueueListener(log_queue, output, respect_handler_level=True)
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+
+    channel_logger = logging.getLogger(CHANNEL_LOGGER_NAME)
+    channel_logger.filters = [SampleFilter(sample_rate)]
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
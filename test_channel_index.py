@@ -0,0 +1,95 @@
+"""
+Tests for the event-maintained channel index (channel_index.py)
+"""
+
+import sys
+
+from channel_index import ChannelIndex, ChannelMatcher
+
+
+class MockGuild:
+    def __init__(self, guild_id, channel_names):
+        self.id = guild_id
+        self.text_channels = [MockChannel(guild_id * 100 + i, name, self) for i, name in enumerate(channel_names)]
+
+
+class MockChannel:
+    def __init__(self, channel_id, name, guild):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+
+
+def test_matcher_patterns():
+    """Test substring, prefix and regex patterns"""
+    print("Testing match patterns...")
+    matcher = ChannelMatcher.from_string("substring:votazioni, prefix:vote-, regex:^poll-\\d+$")
+
+    assert matcher.matches("VOTAZIONI-lol-h70"), "Substring match should be case-insensitive"
+    assert matcher.matches("vote-weekend"), "Prefix should match"
+    assert matcher.matches("poll-42"), "Regex should match"
+    assert not matcher.matches("poll-abc"), "Regex should not match non-digits"
+    assert not matcher.matches("general"), "Unrelated channel should not match"
+    assert ChannelMatcher.from_string("votazioni").matches("votazioni-test"), "Bare word is a substring"
+    try:
+        ChannelMatcher.from_string("glob:*")
+        assert False, "Unknown pattern kind should raise"
+    except ValueError:
+        pass
+    print("  [OK] All pattern kinds work")
+    return True
+
+
+def test_index_build_and_events():
+    """Test building the index and keeping it current through events"""
+    print("Testing index maintenance...")
+    index = ChannelIndex(ChannelMatcher.from_string("votazioni"))
+    guild = MockGuild(1, ["votazioni-lol-h60", "spam-lol-70", "votazioni-lol-h70", "general"])
+    index.build([guild])
+    assert [c.name for c in index.get(1)] == ["votazioni-lol-h60", "votazioni-lol-h70"], "Should index 2 channels"
+
+    # Channel created
+    new_channel = MockChannel(999, "votazioni-new", guild)
+    assert index.add_channel(new_channel), "Matching channel should be indexed"
+    assert not index.add_channel(MockChannel(998, "random", guild)), "Other channel should be ignored"
+    assert len(index) == 3, "Index should hold 3 channels"
+
+    # Channel renamed away from the pattern, then deleted
+    renamed = MockChannel(999, "archive", guild)
+    index.update_channel(new_channel, renamed)
+    assert len(index) == 2, "Renamed channel should leave the index"
+    index.remove_channel(guild.text_channels[0])
+    assert [c.name for c in index.get(1)] == ["votazioni-lol-h70"], "Deleted channel should leave the index"
+
+    # Guild joined and removed
+    index.add_guild(MockGuild(2, ["votazioni-a"]))
+    assert len(index.get(2)) == 1, "Joined guild should be indexed"
+    index.remove_guild(2)
+    assert index.get(2) == [], "Removed guild should be forgotten"
+    print("  [OK] Index follows create/update/delete/join/remove")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Match Patterns", test_matcher_patterns),
+        ("Index Maintenance", test_index_build_and_events),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,112 @@
+"""
+Tests for the per-channel/per-guild circuit breakers (circuit_breaker.py)
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import bot
+from circuit_breaker import CHANNEL, CLOSED, GUILD, OPEN, CircuitBreakers
+from fake_discord import fake_channels, state_paths
+from outbox import DEAD
+
+DAY = 86400
+
+
+def test_breaker_opens_and_probes():
+    """Test opening after repeated failures and the growing probe schedule"""
+    print("Testing open/probe cycle...")
+    with tempfile.TemporaryDirectory() as tmp:
+        breakers = CircuitBreakers(os.path.join(tmp, 'state.db'), threshold=3, probe_interval=3 * DAY)
+        now = 1_000_000.0
+        for night in range(2):
+            assert breakers.record_failure(CHANNEL, 10, 1, now=now + night * DAY).state == CLOSED
+        assert breakers.allow(CHANNEL, 10, now=now + 2 * DAY), "Still closed before the threshold"
+
+        opened = breakers.record_failure(CHANNEL, 10, 1, now=now + 2 * DAY)
+        assert opened.state == OPEN, "Third failure should open the breaker"
+        assert not breakers.allow(CHANNEL, 10, now=now + 3 * DAY), "Open breaker should block"
+        assert breakers.allow(CHANNEL, 10, now=now + 5 * DAY), "Probe should be allowed after 3 days"
+
+        # Failed probe: next probe twice as far away
+        reopened = breakers.record_failure(CHANNEL, 10, 1, now=now + 5 * DAY)
+        assert reopened.next_probe_at == now + 11 * DAY, "Probe interval should double"
+
+        # Successful probe closes it
+        breakers.record_success(CHANNEL, 10)
+        assert breakers.allow(CHANNEL, 10, now=now + 5 * DAY), "Success should close the breaker"
+        breakers.close()
+    print("  [OK] Opens at threshold, probes with growing interval, closes on success")
+    return True
+
+
+def test_breaker_persists_and_resets_by_guild():
+    """Test persistence and closing on permission changes"""
+    print("Testing persistence and guild reset...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        breakers = CircuitBreakers(path, threshold=1)
+        breakers.record_failure(CHANNEL, 10, 1)
+        breakers.record_failure(CHANNEL, 20, 2)
+        breakers.record_failure(GUILD, 1, 1)
+        breakers.close()
+
+        breakers = CircuitBreakers(path, threshold=1)
+        assert breakers.is_open(CHANNEL, 10) and breakers.is_open(GUILD, 1), "State should survive a restart"
+        breakers.reset_guild(1)
+        assert not breakers.is_open(CHANNEL, 10), "Guild reset should close its channels"
+        assert not breakers.is_open(GUILD, 1), "Guild reset should close the guild breaker"
+        assert breakers.is_open(CHANNEL, 20), "Other guilds should stay open"
+        breakers.reset(CHANNEL, 20)
+        assert breakers.open_count() == 0, "Channel reset should close it"
+        breakers.close()
+    print("  [OK] Persisted, reset by permission events")
+    return True
+
+
+def test_rejected_body_keeps_channel_closed():
+    """Test that 400s (a bad poll body) are parked without opening the channel's breaker"""
+    print("Testing 400 vs 403 failures...")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = bot.DailyPollBot(**state_paths(tmp))
+        try:
+            bad_body, forbidden = fake_channels(None, 2, first_id=10, per_guild=1)
+            for night in range(1, 4):
+                run_time = bot.TIMEZONE.localize(datetime(2025, 1, night))
+                client.defer_failed_poll(bad_body, run_time, 400, 'Invalid Form Body')
+                client.defer_failed_poll(forbidden, run_time, 403, 'Missing Access')
+            assert not client.breakers.is_open(CHANNEL, 10), "A rejected body says nothing about the channel"
+            assert client.breakers.is_open(CHANNEL, 11), "Three 403s open the breaker"
+            assert client.outbox.count(DEAD) == 6, "Both are parked instead of retried"
+        finally:
+            client.close_stores()
+    print("  [OK] 400 parked with the breaker closed, 403 opens it")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Open/Probe Cycle", test_breaker_opens_and_probes),
+        ("Persistence and Reset", test_breaker_persists_and_resets_by_guild),
+        ("Rejected Body", test_rejected_body_keeps_channel_closed),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,72 @@
+"""
+Tests for the lean/full client profiles (bot.client_options) and the memory benchmark's loader
+"""
+
+import asyncio
+import sys
+import tempfile
+
+import discord
+
+import bot
+from bench_memory import load_guilds
+from fake_discord import state_paths
+
+
+def test_lean_intents():
+    """Test that the lean profile only asks for guilds and guild poll events, without caches"""
+    print("Testing lean profile options...")
+    options = bot.client_options('lean')
+    intents = options['intents']
+    assert intents.guilds and intents.guild_polls, "Channel discovery and poll votes are needed"
+    assert not intents.message_content and not intents.guild_messages and not intents.members, "No message/member events"
+    assert intents.value == (discord.Intents(guilds=True, guild_polls=True)).value, "Nothing else requested"
+    assert options['max_messages'] is None and not options['chunk_guilds_at_startup']
+    assert options['member_cache_flags'].value == 0, "No member cache"
+    assert bot.client_options('full')['intents'].message_content, "Full profile keeps the old intents"
+    try:
+        bot.client_options('tiny')
+        raise AssertionError("Unknown profile must be rejected")
+    except ValueError:
+        pass
+    print(f"  [OK] Lean intents value {intents.value}")
+    return True
+
+
+def test_lean_profile_caches_less():
+    """Test that loading the same guilds caches no messages and fewer members with the lean profile"""
+    print("Testing cached objects per profile...")
+    with tempfile.TemporaryDirectory() as tmp:
+        full = asyncio.run(load_guilds('full', 20, channels=5, messages=10, **state_paths(tmp)))
+        lean = asyncio.run(load_guilds('lean', 20, channels=5, messages=10, **state_paths(tmp)))
+    assert full['cached_messages'] == 200 and lean['cached_messages'] == 0, f"{full} / {lean}"
+    assert lean['cached_members'] < full['cached_members'], f"{full} / {lean}"
+    assert lean['indexed_channels'] == full['indexed_channels'] == 20, "Both find every votazioni channel"
+    print(f"  [OK] full: {full['cached_messages']} messages, {full['cached_members']} members; "
+          f"lean: {lean['cached_messages']} messages, {lean['cached_members']} members")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Lean Intents", test_lean_intents),
+        ("Lean Caches", test_lean_profile_caches_less),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
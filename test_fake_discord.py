@@ -0,0 +1,222 @@
+"""
+Tests that drive DailyPollBot's poll run against the local fake Discord API (fake_discord.py)
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import discord
+
+import bot
+from fake_discord import FakeDiscord, fake_channels, state_paths
+from fanout import RateLimiter
+from ledger import PollLedger
+from outbox import DEAD
+from scheduler import DEFAULT_KEY, Schedule, ScheduleTable
+
+
+async def run_bot(tmp, server, channel_count):
+    """Two poll runs of a DailyPollBot over `channel_count` fake channels; returns the bot's state"""
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    try:
+        await client.http.static_login('fake-token')
+        client.rate_limiter = RateLimiter(global_rate=1000)
+        channels = fake_channels(client._connection, channel_count, first_id=100)
+        run_time = datetime.now(bot.TIMEZONE)
+        jobs = [(channel, bot.DEFAULT_SCHEDULE, run_time) for channel in channels]
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = await client.post_missing_polls(jobs)
+            second = await client.post_missing_polls(jobs)
+        posted = client.ledger.posted_since(0)
+        outbox = client.outbox.count(DEAD)
+        tracked = len(client.tallies)
+    finally:
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+    return first, second, posted, outbox, tracked
+
+
+def test_poll_run_against_fake_discord():
+    """Test a full run: 429 retries, permanent errors, ledger, outbox and tallies"""
+    print("Testing poll run against the fake Discord API...")
+    server = FakeDiscord(latency=0.005, global_rate=1000, forbidden=[110, 120], missing=[130], throttle_every=10)
+    original_base = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            first, second, posted, outbox, tracked = asyncio.run(run_bot(tmp, server, 60))
+        finally:
+            discord.http.Route.BASE = original_base
+    stats, already_posted, circuit_open = first
+    assert stats.created == 57 and stats.failed == 3, f"Should create 57 and fail 3, got {stats.created}/{stats.failed}"
+    assert server.rate_limited >= 5, "Fake API should have answered with 429s"
+    assert len(server.created) == 57, "429 retries must not create duplicate polls"
+    assert len(posted) == 57 and all(message_id for _, _, message_id, *_ in posted), "Ledger stores the message IDs"
+    assert outbox == 3 and tracked == 57, "Permanent failures are parked in the outbox, created polls are tallied"
+    stats, already_posted, circuit_open = second
+    assert already_posted == 57 and stats.created == 0, "Second run posts nothing new"
+    assert len(server.created) == 57, "Second run sends no duplicate"
+    print(f"  [OK] {len(server.created)} polls, {server.rate_limited} 429(s) retried, statuses {server.statuses}")
+    return True
+
+
+async def post_with_defaults(tmp, server, channel_count):
+    """One poll run with the bot's own rate limiter and concurrency"""
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    try:
+        await client.http.static_login('fake-token')
+        channels = fake_channels(client._connection, channel_count, first_id=100)
+        run_time = datetime.now(bot.TIMEZONE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats, _, _ = await client.post_missing_polls([(channel, bot.DEFAULT_SCHEDULE, run_time)
+                                                           for channel in channels])
+        return stats
+    finally:
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+
+
+def test_default_rate_stays_under_global_limit():
+    """Test that the default settings never draw a global 429 from a fake API enforcing Discord's limit"""
+    print("Testing the global limit with the default settings...")
+    server = FakeDiscord(latency=0.005)
+    original_base = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            stats = asyncio.run(post_with_defaults(tmp, server, 80))
+        finally:
+            discord.http.Route.BASE = original_base
+    assert server.rate_limited == 0, f"No request should go over the global limit, got {server.rate_limited} 429(s)"
+    assert stats.created == 80 and len(server.created) == 80, f"Should create 80 polls, got {stats.created}"
+    print(f"  [OK] 80 polls in {stats.elapsed:.2f}s without a 429")
+    return True
+
+
+class ReadyBot(bot.DailyPollBot):
+    """DailyPollBot whose scheduled runs don't wait for a gateway connection; records what runs when the stores close"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._AutoShardedClient__queue = asyncio.PriorityQueue()  # created by connect(), used by close()
+        self.running_at_close = None
+
+    async def wait_until_ready(self):
+        return None
+
+    def close_stores(self):
+        # The bot's own tasks (not the fake server's) still running, by coroutine name
+        here = os.path.dirname(os.path.abspath(bot.__file__))
+        self.running_at_close = sorted(
+            task.get_coro().__qualname__ for task in asyncio.all_tasks()
+            if not task.done() and task is not asyncio.current_task()
+            and os.path.dirname(os.path.abspath(task.get_coro().cr_code.co_filename)) == here)
+        super().close_stores()
+
+
+async def close_during_run(tmp, server, channel_count):
+    """Start a scheduled run, close the bot while it is posting; returns the tasks running when the stores closed and the ledger rows"""
+    discord.http.Route.BASE = await server.start()
+    client = ReadyBot(**state_paths(tmp))
+    try:
+        await client.http.static_login('fake-token')
+        client.rate_limiter = RateLimiter(global_rate=1000)
+        for channel in fake_channels(client._connection, channel_count, first_id=100):
+            client.channel_index.add_channel(channel)
+        soon = client.clock.now(bot.TIMEZONE) + timedelta(seconds=0.1)
+        schedule = Schedule(DEFAULT_KEY, soon.time(), bot.TIMEZONE, 24, tuple(bot.TIME_OPTIONS))
+        client.schedules = ScheduleTable(schedule)
+        client.scheduler.set(schedule)
+        with contextlib.redirect_stdout(io.StringIO()):
+            client._scheduler_task = asyncio.create_task(client.scheduler.run(client.post_poll))
+            while len(server.created) < channel_count // 4:
+                await asyncio.sleep(0.01)
+            await client.close()
+        left = client.running_at_close
+    finally:
+        await server.stop()
+    ledger = PollLedger(os.path.join(tmp, 'state.db'))
+    try:
+        return left, ledger.posted_since(0)
+    finally:
+        ledger.close()
+
+
+def test_close_during_run():
+    """Test that closing the bot mid-run cancels the run before the stores close, keeping what it posted"""
+    print("Testing shutdown during a poll run...")
+    server = FakeDiscord(latency=0.1, global_rate=1000)
+    original_base = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            left, posted = asyncio.run(close_during_run(tmp, server, 100))
+        finally:
+            discord.http.Route.BASE = original_base
+    assert not left, f"close() should stop every worker and run before closing the stores, left {left}"
+    assert 0 < len(posted) < 100, f"Polls created before the shutdown are in the ledger, got {len(posted)}"
+    print(f"  [OK] Run cancelled after {len(posted)} recorded poll(s), before the stores closed")
+    return True
+
+
+async def probe_unreachable(tmp, server):
+    """Probe the poll routes of a fake API that stops listening after the login"""
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    try:
+        await client.http.static_login('fake-token')
+        await server.stop()
+        for channel in fake_channels(client._connection, 1, first_id=100):
+            client.channel_index.add_channel(channel)
+        await client.resolve_poll_endpoint()
+        return client.poll_endpoint
+    finally:
+        await client.http.close()
+        client.close_stores()
+
+
+def test_probe_network_error():
+    """Test that a probe that cannot reach Discord keeps the default route instead of raising"""
+    print("Testing the poll route probe without a connection...")
+    original_base = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            endpoint = asyncio.run(probe_unreachable(tmp, FakeDiscord()))
+        finally:
+            discord.http.Route.BASE = original_base
+    assert endpoint is bot.POLL_ENDPOINTS[0], f"Should keep the default route, got {endpoint}"
+    print(f"  [OK] Kept POST {endpoint.path}")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Poll Run Against Fake Discord", test_poll_run_against_fake_discord),
+        ("Global Limit With Default Settings", test_default_rate_stays_under_global_limit),
+        ("Route Probe Without Connection", test_probe_network_error),
+        ("Shutdown During a Run", test_close_during_run),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,190 @@
+"""
+Tests for the concurrent fan-out engine (fanout.py)
+"""
+
+import asyncio
+import sys
+
+from fanout import GLOBAL_RATE_LIMIT, RateLimiter, fan_out, poll_route_key, shard_rate, stagger_offset
+
+
+def test_fan_out_bounded_concurrency():
+    """Test that no more than `concurrency` workers run at once"""
+    print("Testing bounded concurrency...")
+    in_flight = 0
+    peak = 0
+
+    async def worker(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return item % 10 != 0  # every tenth item fails
+
+    stats = asyncio.run(fan_out(range(100), worker, concurrency=8))
+
+    assert peak == 8, f"Peak concurrency should be 8, got {peak}"
+    assert stats.created == 90 and stats.failed == 10, "Should count 90 successes and 10 failures"
+    assert stats.elapsed > 0 and stats.throughput > 0, "Should report time and throughput"
+    assert stats.p99 >= stats.percentile(50) > 0, "Should report latency percentiles"
+    print(f"  [OK] Peak concurrency {peak}, {stats.throughput:.0f} items/s")
+    return True
+
+
+def test_fan_out_worker_exception_counts_as_failure():
+    """Test that a crashing worker does not abort the run"""
+    print("Testing worker exceptions...")
+
+    async def worker(item):
+        if item == 3:
+            raise RuntimeError("boom")
+        return True
+
+    stats = asyncio.run(fan_out(range(5), worker, concurrency=2))
+    assert stats.created == 4 and stats.failed == 1, "Exception should count as one failure"
+    print("  [OK] Exception counted as failure")
+    return True
+
+
+def test_staggered_slots():
+    """Test that channels get stable, spread-out slots and start no earlier than them"""
+    print("Testing staggered posting window...")
+    offsets = [stagger_offset(channel_id, 300) for channel_id in range(1000000000000000000, 1000000000000002000)]
+    assert offsets == [stagger_offset(channel_id, 300) for channel_id in range(1000000000000000000, 1000000000000002000)], \
+        "Slots should be deterministic"
+    assert all(0 <= offset < 300 for offset in offsets), "Slots should stay inside the window"
+    per_minute = [sum(1 for offset in offsets if minute * 60 <= offset < (minute + 1) * 60) for minute in range(5)]
+    assert min(per_minute) > 300, f"Slots should be spread evenly, got {per_minute} per minute"
+    assert stagger_offset(123, 0) == 0.0, "No window means no delay"
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        started = {}
+
+        async def worker(item):
+            started[item] = loop.time() - start
+            return True
+
+        slots = {item: stagger_offset(item, 0.2) for item in range(20)}
+        stats = await fan_out(range(20), worker, concurrency=4, start_at=lambda item: start + slots[item])
+        return slots, started, stats
+
+    slots, started, stats = asyncio.run(run())
+    assert all(started[item] >= slots[item] - 0.001 for item in slots), "No item should start before its slot"
+    assert stats.created == 20 and len(stats.latencies) == 20, "Every item should report a latency"
+    assert 0 <= stats.p99 < 0.1, f"Posts should follow their slots closely, p99 {stats.p99:.3f}s"
+    print(f"  [OK] {per_minute} slots per minute, p99 {stats.p99 * 1000:.1f}ms")
+    return True
+
+
+def test_rate_limiter_follows_bucket_headers():
+    """Test that an exhausted route bucket delays the next request until reset"""
+    print("Testing route bucket headers...")
+
+    async def run():
+        limiter = RateLimiter(global_rate=1000)  # Route buckets only, global pacing is 1ms
+        loop = asyncio.get_running_loop()
+        key = poll_route_key(123)
+        await limiter.acquire(key)
+        limiter.update(key, {
+            'X-RateLimit-Bucket': 'abc',
+            'X-RateLimit-Limit': '5',
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset-After': '0.05',
+        })
+        start = loop.time()
+        await limiter.acquire(key)
+        waited = loop.time() - start
+        # Another channel is a different bucket and must not wait
+        start = loop.time()
+        await limiter.acquire(poll_route_key(456))
+        return waited, loop.time() - start
+
+    waited, other = asyncio.run(run())
+    assert waited >= 0.04, f"Should wait for bucket reset, waited {waited:.3f}s"
+    assert other < 0.02, "Other channels should not wait"
+    print(f"  [OK] Waited {waited:.3f}s for bucket reset")
+    return True
+
+
+def test_rate_limiter_global_429():
+    """Test that a global 429 blocks every route"""
+    print("Testing global 429...")
+
+    async def run():
+        limiter = RateLimiter()
+        loop = asyncio.get_running_loop()
+        retry_after = limiter.on_429(poll_route_key(1), {'Retry-After': '0.05', 'X-RateLimit-Global': 'true'})
+        start = loop.time()
+        await limiter.acquire(poll_route_key(2))
+        return retry_after, loop.time() - start, limiter.hits_429
+
+    retry_after, waited, hits = asyncio.run(run())
+    assert retry_after == 0.05, "Should return Retry-After"
+    assert waited >= 0.04, "Global limit should block other routes"
+    assert hits == 1, "Should count the 429"
+    print(f"  [OK] Global block of {waited:.3f}s")
+    return True
+
+
+def test_rate_limiter_paces_from_the_start():
+    """Test that a fresh limiter spaces requests 1/global_rate apart instead of bursting"""
+    print("Testing global pacing...")
+
+    async def run():
+        limiter = RateLimiter(global_rate=100)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for channel_id in range(21):
+            await limiter.acquire(poll_route_key(channel_id))
+        return loop.time() - start, limiter.occupancy()['global_tokens']
+
+    elapsed, tokens = asyncio.run(run())
+    assert elapsed >= 0.19, f"21 requests at 100/s should take 0.2s, took {elapsed:.3f}s"
+    assert tokens <= 1, "The bucket never holds more than one request"
+    print(f"  [OK] 21 requests in {elapsed:.3f}s")
+    return True
+
+
+def test_shard_rate_split():
+    """Test that shard processes split the per-token global rate limit"""
+    print("Testing global rate split...")
+    from shard_launcher import split_shards
+    rates = [shard_rate(shard_ids, 10) for shard_ids in split_shards(10, 4)]
+    assert abs(sum(rates) - GLOBAL_RATE_LIMIT) < 1e-9, f"Shares add up to the limit: {rates}"
+    assert rates == [15.0, 15.0, 10.0, 10.0], rates
+    assert shard_rate(None, None) == GLOBAL_RATE_LIMIT, "A single process gets the whole limit"
+    print(f"  [OK] {rates} req/s")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Bounded Concurrency", test_fan_out_bounded_concurrency),
+        ("Worker Exceptions", test_fan_out_worker_exception_counts_as_failure),
+        ("Staggered Posting Window", test_staggered_slots),
+        ("Route Bucket Headers", test_rate_limiter_follows_bucket_headers),
+        ("Global 429", test_rate_limiter_global_429),
+        ("Global Pacing", test_rate_limiter_paces_from_the_start),
+        ("Global Rate Split", test_shard_rate_split),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
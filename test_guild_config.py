@@ -0,0 +1,175 @@
+"""
+Tests for the per-guild configuration and its hot reload (guild_config.py)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import time
+from types import SimpleNamespace
+
+import pytz
+
+import bot
+from fake_discord import state_paths
+from guild_config import ConfigWatcher
+from scheduler import DEFAULT_KEY, Schedule, channel_key, guild_key, schedule_from_dict
+
+ROME = pytz.timezone('Europe/Rome')
+DEFAULT = Schedule(DEFAULT_KEY, time(0, 0), ROME, 24, (7, 9, 11))
+
+
+def write_config(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+
+def test_entry_settings():
+    """Test time options and channel patterns in config entries, with defaults and validation"""
+    print("Testing config entries...")
+    guild = schedule_from_dict({'guild_id': 1, 'time_options': [18, 20], 'channel_patterns': 'prefix:vote'}, DEFAULT)
+    assert guild.time_options == (18, 20) and guild.channel_patterns == 'prefix:vote'
+    channel = schedule_from_dict({'channel_id': 2, 'time': '08:00'}, DEFAULT)
+    assert channel.time_options == (7, 9, 11) and channel.channel_patterns is None, "Defaults are inherited"
+    for invalid in ({'guild_id': 1, 'time_options': list(range(11))},
+                    {'guild_id': 1, 'time_options': [7, 7]},
+                    {'guild_id': 1, 'time_options': [25]},
+                    {'channel_id': 2, 'channel_patterns': 'prefix:vote'}):
+        try:
+            schedule_from_dict(invalid, DEFAULT)
+            raise AssertionError(f"Should be rejected: {invalid}")
+        except ValueError:
+            pass
+    print("  [OK] Settings parsed, invalid entries rejected")
+    return True
+
+
+async def watch_changes(path, watcher, steps):
+    """Run watcher.watch while applying each step (a list of entries or raw text); returns the applied tables"""
+    applied = []
+    task = asyncio.create_task(watcher.watch(lambda table, matchers: applied.append((table, matchers))))
+    try:
+        for step in steps:
+            if isinstance(step, str):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(step)
+            else:
+                write_config(path, step)
+            await asyncio.sleep(watcher.interval * 4)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return applied
+
+
+def test_hot_reload():
+    """Test that edits are picked up, invalid files are ignored and the last good config stays"""
+    print("Testing hot reload...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schedules.json')
+        write_config(path, [{'guild_id': 1, 'time': '21:00'}])
+        watcher = ConfigWatcher(path, DEFAULT, interval=0.01)
+        table, _ = watcher.load()
+        assert table.for_channel(1, 10).post_time == time(21, 0)
+        applied = asyncio.run(watch_changes(path, watcher, [
+            [{'guild_id': 1, 'time': '22:00', 'channel_patterns': 'prefix:sondaggi'}],
+            '[{"guild_id": 1, "time": "25:00"}]',  # invalid: kept out
+            [],
+        ]))
+    assert len(applied) == 2, f"Two valid edits, got {len(applied)} reload(s)"
+    first, matchers = applied[0]
+    assert first.for_channel(1, 10).post_time == time(22, 0) and matchers[1].matches('sondaggi-oggi')
+    assert applied[1][0].for_channel(1, 10) is DEFAULT, "Removed entry falls back to the default"
+    print("  [OK] 2 reloads applied, invalid file skipped")
+    return True
+
+
+class ConfiguredBot(bot.DailyPollBot):
+    def __init__(self, guilds, **options):
+        super().__init__(**options)
+        self._fake_guilds = guilds
+
+    @property
+    def guilds(self):
+        return self._fake_guilds
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self._fake_guilds if guild.id == guild_id), None)
+
+    def get_channel(self, channel_id):
+        return next((channel for guild in self._fake_guilds for channel in guild.text_channels
+                     if channel.id == channel_id), None)
+
+
+def fake_guild(guild_id, names):
+    guild = SimpleNamespace(id=guild_id, name=f'guild-{guild_id}', text_channels=[])
+    guild.text_channels = [SimpleNamespace(id=guild_id * 100 + i, name=name, guild=guild)
+                           for i, name in enumerate(names)]
+    return guild
+
+
+async def reload_in_bot(tmp):
+    path = os.path.join(tmp, 'schedules.json')
+    write_config(path, [{'guild_id': 1, 'time': '21:00'}, {'channel_id': 201, 'time': '06:00'}])
+    client = ConfiguredBot([fake_guild(1, ['votazioni', 'sondaggi']), fake_guild(2, ['votazioni', 'votazioni-2'])],
+                           **state_paths(tmp, path))
+    try:
+        client.channel_index.build(client.guilds)
+        for schedule in client.schedules:
+            client.scheduler.set(schedule)
+        client._scheduler_task = True  # armed, as after on_ready
+        before = {key: entry[0] for key, entry in client.scheduler._entries.items()}
+
+        write_config(path, [{'guild_id': 1, 'time': '21:00', 'time_options': [18, 20, 22],
+                             'channel_patterns': 'substring:sondaggi'}])
+        client.apply_config(*client.config.load())
+        after = {key: entry[0] for key, entry in client.scheduler._entries.items()}
+        channel = client.get_channel(101)
+        template = client.poll_template(after[guild_key(1)], client.poll_type_for(client.schedules.for_channel(1, 101)))
+        return before, after, client, channel, template
+    finally:
+        client.close_stores()
+
+
+def test_bot_applies_reload():
+    """Test that the bot re-arms changed schedules, re-indexes guilds and uses the new time options"""
+    print("Testing reload in the bot...")
+    with tempfile.TemporaryDirectory() as tmp:
+        before, after, client, channel, template = asyncio.run(reload_in_bot(tmp))
+    assert channel_key(201) in before and channel_key(201) not in after, "Removed schedule is disarmed"
+    assert after[guild_key(1)] == before[guild_key(1)], "Unchanged post time keeps its timer"
+    assert [c.name for c in client.find_votazioni_channels(client.get_guild(1))] == ['sondaggi'], "Guild re-indexed"
+    assert len(client.find_votazioni_channels(client.get_guild(2))) == 2, "Other guilds keep the default patterns"
+    answers = [answer['poll_media']['text'] for answer in template.payload['answers']]
+    assert answers == ['18', '20', '22'] and client.answers_for(channel.id) == answers, f"Got {answers}"
+    assert client.answers_for(200) == [str(option) for option in bot.TIME_OPTIONS], "Default time options elsewhere"
+    print("  [OK] Schedules re-armed, guild re-indexed, custom time options in the payload")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Config Entries", test_entry_settings),
+        ("Hot Reload", test_hot_reload),
+        ("Reload In The Bot", test_bot_applies_reload),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,139 @@
+"""
+Tests for the poll-close harvester (harvester.py)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import bot
+from fake_discord import state_paths
+from harvester import PollResult, ResultStore, format_summary, harvest
+
+ANSWERS = ['7', '9', '11', '13', '15', '17', '19', '21', '23']
+
+
+class FakeVotersApi:
+    """Voters endpoint with `votes[message_id][answer_id]` users, counting requests in flight"""
+
+    def __init__(self, votes, latency=0.002):
+        self.votes = votes
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def fetch_page(self, channel_id, message_id, answer_id, after, limit):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.requests += 1
+        try:
+            await asyncio.sleep(self.latency)
+            if message_id not in self.votes:
+                raise LookupError('Unknown Message')
+            users = self.votes[message_id].get(answer_id, [])
+            if after is not None:
+                users = [user_id for user_id in users if user_id > after]
+            return [{'id': str(user_id)} for user_id in users[:limit]]
+        finally:
+            self.in_flight -= 1
+
+
+def test_harvest_paginates_concurrently():
+    """Test that every page of every answer is fetched with bounded concurrency"""
+    print("Testing concurrent paginated harvest...")
+    votes = {
+        message_id: {answer_id: list(range(1, 1 + (250 if answer_id == 3 else answer_id))) for answer_id in range(1, 10)}
+        for message_id in range(100, 300)
+    }
+    api = FakeVotersApi(votes)
+    polls = [(message_id * 10, message_id, '2025-01-01') for message_id in votes]
+    results = asyncio.run(harvest(polls, api.fetch_page, len(ANSWERS), concurrency=16))
+
+    assert len(results) == 200 and all(result.error is None for result in results), "Every poll harvested"
+    assert results[0].counts == [1, 2, 250, 4, 5, 6, 7, 8, 9], f"Wrong counts: {results[0].counts}"
+    assert results[0].voter_count == 250, "Voters are counted once across answers"
+    # 8 single-page answers + 3 pages for the answer with 250 voters, per poll
+    assert api.requests == 200 * 11, f"Unexpected request count {api.requests}"
+    assert api.peak == 16, f"Concurrency should be capped at 16, peaked at {api.peak}"
+    print(f"  [OK] {api.requests} requests, peak {api.peak} in flight")
+    return True
+
+
+def test_harvest_isolates_failures():
+    """Test that one unreachable poll doesn't fail the others"""
+    print("Testing failed polls...")
+    api = FakeVotersApi({1: {2: [5, 6]}})
+    results = asyncio.run(harvest([(10, 1, '2025-01-01'), (20, 2, '2025-01-01')], api.fetch_page, len(ANSWERS)))
+    assert results[0].error is None and results[0].counts[1] == 2, "Reachable poll harvested"
+    assert isinstance(results[1].error, LookupError), "Unreachable poll reports its error"
+    print("  [OK] Failure kept to its poll")
+    return True
+
+
+def test_summary_and_store():
+    """Test the summary text and that stored results mark polls as harvested"""
+    print("Testing summary and result store...")
+    result = PollResult(10, 100, '2025-01-01', [[1, 2], [], [2, 3]] + [[]] * 6)
+    text = format_summary(result, ANSWERS, '01/01/2025')
+    assert '**7, 11**' in text and '3 voter(s)' in text, f"Tie should list both winners: {text}"
+    assert 'no votes' in format_summary(PollResult(10, 101, '2025-01-01', [[]] * 9), ANSWERS, '01/01/2025')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, 'state.db'))
+        store.save([result, PollResult(20, 200, '2025-01-01', [], error=LookupError())])
+        assert store.harvested([100, 200, 300]) == {100, 200}, "Both polls are done"
+        assert store.counts(100) == [2, 0, 2, 0, 0, 0, 0, 0, 0], "Final counts stored"
+        assert store.counts(200) is None, "Unreachable poll has no counts"
+        store.close()
+    print("  [OK] Summary and stored results")
+    return True
+
+
+def test_shard_harvests_its_own_polls():
+    """Test that a shard process skips polls it can't place and never files history under guild 0"""
+    print("Testing harvest ownership...")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = bot.DailyPollBot(shard_ids=[0], shard_count=2, **state_paths(tmp))
+        try:
+            guild = SimpleNamespace(id=4 << 22, name='guild')
+            client._warm_channels = {10: SimpleNamespace(id=10, name='votazioni', guild=guild)}
+            owned = [client.owns_poll(10, None), client.owns_poll(20, guild.id), client.owns_poll(30, None)]
+            client.record_history([PollResult(10, 100, '2025-01-01', [[1]] + [[]] * 8),
+                                   PollResult(30, 300, '2025-01-01', [[2]] + [[]] * 8)])
+            rows = client.history.rows
+        finally:
+            client.close_stores()
+    assert owned == [True, True, False], f"Old rows only when the channel is ours: {owned}"
+    assert rows == 1, "Unknown channel not written to the history"
+    print(f"  [OK] {owned}, {rows} history row")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Concurrent Paginated Harvest", test_harvest_paginates_concurrently),
+        ("Failed Polls", test_harvest_isolates_failures),
+        ("Summary and Result Store", test_summary_and_store),
+        ("Harvest Ownership", test_shard_harvests_its_own_polls),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
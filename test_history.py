@@ -0,0 +1,146 @@
+"""
+Tests for the columnar poll history (poll_history.py, history_analytics.py)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from history_analytics import WEEKEND, PollHistory
+from poll_history import HistoryWriter, process_dir
+
+ANSWERS = ['7', '9', '11', '13', '15', '17', '19', '21', '23']
+
+
+def test_append_and_query():
+    """Test that appended rows come back through the memory-mapped columns"""
+    print("Testing append and query...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history')
+        writer = HistoryWriter(path, ANSWERS)
+        # 2025-01-04 is a Saturday, 2025-01-06 a Monday
+        writer.append([
+            ('2025-01-04', 1, 10, 'votazioni-lol-h70', [0, 0, 0, 0, 0, 0, 0, 5, 1], 5),
+            ('2025-01-05', 1, 10, 'votazioni-lol-h70', [0, 0, 0, 0, 0, 0, 0, 3, 4], 6),
+            ('2025-01-06', 1, 10, 'votazioni-lol-h70', [9, 0, 0, 0, 0, 0, 0, 0, 0], 9),
+            ('2025-01-06', 2, 20, 'votazioni', [0] * 9, 0),
+        ])
+        writer.append([('2025-01-11', 1, 10, 'votazioni-lol-h70', [0, 0, 0, 0, 0, 0, 0, 2, 0], 2)])
+
+        history = PollHistory(path)
+        assert history.rows == 5, f"Should have 5 rows, got {history.rows}"
+        weekends = history.select(channel='votazioni-lol-h70', weekdays=WEEKEND)
+        assert int(weekends.sum()) == 3, "Three weekend polls in that channel"
+        assert history.top_answer(weekends) == ('21', 2), f"21 wins most weekends, got {history.top_answer(weekends)}"
+        heatmap = history.heatmap(history.select(channel=10))
+        assert heatmap[0][0] == 9 and heatmap[5][7] == 7, "Heatmap sums votes per weekday and answer"
+        starts, totals = history.trend(period_days=7)
+        assert starts[0] == date(2025, 1, 4) and totals.shape == (2, 9), "Two weekly periods"
+        assert history.ranking()[0][:3] == (10, 'votazioni-lol-h70', 4), "Most active channel first"
+        assert history.totals(history.select(guild_id=2)).sum() == 0, "Guild filter"
+        assert not history.select(start='2025-01-07', end='2025-01-10').any(), "Date range filter"
+    print("  [OK] Weekend winner, heatmap, trend and ranking")
+    return True
+
+
+def test_partial_row_is_repaired():
+    """Test that a crash in the middle of an append loses only the incomplete row"""
+    print("Testing crash repair...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history')
+        writer = HistoryWriter(path, ANSWERS)
+        writer.append([('2025-01-01', 1, 10, 'votazioni', [1] * 9, 1)])
+        # Simulate a crash after writing some columns of a second row
+        with open(os.path.join(path, 'counts.u32'), 'ab') as f:
+            f.write(b'\x01\x00\x00\x00' * 9)
+        assert PollHistory(path).rows == 1, "Readers ignore the partial row"
+        writer = HistoryWriter(path, ANSWERS)
+        writer.append([('2025-01-02', 1, 10, 'votazioni', [2] * 9, 2)])
+        history = PollHistory(path)
+        assert history.rows == 2 and history.counts[1][0] == 2, "Append continues after the last full row"
+    print("  [OK] Partial row dropped")
+    return True
+
+
+def test_year_of_history_in_milliseconds():
+    """Test that a year across 2000 channels is queried in milliseconds"""
+    print("Testing a year of history...")
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history')
+        writer = HistoryWriter(path, ANSWERS)
+        first = date(2025, 1, 1)
+        for day in range(365):
+            poll_date = (first + timedelta(days=day)).isoformat()
+            writer.append([
+                (poll_date, channel // 4, channel, f'votazioni-{channel}',
+                 [rng.randrange(4) for _ in ANSWERS], rng.randrange(10))
+                for channel in range(2000)
+            ])
+
+        start = time.perf_counter()
+        history = PollHistory(path)
+        mask = history.select(channel='votazioni-1234', weekdays=WEEKEND)
+        top = history.top_answer(mask)
+        heatmap = history.heatmap()
+        _, trend = history.trend(period_days=30)
+        ranking = history.ranking(history.select(start='2025-06-01', end='2025-08-31'))
+        elapsed = time.perf_counter() - start
+
+        assert history.rows == 730_000, f"Should have 730k rows, got {history.rows}"
+        assert top is not None and int(mask.sum()) == 104, "52 weekends of one channel"
+        assert heatmap.sum() == history.totals().sum() and trend.sum() == heatmap.sum(), "Totals agree"
+        assert len(ranking) == 10, "Top 10 channels"
+        assert elapsed < 1.0, f"Queries should take milliseconds, took {elapsed:.3f}s"
+    print(f"  [OK] 730k polls: open + 5 queries in {elapsed * 1000:.0f}ms")
+    return True
+
+
+def test_shard_parts_are_read_together():
+    """Test that shard processes write their own parts and the analytics combine them"""
+    print("Testing sharded history...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history')
+        HistoryWriter(path, ANSWERS).append([('2025-01-04', 1, 10, 'votazioni', [1] + [0] * 8, 1)])
+        for shard_ids, channel_id in (([0, 1], 20), ([2, 3], 30)):
+            writer = HistoryWriter(process_dir(path, shard_ids), ANSWERS)
+            writer.append([('2025-01-04', channel_id, channel_id, f'votazioni-{channel_id}', [0, 2] + [0] * 7, 2),
+                           ('2025-01-05', channel_id, channel_id, f'votazioni-{channel_id}', [0, 3] + [0] * 7, 3)])
+        history = PollHistory(path)
+        by_channel = {channel_id: int(history.select(channel=channel_id).sum()) for channel_id in (10, 20, 30)}
+        ranking = [entry[:3] for entry in history.ranking()]
+    assert history.rows == 5 and by_channel == {10: 1, 20: 2, 30: 2}, f"{history.rows} rows, {by_channel}"
+    assert ranking[0] == (20, 'votazioni-20', 2) and ranking[-1] == (10, 'votazioni', 1), ranking
+    assert list(history.totals()[:2]) == [1, 10], "Votes of every part"
+    print(f"  [OK] {history.rows} rows from 3 directories")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Append and Query", test_append_and_query),
+        ("Crash Repair", test_partial_row_is_repaired),
+        ("Year of History", test_year_of_history_in_milliseconds),
+        ("Sharded History", test_shard_parts_are_read_together),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
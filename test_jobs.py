@@ -0,0 +1,215 @@
+"""
+Tests for the admin command jobs (jobs.py, admin_commands.py and the DailyPollBot job methods)
+"""
+
+import asyncio
+import sys
+import tempfile
+from datetime import datetime, time
+
+import discord
+
+import bot
+from admin_commands import describe_tallies, follow_progress
+from fake_discord import FakeDiscord, fake_channels, state_paths
+from fanout import RateLimiter
+from jobs import DONE, FAILED, RUNNING, JobTracker
+from poll_types import PollType
+from scheduler import Schedule, ScheduleTable, channel_key
+
+
+async def tracked_jobs():
+    tracker = JobTracker(keep_finished=2)
+    release = asyncio.Event()
+
+    async def slow(job):
+        await release.wait()
+        job.succeeded = job.total
+
+    async def broken(job):
+        raise RuntimeError('boom')
+
+    first = tracker.start('post', 1, 3, slow)
+    duplicate = tracker.start('post', 1, 3, slow)
+    other_guild = tracker.start('post', 2, 1, slow)
+    failing = tracker.start('close', 1, 1, broken)
+    await tracker.wait(failing)
+    release.set()
+    await tracker.wait(first)
+    await tracker.wait(other_guild)
+    return tracker, first, duplicate, other_guild, failing
+
+
+def test_tracker():
+    """Test one running job per guild and kind, error capture and pruning of old jobs"""
+    print("Testing the job tracker...")
+    tracker, first, duplicate, other_guild, failing = asyncio.run(tracked_jobs())
+    assert duplicate is None, "Same kind of job in the same guild is refused while running"
+    assert other_guild is not None, "Other guilds run their own jobs"
+    assert first.state == DONE and first.done == 3 and first.describe().startswith('✅'), first.describe()
+    assert failing.state == FAILED and failing.error == 'boom' and 'boom' in failing.describe()
+    remaining = [job.id for guild_id in (1, 2) for job in tracker.for_guild(guild_id)]
+    assert sorted(remaining) == [other_guild.id, failing.id], f"Oldest finished job forgotten, kept {remaining}"
+    print(f"  [OK] {first.describe()}")
+    return True
+
+
+def test_commands_registered():
+    """Test that the /poll group has its subcommands and is limited to server managers"""
+    print("Testing the command group...")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = bot.DailyPollBot(**state_paths(tmp))
+        client.close_stores()
+    group = client.tree.get_command('poll')
+    assert group is not None, "/poll registered"
+    assert sorted(command.name for command in group.commands) == ['close', 'post', 'repost', 'status']
+    assert group.default_permissions.manage_guild and group.guild_only
+    with tempfile.TemporaryDirectory() as tmp:
+        owners = []
+        for shard_ids in (None, [0, 1], [2, 3]):
+            client = bot.DailyPollBot(shard_ids=shard_ids, shard_count=4 if shard_ids else None, **state_paths(tmp))
+            owners.append(client.owns_commands())
+            client.close_stores()
+    assert owners == [True, True, False], f"Only the process with shard 0 syncs the commands: {owners}"
+    print("  [OK] /poll post, repost, close, status, synced by one process")
+    return True
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_original_response(self, content):
+        self.edits.append(content)
+
+
+async def progress_edits():
+    tracker = JobTracker()
+
+    async def work(job):
+        for _ in range(job.total):
+            await asyncio.sleep(0.02)
+            job.succeeded += 1
+
+    job = tracker.start('post', 1, 5, work)
+    interaction = FakeInteraction()
+    await follow_progress(interaction, job, interval=0.03)
+    return interaction.edits
+
+
+def test_progress():
+    """Test that the deferred response is edited while the job runs and shows the final result"""
+    print("Testing progress edits...")
+    edits = asyncio.run(progress_edits())
+    assert len(edits) >= 3, f"Progress shown while running: {edits}"
+    assert edits[0].startswith('⏳') and edits[-1].startswith('✅') and '5/5' in edits[-1], edits
+    print(f"  [OK] {len(edits)} edit(s), last: {edits[-1]}")
+    return True
+
+
+async def run_jobs(tmp, server):
+    """Post, repost and close jobs on one guild against the fake API, with a scheduled run in between"""
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    try:
+        await client.http.static_login('fake-token')
+        client.rate_limiter = client.metrics.rate_limiter = RateLimiter(global_rate=1000)
+        channels = fake_channels(client._connection, 120, first_id=1000, per_guild=200)
+        nightly = fake_channels(client._connection, 10, first_id=5000)
+        guild = channels[0].guild
+        client.find_votazioni_channels = lambda g: channels if g is guild else []
+
+        post = client.start_post_job(guild)
+        await asyncio.sleep(0.01)
+        await client.post_missing_polls([(channel, bot.DEFAULT_SCHEDULE, datetime.now(bot.TIMEZONE))
+                                         for channel in nightly])
+        state_after_nightly = post.state
+        await client.jobs.wait(post)
+
+        server.forbidden.clear()
+        repost = client.start_repost_job(guild)
+        await client.jobs.wait(repost)
+        close = client.start_close_job(guild)
+        await client.jobs.wait(close)
+        return post, state_after_nightly, repost, close, dict(client._closed_early)
+    finally:
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+
+
+def test_bot_jobs():
+    """Test that command jobs post in chunks without blocking the scheduled run, then repost and close"""
+    print("Testing post/repost/close jobs...")
+    server = FakeDiscord(latency=0.02, global_rate=1000, forbidden=[1005])
+    original_base, original_chunk = discord.http.Route.BASE, bot.JOB_CHUNK_SIZE
+    bot.JOB_CHUNK_SIZE = 20
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            post, state_after_nightly, repost, close, closed_early = asyncio.run(run_jobs(tmp, server))
+        finally:
+            discord.http.Route.BASE, bot.JOB_CHUNK_SIZE = original_base, original_chunk
+    assert state_after_nightly == RUNNING, "The scheduled run finished between two chunks of the job"
+    assert (post.succeeded, post.failed, post.done) == (119, 1, 120), post.describe()
+    assert repost.total == 1 and repost.succeeded == 1, f"Only the failed channel is reposted: {repost.describe()}"
+    assert close.total == 120 and close.succeeded == 120 and len(server.expired) == 120, close.describe()
+    assert set(closed_early) == {message_id for _, message_id in server.expired}, "Closed polls harvested early"
+    print(f"  [OK] {post.describe()} / {repost.describe()} / {close.describe()}")
+    return True
+
+
+def test_status_shows_live_votes():
+    """Test that /poll status lists the live votes of each channel's newest poll with its poll type's answers"""
+    print("Testing live votes in /poll status...")
+    raid = PollType('raid', [('Yes', None), ('No', None)])
+    with tempfile.TemporaryDirectory() as tmp:
+        client = bot.DailyPollBot(**state_paths(tmp))
+        try:
+            daily, custom, silent = fake_channels(None, 3, first_id=10)
+            client.find_votazioni_channels = lambda guild: [daily, custom, silent]
+            raid_schedule = Schedule(channel_key(custom.id), time(21, 0), bot.TIMEZONE, 24, poll_type=raid)
+            client.schedules = ScheduleTable(bot.DEFAULT_SCHEDULE, [raid_schedule])
+            client.remember_poll(daily, '2025-01-01', {'id': '100'}, bot.DEFAULT_SCHEDULE)
+            client.remember_poll(daily, '2025-01-02', {'id': '101'}, bot.DEFAULT_SCHEDULE)
+            client.remember_poll(custom, '2025-01-02', {'id': '200'}, raid_schedule)
+            for message_id, answer_id in ((100, 1), (101, 2), (101, 2), (200, 1), (200, 2), (200, 2)):
+                client.tallies.add_vote(message_id, answer_id)
+            tallies = client.live_tallies(daily.guild)
+        finally:
+            client.close_stores()
+    assert [(channel.id, poll_date) for channel, poll_date, _ in tallies] == [(10, '2025-01-02'), (11, '2025-01-02')], \
+        "Newest poll of each channel with a tracked poll"
+    assert tallies[0][2] == dict(zip(map(str, bot.TIME_OPTIONS), [0, 2] + [0] * (len(bot.TIME_OPTIONS) - 2)))
+    assert tallies[1][2] == {'Yes': 1, 'No': 2}, f"Labelled with the poll type's answers: {tallies[1][2]}"
+    lines = describe_tallies(tallies, limit=1)
+    assert lines[0].startswith(f"📊 #{daily.name} (2025-01-02): ") and lines[1] == "… and 1 more channel(s)", lines
+    print(f"  [OK] {describe_tallies(tallies)[1]}")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Job Tracker", test_tracker),
+        ("Command Group", test_commands_registered),
+        ("Progress", test_progress),
+        ("Bot Jobs", test_bot_jobs),
+        ("Live Votes In Status", test_status_shows_live_votes),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
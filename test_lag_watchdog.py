@@ -0,0 +1,134 @@
+"""
+Tests for the event-loop lag watchdog (lag_watchdog.py)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from lag_watchdog import LagWatchdog
+
+
+def blocking_step():
+    time.sleep(0.3)  # sync work on the event loop, e.g. a blocking library call
+
+
+async def slow_run(watchdog):
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+        with watchdog.labelled('2025-01-01T00:00:00+01:00'):
+            blocking_step()
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.3)  # awaiting is not blocking: no profile
+    finally:
+        watchdog.stop()
+
+
+def test_stall_is_profiled():
+    """Test that a blocking call produces one profile naming the run and the blocking function"""
+    print("Testing stall profiling...")
+    with tempfile.TemporaryDirectory() as tmp:
+        watchdog = LagWatchdog(tmp, threshold=0.1)
+        asyncio.run(slow_run(watchdog))
+        assert len(watchdog.profiles) == 1, f"Expected 1 profile, got {watchdog.profiles}"
+        path = watchdog.profiles[0]
+        assert os.path.basename(path).startswith('2025-01-01T00_00_00_01_00-'), f"Run ID in the name: {path}"
+        with open(path, encoding='utf-8') as f:
+            profile = json.load(f)
+    assert profile['run_id'] == '2025-01-01T00:00:00+01:00'
+    assert 0.2 <= profile['duration'] < 1.0, f"Stall of about 0.3s, got {profile['duration']}"
+    assert profile['samples'] > 0 and 'slow_run' in profile['task'], f"Task: {profile['task']}"
+    hottest = profile['stacks'][0]['frames']
+    assert any(':blocking_step:' in frame for frame in hottest), f"Blocking function not in {hottest}"
+    print(f"  [OK] {profile['duration']:.2f}s stall, {profile['samples']} samples, top frame {hottest[-1]}")
+    return True
+
+
+async def overlapping_runs(watchdog):
+    """Run A starts, job B starts, A ends while B is still running, then B and an idle task block"""
+    watchdog.start()
+
+    async def run_a():
+        with watchdog.labelled('run-a'):
+            await asyncio.sleep(0.05)
+
+    async def job_b():
+        with watchdog.labelled('job-b'):
+            await asyncio.sleep(0.15)  # A finishes meanwhile
+            await asyncio.gather(child())
+
+    async def child():
+        blocking_step()  # a task created inside B's block
+        await asyncio.sleep(0.2)
+
+    try:
+        await asyncio.gather(run_a(), job_b())
+        blocking_step()
+        await asyncio.sleep(0.2)
+    finally:
+        watchdog.stop()
+
+
+def test_overlapping_labels():
+    """Test that overlapping runs keep their own label and a label does not outlive its block"""
+    print("Testing overlapping labels...")
+    with tempfile.TemporaryDirectory() as tmp:
+        watchdog = LagWatchdog(tmp, threshold=0.1)
+        asyncio.run(overlapping_runs(watchdog))
+        run_ids = []
+        for path in watchdog.profiles:
+            with open(path, encoding='utf-8') as f:
+                run_ids.append(json.load(f)['run_id'])
+    assert run_ids == ['job-b', 'idle'], f"Stalls should be named after their own run, got {run_ids}"
+    print(f"  [OK] {run_ids}")
+    return True
+
+
+def test_disabled_and_pruned():
+    """Test that threshold 0 disables the watchdog and old profiles are pruned"""
+    print("Testing disabled watchdog and pruning...")
+    with tempfile.TemporaryDirectory() as tmp:
+        disabled = LagWatchdog(tmp, threshold=0)
+        asyncio.run(slow_run(disabled))
+        assert disabled.profiles == [] and os.listdir(tmp) == [], "Disabled watchdog writes nothing"
+
+        for i in range(5):
+            with open(os.path.join(tmp, f'old-{i}.json'), 'w') as f:
+                f.write('{}')
+            os.utime(os.path.join(tmp, f'old-{i}.json'), (i, i))
+        watchdog = LagWatchdog(tmp, threshold=0.1, max_profiles=3)
+        asyncio.run(slow_run(watchdog))
+        remaining = sorted(os.listdir(tmp))
+    assert len(remaining) == 3 and 'old-4.json' in remaining and 'old-0.json' not in remaining, remaining
+    print("  [OK] Nothing written when disabled, oldest profiles deleted")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Stall Profiling", test_stall_is_profiled),
+        ("Overlapping Labels", test_overlapping_labels),
+        ("Disabled And Pruned", test_disabled_and_pruned),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
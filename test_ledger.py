@@ -0,0 +1,95 @@
+"""
+Tests for the posted-poll ledger (ledger.py)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from ledger import PollLedger
+
+
+def test_ledger_survives_restart():
+    """Test that recorded polls are still known after reopening the database"""
+    print("Testing ledger persistence...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ledger.db')
+        ledger = PollLedger(path)
+        ledger.record(10, '2025-03-30')
+        assert ledger.is_posted(10, '2025-03-30'), "Recorded poll should be known immediately"
+        ledger.close()
+
+        ledger = PollLedger(path)
+        assert ledger.is_posted(10, '2025-03-30'), "Poll should survive a restart"
+        assert not ledger.is_posted(10, '2025-03-31'), "Other dates should not be posted"
+        assert not ledger.is_posted(11, '2025-03-30'), "Other channels should not be posted"
+        ledger.close()
+    print("  [OK] Ledger survives restart")
+    return True
+
+
+def test_ledger_batches_writes():
+    """Test that 10k records need only a handful of commits and lookups are fast"""
+    print("Testing batched writes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = PollLedger(os.path.join(tmp, 'ledger.db'), flush_interval=3600)
+        for channel_id in range(10_000):
+            ledger.record(channel_id, '2025-01-01')
+        ledger.flush()
+        assert ledger.commits <= 20, f"Should need few commits, needed {ledger.commits}"
+
+        start = time.perf_counter()
+        for channel_id in range(10_000):
+            ledger.is_posted(channel_id, '2025-01-01')
+        per_lookup = (time.perf_counter() - start) / 10_000
+        assert per_lookup < 0.0001, f"Lookup should take microseconds, took {per_lookup * 1e6:.1f}us"
+        ledger.close()
+    print(f"  [OK] {ledger.commits} commits for 10k records, {per_lookup * 1e6:.2f}us per lookup")
+    return True
+
+
+def test_sharded_posted_since():
+    """Test that a shard process only lists the posted polls of its own guilds"""
+    print("Testing sharded ledger...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        everything = PollLedger(path)
+        for guild_id in range(4):  # shards 0, 1, 0, 1
+            everything.record(guild_id, '2025-01-01', 100 + guild_id, guild_id << 22)
+        everything.record(9, '2025-01-01', 109)  # no guild known: handled by shard 0
+        everything.close()
+        shards = [PollLedger(path, shard_ids=[shard_id], shard_count=2) for shard_id in (0, 1)]
+        polls = [sorted(row[0] for row in ledger.posted_since(0)) for ledger in shards]
+        assert polls == [[0, 2, 9], [1, 3]], f"Got {polls}"
+        assert all(ledger.is_posted(3, '2025-01-01') for ledger in shards), "Posted channels are not scoped"
+        for ledger in shards:
+            ledger.close()
+    print(f"  [OK] shard 0: {polls[0]}, shard 1: {polls[1]}")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Ledger Persistence", test_ledger_survives_restart),
+        ("Batched Writes", test_ledger_batches_writes),
+        ("Sharded Ledger", test_sharded_posted_since),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,140 @@
+"""
+Tests for the poll pipeline metrics and the Prometheus endpoint (metrics.py)
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import aiohttp
+import discord
+
+import bot
+from fake_discord import FakeDiscord, fake_channels, state_paths
+from fanout import RateLimiter
+from metrics import Counter, Histogram, MetricsServer, PollMetrics, Registry
+
+
+def test_text_format():
+    """Test the Prometheus text output of counters and histograms"""
+    print("Testing text format...")
+    registry = Registry()
+    responses = registry.register(Counter('requests_total', 'Requests', ['status']))
+    latency = registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+    responses.inc('200', amount=3)
+    responses.inc('429')
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    text = registry.render()
+    expected = [
+        '# TYPE requests_total counter',
+        'requests_total{status="200"} 3',
+        'requests_total{status="429"} 1',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 3.65',
+        'latency_seconds_count 4',
+    ]
+    for line in expected:
+        assert line in text.splitlines(), f"Missing line {line!r} in:\n{text}"
+    print("  [OK] Counters and cumulative histogram buckets rendered")
+    return True
+
+
+def test_span_overhead():
+    """Test that a timing span costs a few microseconds, cheap enough to leave on"""
+    print("Testing span overhead...")
+    metrics = PollMetrics()
+    count = 100_000
+    started = time.perf_counter()
+    for _ in range(count):
+        with metrics.span('find_channels'):
+            pass
+    per_span = (time.perf_counter() - started) / count
+    assert metrics.spans.count('find_channels') == count, "Every span is recorded"
+    assert per_span < 20e-6, f"Span too slow: {per_span * 1e6:.2f}us"
+    print(f"  [OK] {per_span * 1e6:.2f}us per span")
+    return True
+
+
+async def scrape_after_run(tmp, server):
+    """One poll run against the fake API, a blocked event loop, then GET /metrics"""
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    endpoint = MetricsServer(client.metrics, port=0)
+    lag_task = asyncio.create_task(client.metrics.watch_loop_lag(interval=0.05))
+    try:
+        await client.http.static_login('fake-token')
+        client.rate_limiter = client.metrics.rate_limiter = RateLimiter(global_rate=1000)
+        channels = fake_channels(client._connection, 20, first_id=100)
+        run_time = datetime.now(bot.TIMEZONE)
+        await client.post_missing_polls([(channel, bot.DEFAULT_SCHEDULE, run_time) for channel in channels])
+        await asyncio.sleep(0.06)
+        time.sleep(0.2)  # a blocking call on the event loop
+        await asyncio.sleep(0.06)
+        port = await endpoint.start()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{port}/metrics') as response:
+                return response.headers['Content-Type'], await response.text()
+    finally:
+        lag_task.cancel()
+        await asyncio.gather(lag_task, return_exceptions=True)
+        await endpoint.stop()
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+
+
+def test_endpoint_after_poll_run():
+    """Test the /metrics endpoint after a run with a forbidden channel"""
+    print("Testing the metrics endpoint...")
+    server = FakeDiscord(latency=0.002, global_rate=1000, forbidden=[105])
+    original_base = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            content_type, text = asyncio.run(scrape_after_run(tmp, server))
+        finally:
+            discord.http.Route.BASE = original_base
+    lines = text.splitlines()
+    assert content_type.startswith('text/plain; version=0.0.4'), content_type
+    assert 'dailypoll_http_responses_total{status="200"} 19' in lines, text
+    assert 'dailypoll_http_responses_total{status="403"} 1' in lines, text
+    assert 'dailypoll_polls_total{result="created"} 19' in lines, text
+    assert 'dailypoll_span_seconds_count{span="http_request"} 20' in lines, text
+    assert 'dailypoll_post_latency_seconds_count 20' in lines, text
+    assert any(line.startswith('dailypoll_ratelimit_buckets{state="tracked"} ') for line in lines), text
+    lag_count = next(line for line in lines if line.startswith('dailypoll_event_loop_lag_distribution_seconds_bucket{le="0.1"}'))
+    total = next(line for line in lines if line.startswith('dailypoll_event_loop_lag_distribution_seconds_count'))
+    assert int(lag_count.split()[-1]) < int(total.split()[-1]), "The blocked loop shows up as a lag over 0.1s"
+    print(f"  [OK] {len(lines)} metric lines served")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Text Format", test_text_format),
+        ("Span Overhead", test_span_overhead),
+        ("Metrics Endpoint", test_endpoint_after_poll_run),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
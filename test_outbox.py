@@ -0,0 +1,120 @@
+"""
+Tests for the retry outbox (outbox.py)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+from outbox import DEAD, PENDING, RetryOutbox, backoff_delay
+
+
+def test_backoff_delay():
+    """Test jittered exponential backoff and Retry-After"""
+    print("Testing backoff delay...")
+    for attempts in range(1, 6):
+        full = 5.0 * 2 ** (attempts - 1)
+        delay = backoff_delay(attempts)
+        assert full / 2 <= delay <= full, f"Attempt {attempts} delay {delay} out of range"
+    assert backoff_delay(20) <= 900, "Delay should be capped"
+    assert backoff_delay(1, retry_after='30') >= 30, "Retry-After should be respected"
+    print("  [OK] Backoff grows, is capped and respects Retry-After")
+    return True
+
+
+def test_transient_and_permanent_failures():
+    """Test that 5xx/429 are retried and 403/404 are parked"""
+    print("Testing failure classification...")
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = RetryOutbox(os.path.join(tmp, 'state.db'))
+        now = 1_000_000.0
+        expires = now + 3600
+        assert outbox.add_failure(1, '2025-01-01', 503, 'Service Unavailable', expires, now=now).state == PENDING
+        assert outbox.add_failure(2, '2025-01-01', 429, 'Too Many Requests', expires, retry_after='60',
+                                  now=now).next_attempt_at >= now + 60
+        assert outbox.add_failure(3, '2025-01-01', None, 'Connection reset', expires, now=now).state == PENDING
+        assert outbox.add_failure(4, '2025-01-01', 403, 'Missing Permissions', expires, now=now).state == DEAD
+        assert outbox.add_failure(5, '2025-01-01', 404, 'Unknown Channel', expires, now=now).state == DEAD
+
+        assert outbox.due(now=now) == [], "Nothing should be due right away"
+        due = {entry.channel_id for entry in outbox.due(now=now + 120)}
+        assert due == {1, 2, 3}, f"Transient failures should be due later, got {due}"
+
+        outbox.succeeded(1, '2025-01-01')
+        assert outbox.count(PENDING) == 2 and outbox.count(DEAD) == 2, "Success should remove the entry"
+        outbox.close()
+
+        # Persisted across restarts, and dropped once the day is over
+        outbox = RetryOutbox(os.path.join(tmp, 'state.db'))
+        assert outbox.count(PENDING) == 2, "Entries should survive a restart"
+        assert outbox.purge_expired(now=expires) == 4, "Expired entries should be dropped"
+        outbox.close()
+    print("  [OK] Transient retried, permanent parked, expired dropped")
+    return True
+
+
+def test_max_attempts():
+    """Test that an entry is parked after too many attempts"""
+    print("Testing max attempts...")
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = RetryOutbox(os.path.join(tmp, 'state.db'), max_attempts=3)
+        states = [outbox.add_failure(1, '2025-01-01', 500, 'error', 2e9).state for _ in range(3)]
+        assert states == [PENDING, PENDING, DEAD], f"Third failure should park the entry, got {states}"
+        outbox.close()
+    print("  [OK] Parked after 3 attempts")
+    return True
+
+
+def test_shards_retry_their_own_entries():
+    """Test that shard processes sharing the state DB only see the entries of their guilds"""
+    print("Testing sharded outbox...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        conn = sqlite3.connect(path)  # Outbox of an earlier version, without guild_id
+        conn.execute('CREATE TABLE poll_outbox (channel_id INTEGER NOT NULL, poll_date TEXT NOT NULL,'
+                     ' attempts INTEGER NOT NULL, next_attempt_at REAL NOT NULL, expires_at REAL NOT NULL,'
+                     ' last_status INTEGER, last_error TEXT, state TEXT NOT NULL,'
+                     ' PRIMARY KEY (channel_id, poll_date)) WITHOUT ROWID')
+        conn.execute("INSERT INTO poll_outbox VALUES (9, '2025-01-01', 1, 0, 2e9, 503, 'error', 'pending')")
+        conn.commit()
+        conn.close()
+        shards = [RetryOutbox(path, shard_ids=[shard_id], shard_count=2) for shard_id in (0, 1)]
+        for guild_id in range(4):  # shards 0, 1, 0, 1
+            shards[guild_id % 2].add_failure(guild_id, '2025-01-01', 503, 'error', 2e9, now=0, guild_id=guild_id << 22)
+        due = [sorted(entry.channel_id for entry in outbox.due(now=1e9)) for outbox in shards]
+        assert due == [[0, 2, 9], [1, 3]], f"Each shard retries its own guilds, shard 0 the old rows: {due}"
+        assert shards[1].add_failure(1, '2025-01-01', 503, 'error', 2e9).guild_id == 1 << 22, "Guild kept"
+        shards.append(RetryOutbox(path))
+        assert shards[-1].count(PENDING) == 5, "Unsharded sees everything"
+        for outbox in shards:
+            outbox.close()
+    print(f"  [OK] shard 0: {due[0]}, shard 1: {due[1]}")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Backoff Delay", test_backoff_delay),
+        ("Failure Classification", test_transient_and_permanent_failures),
+        ("Max Attempts", test_max_attempts),
+        ("Sharded Outbox", test_shards_retry_their_own_entries),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,168 @@
+"""
+Tests for the poll types and their daily templates (poll_types.py)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+import discord
+
+import bot
+from fake_discord import FakeDiscord, fake_channels, state_paths
+from fanout import RateLimiter
+from poll_template import MESSAGES_ENDPOINT
+from poll_types import DailyTemplates, poll_type_from_dict, time_poll
+from scheduler import DEFAULT_KEY, Schedule, load_schedules
+
+POLL_TYPES = {
+    'raid': {'title': 'Raid night %A %d/%m', 'answers': ['Yes', {'text': 'No', 'emoji': '❌'}],
+             'multiselect': False, 'duration_hours': 12},
+    'mood': {'title': 'How was %d/%m/%Y?', 'answers': [{'text': 'Great', 'emoji': '<:pog:123456789>'}, 'Meh']},
+}
+
+
+def test_compile():
+    """Test the payload of a poll type, and that the time poll matches build_poll_payload"""
+    print("Testing compilation...")
+    raid = poll_type_from_dict('raid', POLL_TYPES['raid'])
+    payload = raid.compile(date(2025, 1, 3))
+    assert payload['question'] == {'text': 'Raid night Friday 03/01'}, payload['question']
+    assert payload['answers'] == [{'poll_media': {'text': 'Yes'}},
+                                  {'poll_media': {'text': 'No', 'emoji': {'name': '❌'}}}], payload['answers']
+    assert payload['duration'] == 12 * 3600 and payload['allow_multiselect'] is False
+    mood = poll_type_from_dict('mood', POLL_TYPES['mood'])
+    assert mood.compile(date(2025, 1, 3))['answers'][0]['poll_media']['emoji'] == {'id': '123456789'}
+
+    daily = time_poll(bot.TIME_OPTIONS, bot.POLL_DURATION_HOURS)
+    assert daily.compile(date(2025, 1, 3)) == bot.build_poll_payload('03/01/2025'), "Same survey as before"
+    assert daily == time_poll(bot.TIME_OPTIONS, 24) and daily != time_poll(bot.TIME_OPTIONS, 12), "Equal by settings"
+    print(f"  [OK] {payload['question']['text']!r} with {len(payload['answers'])} answers")
+    return True
+
+
+def test_discord_limits():
+    """Test that definitions Discord would refuse are rejected when they are loaded"""
+    print("Testing Discord limits...")
+    invalid = [
+        {'answers': []},
+        {'answers': [str(i) for i in range(11)]},
+        {'answers': ['Yes', 'Yes']},
+        {'answers': ['x' * 56]},
+        {'answers': ['Yes'], 'duration_hours': 0},
+        {'answers': ['Yes'], 'duration_hours': 769},
+        {'answers': ['Yes'], 'title': '%A ' * 40},
+        {'answers': ['Yes'], 'title': '   '},
+    ]
+    for entry in invalid:
+        try:
+            poll_type_from_dict('bad', entry)
+        except ValueError:
+            continue
+        raise AssertionError(f"Should be rejected: {entry}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schedules.json')
+        default = Schedule(DEFAULT_KEY, datetime.min.time(), bot.TIMEZONE, 24, (7, 9))
+        for config in ({'poll_types': POLL_TYPES, 'schedules': [{'guild_id': 1, 'poll': 'missing'}]},
+                       {'poll_types': POLL_TYPES, 'schedules': [{'guild_id': 1, 'poll': 'raid', 'duration_hours': 6}]},
+                       [{'guild_id': 1, 'duration_hours': 1000}]):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(config, f)
+            try:
+                load_schedules(path, default)
+            except ValueError:
+                continue
+            raise AssertionError(f"Should be rejected: {config}")
+    print(f"  [OK] {len(invalid)} definitions and 3 schedule files rejected")
+    return True
+
+
+def test_one_build_per_type():
+    """Test that a day's poll type is compiled once whatever the number of channels"""
+    print("Testing daily templates...")
+    templates = DailyTemplates()
+    types = [poll_type_from_dict(name, entry) for name, entry in POLL_TYPES.items()]
+    day = date(2025, 1, 3)
+    bodies = {poll_type.name: {templates.get(poll_type, day, MESSAGES_ENDPOINT).body for _ in range(500)}
+              for poll_type in types}
+    assert templates.builds == 2 and all(len(body) == 1 for body in bodies.values()), "One build per type"
+    templates.get(types[0], date(2025, 1, 4), MESSAGES_ENDPOINT)
+    assert templates.builds == 3, "Next day is a new build"
+    print(f"  [OK] 1000 channels, {templates.builds} builds")
+    return True
+
+
+async def post_poll_types(tmp, server):
+    """Three servers with three poll types, 20 channels each, posted in one run"""
+    path = os.path.join(tmp, 'schedules.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'poll_types': POLL_TYPES,
+                   'schedules': [{'guild_id': 1000, 'poll': 'raid'}, {'guild_id': 1001, 'poll': 'mood'}]}, f)
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp, path))
+    try:
+        await client.http.static_login('fake-token')
+        client.rate_limiter = client.metrics.rate_limiter = RateLimiter(global_rate=1000)
+        channels = fake_channels(client._connection, 60, first_id=1000, per_guild=20)
+        now = datetime.now(bot.TIMEZONE)
+        await client.post_missing_polls([(channel, client.schedules.for_channel(channel.guild.id, channel.id), now)
+                                         for channel in channels])
+        answers = {guild_id: client.poll_type_for(client.schedules.for_channel(guild_id, 0)).answer_texts
+                   for guild_id in (1000, 1001, 1002)}
+        return client._poll_templates.builds, answers
+    finally:
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+
+
+def test_bot_posts_poll_types():
+    """Test that each server gets its poll type and each type is built once for the run"""
+    print("Testing poll types in the bot...")
+    server = FakeDiscord(latency=0.002, global_rate=1000)
+    original = discord.http.Route.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            builds, answers = asyncio.run(post_poll_types(tmp, server))
+        finally:
+            discord.http.Route.BASE = original
+    questions = {}
+    for channel_id, body in server.created:
+        poll = body.get('poll', body)
+        questions.setdefault(1000 + (channel_id - 1000) // 20, set()).add(poll['question']['text'])
+    assert len(server.created) == 60 and builds == 3, f"{len(server.created)} posts, {builds} builds"
+    assert all(len(texts) == 1 for texts in questions.values()), questions
+    assert next(iter(questions[1000])).startswith('Raid night') and next(iter(questions[1001])).startswith('How was')
+    assert answers[1000] == ['Yes', 'No'] and answers[1002] == [str(option) for option in bot.TIME_OPTIONS]
+    print(f"  [OK] 60 polls of 3 types, {builds} builds")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Compilation", test_compile),
+        ("Discord Limits", test_discord_limits),
+        ("Daily Templates", test_one_build_per_type),
+        ("Poll Types in the Bot", test_bot_posts_poll_types),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
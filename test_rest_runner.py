@@ -0,0 +1,269 @@
+"""
+Tests for the REST-only poll run (rest_runner.py) against a local aiohttp server
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+import pytz
+from aiohttp import web
+
+import bot
+from channel_index import ChannelMatcher
+from guild_config import ConfigWatcher
+from ledger import PollLedger
+import rest_runner
+from rest_runner import run_rest_only
+from structured_log import setup_logging
+from test_structured_log import reset_logging
+
+GUILDS = [{'id': '1', 'name': 'Server A'}, {'id': '2', 'name': 'Server B'}]
+CHANNELS = {
+    '1': [
+        {'id': '10', 'name': 'votazioni-lol-h60', 'type': 0},
+        {'id': '11', 'name': 'general', 'type': 0},
+        {'id': '12', 'name': 'votazioni-voice', 'type': 2},  # voice channel, ignored
+    ],
+    '2': [
+        {'id': '20', 'name': 'votazioni-lol-h70', 'type': 0},
+        {'id': '21', 'name': 'votazioni-forbidden', 'type': 0},
+    ],
+}
+
+
+async def start_server(posted):
+    """
+    Fake Discord API with only the dedicated poll route: one 429 on the first post,
+    403 on the forbidden channel, 400 on an empty (probe) body
+    """
+    rate_limited = []
+
+    async def guilds(request):
+        return web.json_response(GUILDS)
+
+    async def channels(request):
+        return web.json_response(CHANNELS[request.match_info['guild_id']])
+
+    async def create_poll(request):
+        channel_id = request.match_info['channel_id']
+        if channel_id == '21':
+            return web.json_response({'message': 'Missing Permissions', 'code': 50013}, status=403)
+        body = await request.json()
+        if not body:
+            return web.json_response({'message': 'Invalid Form Body', 'code': 50035}, status=400)
+        if not rate_limited:
+            rate_limited.append(channel_id)
+            return web.json_response({'message': 'You are being rate limited.', 'retry_after': 0.01},
+                                     status=429, headers={'Retry-After': '0.01'})
+        posted.append((channel_id, body))
+        return web.json_response({'id': '999'})
+
+    app = web.Application()
+    app.router.add_get('/api/v10/users/@me/guilds', guilds)
+    app.router.add_get('/api/v10/guilds/{guild_id}/channels', channels)
+    app.router.add_post('/api/v10/channels/{channel_id}/polls', create_poll)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/api/v10'
+
+
+def test_rest_only_run():
+    """Test discovery, posting, 429 retry and permanent errors"""
+    print("Testing REST-only run...")
+    posted = []
+    payload = {'question': {'text': '01/01/2025'}, 'answers': [], 'duration': 86400, 'allow_multiselect': True}
+
+    async def run():
+        runner, api_base = await start_server(posted)
+        try:
+            return await run_rest_only('token', ChannelMatcher.from_string('votazioni'), payload, 4,
+                                       api_base=api_base)
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(run())
+    assert stats.created == 2, f"Should create 2 surveys, created {stats.created}"
+    assert stats.failed == 1, "Forbidden channel should fail"
+    assert sorted(channel_id for channel_id, _ in posted) == ['10', '20'], "Should post to text votazioni channels"
+    assert posted[0][1] == payload, "Should send the payload unchanged"
+    print(f"  [OK] Created {stats.created}, failed {stats.failed}")
+    return True
+
+
+def test_rest_only_run_skips_posted_channels():
+    """Test that a second run on the same day posts nothing again"""
+    print("Testing REST-only run with ledger...")
+    posted = []
+    payload = {'question': {'text': '01/01/2025'}, 'answers': [], 'duration': 86400, 'allow_multiselect': True}
+
+    async def run(path):
+        runner, api_base = await start_server(posted)
+        try:
+            stats = []
+            for _ in range(2):
+                stats.append(await run_rest_only('token', ChannelMatcher.from_string('votazioni'), payload, 4,
+                                                 api_base=api_base, ledger=PollLedger(path),
+                                                 poll_date='2025-01-01'))
+            return stats
+        finally:
+            await runner.cleanup()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = asyncio.run(run(os.path.join(tmp, 'ledger.db')))
+    assert first.created == 2, "First run should create 2 surveys"
+    assert second.created == 0, "Second run should not post again"
+    assert second.failed == 1, "Second run should only retry the failed channel"
+    assert len(posted) == 2, "Each channel should get exactly one survey"
+    print("  [OK] Second run skipped posted channels")
+    return True
+
+
+def test_rest_only_entry_point():
+    """Test the entry point used by `python bot.py --rest-only`, with the ledger and a dry run"""
+    print("Testing REST-only entry point...")
+    posted = []
+    payload = {'question': {'text': '01/01/2025'}, 'answers': [], 'duration': 86400, 'allow_multiselect': True}
+    loop = asyncio.new_event_loop()
+    server = threading.Thread(target=loop.run_forever, daemon=True)
+    server.start()
+    runner, api_base = asyncio.run_coroutine_threadsafe(start_server(posted), loop).result()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ledger.db')
+            matcher = ChannelMatcher.from_string('votazioni')
+            dry = rest_runner.main('token', matcher, payload, 4, dry_run=True, ledger=PollLedger(path),
+                                   poll_date='2025-01-01', api_base=api_base)
+            posted_dry = len(posted)
+            real = rest_runner.main('token', matcher, payload, 4, ledger=PollLedger(path), poll_date='2025-01-01',
+                                    api_base=api_base)
+            ledger = PollLedger(path)
+            recorded = sorted(ledger.posted_channels('2025-01-01'))
+            ledger.close()
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        server.join()
+        loop.close()
+    assert dry.created == 3 and posted_dry == 0, "Dry run lists the channels and posts nothing"
+    assert real.created == 2 and recorded == [10, 20], f"Ledger records the posts: {recorded}"
+    print(f"  [OK] Dry run {dry.created}, real run {real.created}, ledger {recorded}")
+    return True
+
+
+def test_rest_only_run_follows_schedules():
+    """Test that each channel gets the poll of its own schedule, only around its post time"""
+    print("Testing REST-only run with schedules...")
+    posted = []
+    config = {
+        'poll_types': {'raid': {'title': 'Raid %d/%m', 'answers': ['Yes', 'No']}},
+        'schedules': [
+            {'guild_id': 1, 'time': '00:00', 'channel_patterns': 'general'},
+            {'guild_id': 2, 'time': '21:00', 'timezone': 'America/New_York', 'poll': 'raid'},
+        ],
+    }
+
+    async def run(path, schedules_file, runs):
+        schedules, guild_matchers = ConfigWatcher(schedules_file, bot.DEFAULT_SCHEDULE).load()
+        runner, api_base = await start_server(posted)
+        try:
+            stats = []
+            for now in runs:
+                run_stats = await run_rest_only('token', ChannelMatcher.from_string('votazioni'), None, 4,
+                                                api_base=api_base, ledger=PollLedger(path),
+                                                guild_matchers=guild_matchers,
+                                                poll_for=bot.rest_only_polls(schedules, now))
+                stats.append((run_stats, [(channel_id, body['question']['text']) for channel_id, body in posted]))
+                posted.clear()
+            return stats
+        finally:
+            await runner.cleanup()
+
+    rome_midnight = pytz.timezone('Europe/Rome').localize(datetime(2025, 1, 3, 0, 1))
+    new_york_evening = pytz.timezone('America/New_York').localize(datetime(2025, 1, 3, 21, 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        schedules_file = os.path.join(tmp, 'schedules.json')
+        with open(schedules_file, 'w') as f:
+            json.dump(config, f)
+        path = os.path.join(tmp, 'ledger.db')
+        first, second, third = asyncio.run(run(path, schedules_file,
+                                               [rome_midnight, new_york_evening, new_york_evening]))
+        ledger = PollLedger(path)
+        recorded = {day: sorted(ledger.posted_channels(day)) for day in ('2025-01-03', '2025-01-04')}
+        ledger.close()
+    assert first[1] == [('11', '03/01/2025')], f"Only server A's general is due: {first[1]}"
+    assert sorted(second[1]) == [('11', '04/01/2025'), ('20', 'Raid 03/01')], \
+        f"Server B posts its own poll on its own clock: {second[1]}"
+    assert second[0].failed == 1, "The forbidden channel of server B fails"
+    assert third[0].created == 0 and not third[1], "A rerun posts nothing again"
+    assert recorded == {'2025-01-03': [11, 20], '2025-01-04': [11]}, f"Ledger keys are local dates: {recorded}"
+    print(f"  [OK] {first[1]}, {second[1]}")
+    return True
+
+
+def test_rest_only_run_logs_json():
+    """Test that the run logs through the bot's loggers: JSON fields, sampled successes"""
+    print("Testing REST-only logging...")
+    posted = []
+    payload = {'question': {'text': '01/01/2025'}, 'answers': [], 'duration': 86400, 'allow_multiselect': True}
+
+    async def run(sample_rate):
+        runner, api_base = await start_server(posted)
+        stream = io.StringIO()
+        listener = setup_logging(log_format='json', sample_rate=sample_rate, stream=stream)
+        try:
+            await run_rest_only('token', ChannelMatcher.from_string('votazioni'), payload, 4, api_base=api_base)
+        finally:
+            reset_logging(listener)
+            await runner.cleanup()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    entries = asyncio.run(run(1.0))
+    events = {entry.get('event'): entry for entry in entries}
+    created = [entry for entry in entries if entry.get('event') == 'poll_created']
+    assert sorted(entry['channel_id'] for entry in created) == [10, 20], f"One line per post: {created}"
+    assert created[0]['logger'] == 'dailypoll.channel' and 'latency_ms' in created[0], created[0]
+    assert events['poll_failed']['status'] == 403 and events['poll_failed']['guild_id'] == 2, events['poll_failed']
+    assert events['run_summary']['polls_created'] == 2 and events['run_summary']['failed'] == 1, \
+        events['run_summary']
+    sampled = [entry.get('event') for entry in asyncio.run(run(0.0))]
+    assert 'poll_created' not in sampled and 'poll_failed' in sampled and 'run_summary' in sampled, \
+        f"Successes are sampled out, errors and the summary kept: {sampled}"
+    print(f"  [OK] {len(entries)} JSON line(s), {len(sampled)} with sampling")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("REST-only Run", test_rest_only_run),
+        ("REST-only Run With Ledger", test_rest_only_run_skips_posted_channels),
+        ("REST-only Entry Point", test_rest_only_entry_point),
+        ("REST-only Run With Schedules", test_rest_only_run_follows_schedules),
+        ("REST-only JSON Logging", test_rest_only_run_logs_json),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,167 @@
+"""
+Tests for the heap-based multi-schedule engine (scheduler.py)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from scheduler import (DEFAULT_KEY, PollScheduler, Schedule, channel_key, guild_key,
+                       load_schedules)
+
+ROME = pytz.timezone('Europe/Rome')
+NEW_YORK = pytz.timezone('America/New_York')
+UTC = pytz.utc
+
+
+def test_next_run_is_dst_correct():
+    """Test local midnight across the Europe/Rome DST changes"""
+    print("Testing DST-correct occurrences...")
+    midnight = Schedule(DEFAULT_KEY, time(0, 0), ROME, 24)
+
+    # Winter: midnight in Rome is 23:00 UTC, summer: 22:00 UTC
+    winter = midnight.next_run(UTC.localize(datetime(2025, 1, 15, 12, 0)))
+    summer = midnight.next_run(UTC.localize(datetime(2025, 7, 15, 12, 0)))
+    assert winter.astimezone(UTC).hour == 23, f"Winter midnight should be 23:00 UTC, got {winter}"
+    assert summer.astimezone(UTC).hour == 22, f"Summer midnight should be 22:00 UTC, got {summer}"
+
+    # Spring forward (30/03/2025 02:00 -> 03:00): 02:30 doesn't exist, posted at 03:30
+    gap = Schedule(guild_key(1), time(2, 30), ROME, 24).next_run(UTC.localize(datetime(2025, 3, 29, 12, 0)))
+    assert (gap.hour, gap.minute) == (3, 30), f"Non-existent time should move after the jump, got {gap}"
+
+    # Fall back (26/10/2025 03:00 -> 02:00): 02:30 happens twice, posted once at the first
+    ambiguous = Schedule(guild_key(1), time(2, 30), ROME, 24)
+    first = ambiguous.next_run(UTC.localize(datetime(2025, 10, 25, 12, 0)))
+    second = ambiguous.next_run(first)
+    assert first.astimezone(UTC).hour == 0, f"Should post at the first 02:30 (00:30 UTC), got {first}"
+    assert second.date() == first.date().replace(day=27), "Next run should be the following day"
+
+    last = midnight.previous_run(UTC.localize(datetime(2025, 7, 15, 12, 0)))
+    assert last == ROME.localize(datetime(2025, 7, 15, 0, 0)), f"Previous run should be today's midnight, got {last}"
+    print("  [OK] Winter/summer offsets, gap and overlap handled")
+    return True
+
+
+def test_heap_orders_and_batches():
+    """Test that due items come out in order and simultaneous ones together"""
+    print("Testing heap ordering...")
+    scheduler = PollScheduler()
+    now = UTC.localize(datetime(2025, 1, 15, 12, 0))
+    default = Schedule(DEFAULT_KEY, time(0, 0), ROME, 24)
+    new_york = Schedule(guild_key(1), time(20, 0), NEW_YORK, 12)
+    also_midnight = Schedule(channel_key(2), time(0, 0), ROME, 6)
+    for schedule in (default, new_york, also_midnight):
+        scheduler.set(schedule, now=now)
+
+    due, first = scheduler.next_due()
+    assert due == ROME.localize(datetime(2025, 1, 16, 0, 0)), "Rome midnight comes first"
+    batch = scheduler.pop_due(due)
+    assert {schedule.key for _, schedule in batch} == {DEFAULT_KEY, channel_key(2)}, "Both midnights fire together"
+    due, next_schedule = scheduler.next_due()
+    assert next_schedule is new_york, "New York comes next"
+
+    # Replaced and removed schedules leave no trace
+    scheduler.remove(guild_key(1))
+    due, next_schedule = scheduler.next_due()
+    assert next_schedule.key in (DEFAULT_KEY, channel_key(2)), "Removed schedule should be skipped"
+    assert len(scheduler) == 2, "Two schedules left"
+    print("  [OK] Ordered, batched, stale entries skipped")
+    return True
+
+
+def test_thousands_of_schedules():
+    """Test that many schedules share one heap"""
+    print("Testing thousands of schedules...")
+    scheduler = PollScheduler()
+    now = UTC.localize(datetime(2025, 1, 15, 12, 0))
+    zones = [ROME, NEW_YORK, pytz.timezone('Asia/Tokyo')]
+    for i in range(5000):
+        scheduler.set(Schedule(channel_key(i), time(i % 24, 0), zones[i % 3], 24), now=now)
+    fired = scheduler.pop_due(now + timedelta(days=1))
+    assert len(fired) == 5000, f"Every schedule fires once a day, fired {len(fired)}"
+    assert [due for due, _ in fired] == sorted(due for due, _ in fired), "Fired in due order"
+    assert len(scheduler) == 5000, "All rescheduled for the next day"
+    print("  [OK] 5000 schedules fired once each")
+    return True
+
+
+def test_run_wakes_for_due_item():
+    """Test that run() calls back when an item is due"""
+    print("Testing run loop...")
+
+    async def run():
+        scheduler = PollScheduler()
+        fired = asyncio.Event()
+        received = []
+
+        async def callback(due_items):
+            received.extend(due_items)
+            fired.set()
+
+        task = asyncio.create_task(scheduler.run(callback))
+        # A schedule due in 0.2 seconds
+        now = datetime.now(UTC)
+        soon = now + timedelta(seconds=0.2)
+        scheduler.set(Schedule(DEFAULT_KEY, soon.astimezone(ROME).time(), ROME, 24), now=now)
+        await asyncio.wait_for(fired.wait(), 2)
+        task.cancel()
+        return received
+
+    received = asyncio.run(run())
+    assert len(received) == 1, "Callback should receive the due item"
+    print("  [OK] Callback fired")
+    return True
+
+
+def test_load_schedules():
+    """Test reading overrides from a JSON file"""
+    print("Testing schedule file...")
+    default = Schedule(DEFAULT_KEY, time(0, 0), ROME, 24)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schedules.json')
+        with open(path, 'w') as f:
+            json.dump([
+                {"guild_id": 1, "time": "21:00", "timezone": "America/New_York", "duration_hours": 12},
+                {"channel_id": 10, "time": "07:30"},
+            ], f)
+        table = load_schedules(path, default)
+    assert table.for_channel(1, 99).tz is NEW_YORK, "Guild override applies to its channels"
+    assert table.for_channel(1, 10).post_time == time(7, 30), "Channel override wins over guild"
+    assert table.for_channel(1, 10).tz is ROME, "Missing fields come from the default"
+    assert table.for_channel(2, 20) is default, "Other guilds use the default"
+    assert load_schedules(os.path.join(tmp, 'missing.json'), default).for_channel(1, 1) is default
+    print("  [OK] Overrides resolved channel > guild > default")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("DST-correct Occurrences", test_next_run_is_dst_correct),
+        ("Heap Ordering", test_heap_orders_and_batches),
+        ("Thousands of Schedules", test_thousands_of_schedules),
+        ("Run Loop", test_run_wakes_for_due_item),
+        ("Schedule File", test_load_schedules),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
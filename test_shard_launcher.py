@@ -0,0 +1,66 @@
+"""
+Tests for the multi-process shard launcher (shard_launcher.py)
+"""
+
+import sys
+
+from shard_launcher import ReportAggregator, split_shards
+
+
+def test_split_shards():
+    """Test that shard ranges cover every shard once and are balanced"""
+    print("Testing shard split...")
+    ranges = split_shards(10, 4)
+    assert ranges == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]], f"Unexpected ranges {ranges}"
+    assert split_shards(2, 8) == [[0], [1]], "Never more processes than shards"
+    assert split_shards(1, 1) == [[0]], "Single shard"
+    ranges = split_shards(100, 7)
+    assert sorted(s for r in ranges for s in r) == list(range(100)), "Every shard exactly once"
+    assert max(map(len, ranges)) - min(map(len, ranges)) <= 1, "Ranges should be balanced"
+    print(f"  [OK] 100 shards over 7 processes: {[len(r) for r in ranges]}")
+    return True
+
+
+def test_report_aggregation():
+    """Test combining the per-process run summaries"""
+    print("Testing report aggregation...")
+    aggregator = ReportAggregator(workers=2)
+
+    def report(date, created, elapsed):
+        return {'run': date + 'T00:00:00+01:00', 'poll_date': date, 'shard_ids': [0], 'created': created, 'failed': 1, 'already_posted': 0,
+                'circuit_open': 2, 'rate_limited': 0, 'elapsed': elapsed, 'p99_latency': elapsed / 2}
+
+    assert aggregator.add(report('2025-01-01', 10, 3.0)) is None, "Wait for every process"
+    combined = aggregator.add(report('2025-01-01', 20, 5.0))
+    assert combined['created'] == 30 and combined['failed'] == 2, "Counts should add up"
+    assert combined['circuit_open'] == 4, "Skipped channels should add up"
+    assert combined['elapsed'] == 5.0, "Wall-clock time is the slowest process"
+    assert combined['p99_latency'] == 2.5, "p99 latency is the worst process"
+    assert aggregator.runs == {}, "Finished runs should be dropped"
+    print(f"  [OK] Combined: {combined['created']} created in {combined['elapsed']}s")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Shard Split", test_split_shards),
+        ("Report Aggregation", test_report_aggregation),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,78 @@
+"""
+Tests for the startup path: phase timings, lazy imports and the setup checks (bench_startup.py, run_local.py)
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+import bot
+from bench_startup import start_bot
+from fake_discord import state_paths
+from run_local import version_tuple
+
+
+def imported_modules(code):
+    """Modules loaded by `code` in a fresh interpreter"""
+    child = subprocess.run([sys.executable, '-c', code + '; import sys; print(" ".join(sys.modules))'],
+                           capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return set(child.stdout.split())
+
+
+def test_lazy_imports():
+    """Test that the setup checks don't load discord.py and the bot doesn't load aiohttp's server"""
+    print("Testing lazy imports...")
+    checks = imported_modules('import run_local, contextlib, io; '
+                              'contextlib.redirect_stdout(io.StringIO()).__enter__(); run_local.check_dependencies()')
+    assert 'discord' not in checks and 'pytz' not in checks, "Versions come from the package metadata"
+    assert 'aiohttp.web' not in imported_modules('import bot'), "The metrics server is imported when it starts"
+    assert version_tuple('2.10.1') > version_tuple('2.3.0'), "Versions compare as numbers, not strings"
+    assert version_tuple('2.4.0a1') == (2, 4, 0) and version_tuple('2023.3.post1') == (2023, 3)
+    print("  [OK] discord.py loaded once, aiohttp.web only with METRICS_PORT")
+    return True
+
+
+def test_startup_phases():
+    """Test that the scheduler is armed before the report, and before the guilds arrive on a warm start"""
+    print("Testing startup phases...")
+    original = bot.SYNC_COMMANDS, bot.CATCH_UP_HOURS
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.SYNC_COMMANDS, bot.CATCH_UP_HOURS = False, 0
+        try:
+            cold = asyncio.run(start_bot(30, channels=3, **state_paths(tmp)))
+            warm = asyncio.run(start_bot(30, channels=3, **state_paths(tmp)))
+        finally:
+            bot.SYNC_COMMANDS, bot.CATCH_UP_HOURS = original
+    assert cold['constructed'] <= cold['logged_in'] <= cold['connected'] <= cold['scheduler_armed'] <= cold['reported'], cold
+    assert warm['scheduler_armed'] <= warm['connected'], f"Warm start arms the scheduler before ready: {warm}"
+    assert cold['channels'] == warm['channels'] == 30
+    print(f"  [OK] cold armed at {cold['scheduler_armed']:.3f}s, warm at {warm['scheduler_armed']:.3f}s "
+          f"(connected {warm['connected']:.3f}s)")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Lazy Imports", test_lazy_imports),
+        ("Startup Phases", test_startup_phases),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,149 @@
+"""
+Tests for the non-blocking logging pipeline (structured_log.py)
+"""
+
+import io
+import json
+import logging
+import sys
+import threading
+import time
+
+from structured_log import CHANNEL_LOGGER_NAME, LOGGER_NAME, DroppingQueueHandler, setup_logging
+
+
+class SlowStream(io.StringIO):
+    """A stdout that takes `delay` seconds per write, like a stalled pipe"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def reset_logging(listener):
+    """Stop the writer thread and give the loggers back to the other tests"""
+    listener.stop()
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = True
+    logging.getLogger(CHANNEL_LOGGER_NAME).filters = []
+
+
+def test_json_lines_carry_fields():
+    """Test that JSON records have the message, level and the extra fields"""
+    print("Testing JSON output...")
+    stream = io.StringIO()
+    listener = setup_logging(log_format='json', stream=stream)
+    try:
+        logging.getLogger(CHANNEL_LOGGER_NAME).info("Survey created in #%s", 'votazioni',
+                                                    extra={'channel_id': 10, 'latency_ms': 42.5})
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logging.getLogger(LOGGER_NAME).exception("Unexpected error", extra={'channel_id': 11})
+    finally:
+        reset_logging(listener)
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(entries) == 2, f"Expected 2 lines, got {len(entries)}"
+    assert entries[0]['msg'] == "Survey created in #votazioni", entries[0]
+    assert entries[0]['logger'] == CHANNEL_LOGGER_NAME and entries[0]['level'] == 'INFO'
+    assert entries[0]['channel_id'] == 10 and entries[0]['latency_ms'] == 42.5, "Extra fields kept"
+    assert 'ValueError: boom' in entries[1]['exc'], "Traceback included"
+    print("  [OK] Fields and traceback present")
+    return True
+
+
+def test_sampling_keeps_errors():
+    """Test that a sample rate of 0 drops channel successes but never warnings or errors"""
+    print("Testing sampling...")
+    stream = io.StringIO()
+    listener = setup_logging(log_format='text', sample_rate=0.0, stream=stream)
+    try:
+        channel_log = logging.getLogger(CHANNEL_LOGGER_NAME)
+        for i in range(100):
+            channel_log.info(f"Survey created in #channel-{i}")
+        channel_log.error("Permission denied in #channel-7")
+        logging.getLogger(LOGGER_NAME).info("Daily Survey Summary")
+    finally:
+        reset_logging(listener)
+    lines = stream.getvalue().splitlines()
+    assert lines == ["Permission denied in #channel-7", "Daily Survey Summary"], f"Unexpected lines: {lines}"
+    print("  [OK] Successes sampled out, error and summary kept")
+    return True
+
+
+def test_slow_output_does_not_block():
+    """Test that log calls return immediately while the stream is slow"""
+    print("Testing a slow stream...")
+    stream = SlowStream(0.05)
+    listener = setup_logging(log_format='text', stream=stream)
+    try:
+        log = logging.getLogger(LOGGER_NAME)
+        started = time.perf_counter()
+        for i in range(20):
+            log.info(f"line {i}")
+        elapsed = time.perf_counter() - started
+    finally:
+        reset_logging(listener)  # flushes the queue: 20 writes x 50ms
+    assert elapsed < 0.25, f"Logging blocked for {elapsed:.3f}s"
+    assert len(stream.getvalue().splitlines()) == 20, "Every line written once the writer catches up"
+    print(f"  [OK] 20 lines logged in {elapsed * 1000:.1f}ms (writing takes 1s)")
+    return True
+
+
+def test_full_queue_drops_records():
+    """Test that a full queue drops and counts records instead of waiting"""
+    print("Testing a full queue...")
+    gate = threading.Event()
+
+    class BlockedStream(io.StringIO):
+        def write(self, text):
+            gate.wait()
+            return super().write(text)
+
+    listener = setup_logging(log_format='text', stream=BlockedStream(), queue_size=5)
+    handler = next(h for h in logging.getLogger(LOGGER_NAME).handlers if isinstance(h, DroppingQueueHandler))
+    try:
+        started = time.perf_counter()
+        for i in range(50):
+            logging.getLogger(LOGGER_NAME).info(f"line {i}")
+        elapsed = time.perf_counter() - started
+        assert handler.dropped >= 40, f"Only {handler.dropped} record(s) dropped"
+        assert elapsed < 0.25, f"Logging blocked for {elapsed:.3f}s"
+    finally:
+        gate.set()
+        reset_logging(listener)
+    print(f"  [OK] {handler.dropped} record(s) dropped without blocking")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("JSON Lines", test_json_lines_carry_fields),
+        ("Sampling", test_sampling_keeps_errors),
+        ("Slow Stream", test_slow_output_does_not_block),
+        ("Full Queue", test_full_queue_drops_records),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
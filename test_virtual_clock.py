@@ -0,0 +1,242 @@
+"""
+Year-long scheduling simulation on virtual time (virtual_clock.py)
+"""
+
+import asyncio
+import contextlib
+import io
+import sys
+import tempfile
+import time as wall_time
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytz
+
+import discord
+
+import bot
+from fake_discord import state_paths
+from outbox import BACKOFF_BASE
+from scheduler import Schedule, ScheduleTable, guild_key
+from virtual_clock import VirtualClock, VirtualTimeLoop
+
+ROME = pytz.timezone('Europe/Rome')
+NEW_YORK = pytz.timezone('America/New_York')
+START = datetime(2024, 12, 31, 20, 0, tzinfo=pytz.utc)
+DAYS = 366
+FLAKY_CHANNEL = 101      # first attempt fails with a 500 on the 1st of each month, the outbox retries it
+FORBIDDEN_CHANNEL = 202  # answers 403 all of April, the breaker skips it and re-probes
+
+
+class SimulatedBot(bot.DailyPollBot):
+    """DailyPollBot with fake guilds and a send_poll that records instead of calling Discord"""
+
+    def __init__(self, guilds, posts, failures, clock, tmp):
+        super().__init__(clock=clock, **state_paths(tmp))
+        self._fake_guilds = guilds
+        self.posts = posts
+        self.failures = failures
+        self.channel_index.build(guilds)
+        # Guild 2 posts at 02:30 New York time: skipped hour in March, repeated hour in November
+        self.schedules = ScheduleTable(bot.DEFAULT_SCHEDULE, [Schedule(guild_key(2), time(2, 30), NEW_YORK, 12)])
+
+    @property
+    def guilds(self):
+        return self._fake_guilds
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self._fake_guilds if guild.id == guild_id), None)
+
+    def get_channel(self, channel_id):
+        return next((channel for guild in self._fake_guilds for channel in guild.text_channels
+                     if channel.id == channel_id), None)
+
+    async def wait_until_ready(self):
+        return None
+
+    async def send_poll(self, channel, template):
+        title = template.payload['question']['text']
+        day = datetime.strptime(title, '%d/%m/%Y').date()
+        status = None
+        if channel.id == FLAKY_CHANNEL and day.day == 1 and (channel.id, title) not in self.failures:
+            status = 500
+        elif channel.id == FORBIDDEN_CHANNEL and day.month == 4:
+            status = 403
+        if status is not None:
+            self.failures.append((channel.id, title))
+            error = discord.Forbidden if status == 403 else discord.HTTPException
+            raise error(SimpleNamespace(status=status, reason='Simulated', headers={}), 'Simulated failure')
+        self.posts.append((channel.id, title, self.clock.now()))
+        return {'id': str(len(self.posts))}
+
+    async def fetch_voters_page(self, channel_id, message_id, answer_id, after, limit):
+        return []
+
+
+def fake_guilds(summaries):
+    guilds = []
+    for guild_id in (1, 2):
+        guild = SimpleNamespace(id=guild_id, name=f'guild-{guild_id}', text_channels=[])
+        guild.text_channels = [SimpleNamespace(id=guild_id * 100 + i, name=f'votazioni-{i}', guild=guild,
+                                               send=summary_sender(summaries, guild_id * 100 + i))
+                               for i in range(3)]
+        guilds.append(guild)
+    return guilds
+
+
+def summary_sender(summaries, channel_id):
+    async def send(content):
+        summaries.append(channel_id)
+    return send
+
+
+async def simulate(clock, tmp, posts, failures, summaries):
+    """Run the scheduler, the outbox and the harvest for DAYS days, restarting the bot once right after a midnight run"""
+    bot.POSTING_WINDOW_SECONDS = 300
+    guilds = fake_guilds(summaries)
+    restart_at = ROME.localize(datetime(2025, 7, 1, 0, 10))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stop_at in (restart_at, START + timedelta(days=DAYS)):
+            instance = SimulatedBot(guilds, posts, failures, clock, tmp)
+            for schedule in instance.schedules:
+                instance.scheduler.set(schedule)
+            # A restart 10 minutes after midnight: catch-up must not post the day twice
+            await instance.catch_up()
+            tasks = [asyncio.create_task(instance.scheduler.run(instance.post_poll)),
+                     asyncio.create_task(instance.drain_outbox()),
+                     asyncio.create_task(instance.harvest_polls())]
+            await asyncio.sleep((stop_at - clock.now()).total_seconds())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            instance.close_stores()
+
+
+def expected_dates(tz, post_time):
+    """Local dates whose post time falls inside the simulated period"""
+    dates = []
+    day = START.astimezone(tz).date()
+    end = START + timedelta(days=DAYS)
+    while True:
+        occurrence = Schedule(None, post_time, tz, 24).occurrence(day)
+        if occurrence >= end:
+            return dates
+        if occurrence > START:
+            dates.append(day.strftime('%d/%m/%Y'))
+        day += timedelta(days=1)
+
+
+def test_year_of_polls_on_virtual_time():
+    """
+    Test one poll per channel per day with the right title across a year and its DST changes,
+    with outbox retries, circuit breaker probes and harvests all following the virtual clock
+    """
+    print("Simulating a year of polls...")
+    loop = VirtualTimeLoop()
+    clock = VirtualClock(loop, START)
+    posts, failures, summaries = [], [], []
+    original = bot.POSTING_WINDOW_SECONDS
+    started = wall_time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            loop.run_until_complete(simulate(clock, tmp, posts, failures, summaries))
+    finally:
+        loop.close()
+        bot.POSTING_WINDOW_SECONDS = original
+    elapsed = wall_time.perf_counter() - started
+
+    assert clock.now() >= START + timedelta(days=DAYS), "Virtual time should have covered the year"
+    rome_dates = expected_dates(ROME, time(0, 0))
+    new_york_dates = expected_dates(NEW_YORK, time(2, 30))
+    assert len(rome_dates) == 366 and len(new_york_dates) == 366, "Dates from 01/01/2025 to 01/01/2026"
+    for channel_id in (100, 101, 102, 200, 201):
+        titles = [title for posted_id, title, _ in posts if posted_id == channel_id]
+        expected = rome_dates if channel_id < 200 else new_york_dates
+        assert len(titles) == len(set(titles)), f"Channel {channel_id} got a date twice"
+        assert titles == expected, f"Channel {channel_id} should get every date once, in order"
+
+    for channel_id, title, posted_at in posts:
+        tz, post_time = (ROME, time(0, 0)) if channel_id < 200 else (NEW_YORK, time(2, 30))
+        day = datetime.strptime(title, '%d/%m/%Y').date()
+        due = Schedule(None, post_time, tz, 24).occurrence(day)
+        delay = (posted_at - due).total_seconds()
+        retried = (channel_id, title) in failures
+        assert 0 <= delay < (300 + BACKOFF_BASE if retried else 300), \
+            f"Poll {title} in {channel_id} posted {delay:.0f}s after its time"
+
+    # The outbox retries the 500s minutes later on virtual time, not a year later
+    flaky = [title for channel_id, title in failures if channel_id == FLAKY_CHANNEL]
+    assert flaky == [title for title in rome_dates if title.startswith('01/')], "One 500 a month, each retried"
+    # The breaker opens after 3 nights of 403, re-probes days later and closes once April is over
+    forbidden = [title for channel_id, title in failures if channel_id == FORBIDDEN_CHANNEL]
+    titles = [title for posted_id, title, _ in posts if posted_id == FORBIDDEN_CHANNEL]
+    missed = [title for title in new_york_dates if title not in titles]
+    assert all(title.endswith('/04/2025') for title in forbidden), forbidden
+    assert 3 <= len(forbidden) < 10 and len(missed) > len(forbidden), \
+        f"Open breaker should skip most nights: {len(forbidden)} attempts, {len(missed)} missed"
+    assert titles[-1] == new_york_dates[-1] and missed[0] == '01/04/2025', "Probe closes the breaker"
+    # Every poll is harvested once it closes, except the last ones still open at the end
+    assert len(posts) - 6 <= len(summaries) <= len(posts), f"{len(summaries)} summaries for {len(posts)} polls"
+
+    # DST days: Rome polls at local midnight (23:00 UTC in winter, 22:00 UTC in summer)
+    spring = next(posted_at for channel_id, title, posted_at in posts if channel_id == 100 and title == '31/03/2025')
+    autumn = next(posted_at for channel_id, title, posted_at in posts if channel_id == 100 and title == '27/10/2025')
+    assert spring.astimezone(pytz.utc).hour == 22 and autumn.astimezone(pytz.utc).hour == 23, "Midnight follows DST"
+    new_york_spring = next(posted_at for channel_id, title, posted_at in posts
+                           if channel_id == 200 and title == '09/03/2025')
+    assert new_york_spring.astimezone(NEW_YORK).hour == 3, "Skipped 02:30 posts after the jump"
+    assert elapsed < 30, f"Simulation should take seconds, took {elapsed:.1f}s"
+    print(f"  [OK] {len(posts)} polls, {len(failures)} failures, {len(summaries)} summaries "
+          f"over {DAYS} virtual days in {elapsed:.1f}s")
+    return True
+
+
+def test_virtual_loop_fast_forwards():
+    """Test that long sleeps and timeouts finish at once and move the clock exactly"""
+    print("Testing virtual time...")
+    loop = VirtualTimeLoop()
+    clock = VirtualClock(loop, START)
+
+    async def run():
+        await asyncio.sleep(90 * 86400)
+        try:
+            await asyncio.wait_for(asyncio.Event().wait(), 3600)
+        except asyncio.TimeoutError:
+            pass
+        return clock.now()
+
+    started = wall_time.perf_counter()
+    try:
+        now = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert now == START + timedelta(days=90, hours=1), f"Clock should be 90 days and 1 hour later, got {now}"
+    assert wall_time.perf_counter() - started < 1, "Should not wait in real time"
+    print("  [OK] 90 days passed instantly")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Virtual Time", test_virtual_loop_fast_forwards),
+        ("Year of Polls", test_year_of_polls_on_virtual_time),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
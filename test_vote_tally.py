@@ -0,0 +1,104 @@
+"""
+Tests for the live vote tallies (vote_tally.py)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from vote_tally import VoteTally
+
+ANSWERS = ['7', '9', '11', '13', '15', '17', '19', '21', '23']
+
+
+def test_votes_are_counted():
+    """Test that add/remove events update the right slot of the right poll"""
+    print("Testing vote counting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tally = VoteTally(os.path.join(tmp, 'state.db'), ANSWERS)
+        tally.track(100, 10, '2025-01-01')
+        assert tally.add_vote(100, 1) and tally.add_vote(100, 1) and tally.add_vote(100, 9), "Votes on our poll count"
+        assert tally.remove_vote(100, 1), "Removal on our poll counts"
+        assert not tally.add_vote(999, 1), "Votes on other polls are ignored"
+        assert not tally.add_vote(100, 10), "Unknown answer IDs are ignored"
+        tally.remove_vote(100, 5)  # vote cast while offline
+        counts = tally.tally(100)
+        assert counts['7'] == 1 and counts['23'] == 1, f"Wrong counts: {counts}"
+        assert counts['15'] == 0, "Counters never go negative"
+        assert tally.tally(999) is None, "Untracked poll has no tally"
+        tally.close()
+    print("  [OK] Votes counted per answer")
+    return True
+
+
+def test_snapshot_survives_restart():
+    """Test that counters are saved and reloaded"""
+    print("Testing snapshots...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        tally = VoteTally(path, ANSWERS)
+        tally.track(100, 10, '2025-01-01')
+        tally.track(200, 20, '2025-01-08')
+        tally.add_vote(100, 3)
+        assert tally.snapshot() == 2, "Both new polls are written"
+        assert tally.snapshot() == 0, "Nothing changed since the last snapshot"
+        tally.add_vote(200, 4)
+        tally.close()
+
+        tally = VoteTally(path, ANSWERS)
+        assert tally.tally(100)['11'] == 1, "Snapshotted vote survives a restart"
+        assert tally.tally(200)['13'] == 1, "Vote saved on close survives a restart"
+        assert tally.forget_before('2025-01-05') == 1, "Old poll is dropped"
+        tally.close()
+
+        tally = VoteTally(path, ANSWERS)
+        assert not tally.is_tracked(100) and tally.is_tracked(200), "Dropped poll stays gone"
+        tally.close()
+    print("  [OK] Counters reloaded after restart")
+    return True
+
+
+def test_many_votes_are_fast():
+    """Test that a vote costs microseconds with thousands of tracked polls"""
+    print("Testing vote throughput...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tally = VoteTally(os.path.join(tmp, 'state.db'), ANSWERS)
+        for message_id in range(10_000):
+            tally.track(message_id, message_id, '2025-01-01')
+        start = time.perf_counter()
+        for vote in range(100_000):
+            tally.add_vote(vote % 10_000, vote % 9 + 1)
+        per_vote = (time.perf_counter() - start) / 100_000
+        assert sum(tally.tally(0).values()) == 10, "Each poll got ten votes"
+        assert per_vote < 0.00005, f"Vote should take microseconds, took {per_vote * 1e6:.1f}us"
+        tally.snapshot()
+        tally.close()
+    print(f"  [OK] {per_vote * 1e6:.2f}us per vote")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Vote Counting", test_votes_are_counted),
+        ("Snapshots", test_snapshot_survives_restart),
+        ("Vote Throughput", test_many_votes_are_fast),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
@@ -0,0 +1,138 @@
+"""
+Tests for the warm-start snapshot of the indexed channels (warm_start.py)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import discord
+
+import bot
+from channel_index import ChannelIndex, ChannelMatcher
+from fake_discord import FakeDiscord, state_paths
+from fanout import RateLimiter
+from warm_start import MAX_AGE, CachedChannel, TargetSnapshot
+
+
+def fake_guild(guild_id, names):
+    guild = SimpleNamespace(id=guild_id, name=f'guild-{guild_id}', text_channels=[])
+    guild.text_channels = [SimpleNamespace(id=guild_id * 100 + i, name=name, guild=guild)
+                           for i, name in enumerate(names)]
+    return guild
+
+
+def test_snapshot_round_trip():
+    """Test saving the index, restoring stand-in channels, skipping unchanged saves and old snapshots"""
+    print("Testing snapshot save/restore...")
+    index = ChannelIndex(ChannelMatcher.from_string('substring:votazioni'))
+    index.build([fake_guild(1, ['votazioni', 'chat']), fake_guild(2, ['votazioni-a', 'votazioni-b'])])
+    state = SimpleNamespace(_get_guild=lambda guild_id: None)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        snapshot = TargetSnapshot(path)
+        assert snapshot.restore(state) == {}, "No snapshot yet"
+        assert snapshot.save(index) and not snapshot.save(index), "Unchanged index is not written again"
+        restored = TargetSnapshot(path).restore(state)
+        too_old = TargetSnapshot(path).restore(state, now=time.time() + MAX_AGE + 1)
+        snapshot.close()
+    assert sorted(restored) == [100, 200, 201], f"Got {sorted(restored)}"
+    channel = restored[201]
+    assert isinstance(channel, CachedChannel) and channel.name == 'votazioni-b' and channel.guild.id == 2
+    assert too_old == {}, "Stale snapshot ignored"
+    print(f"  [OK] {len(restored)} channel(s) restored")
+    return True
+
+
+def test_shards_keep_their_rows():
+    """Test that processes of different shards don't overwrite each other's rows"""
+    print("Testing sharded snapshots...")
+    state = SimpleNamespace(_get_guild=lambda guild_id: None)
+    guilds = [fake_guild(guild_id << 22, ['votazioni']) for guild_id in range(4)]  # shards 0, 1, 0, 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        for shard_id in (0, 1):
+            index = ChannelIndex(ChannelMatcher.from_string('votazioni'))
+            index.build([guild for guild in guilds if (guild.id >> 22) % 2 == shard_id])
+            snapshot = TargetSnapshot(path, shard_ids=[shard_id], shard_count=2)
+            snapshot.save(index)
+            snapshot.close()
+        shard_1 = TargetSnapshot(path, shard_ids=[1], shard_count=2).restore(state)
+        everything = TargetSnapshot(path).restore(state)
+    assert sorted(channel.guild.id >> 22 for channel in shard_1.values()) == [1, 3], "Only its own shard"
+    assert len(everything) == 4, "Both shards kept their rows"
+    print(f"  [OK] shard 1: {len(shard_1)} channel(s), all shards: {len(everything)}")
+    return True
+
+
+async def restart_warm(tmp, server):
+    """Save the index of a first bot, then start a second one that posts before any guild arrives"""
+    first = bot.DailyPollBot(**state_paths(tmp))
+    first.channel_index.build([fake_guild(1, ['votazioni', 'votazioni-2']), fake_guild(2, ['votazioni'])])
+    first.targets.save(first.channel_index)
+    first.close_stores()
+
+    discord.http.Route.BASE = await server.start()
+    client = bot.DailyPollBot(**state_paths(tmp))
+    try:
+        await asyncio.wait_for(client.wait_until_targets(), 1)  # no READY needed
+        await client.http.static_login('fake-token')
+        client.rate_limiter = client.metrics.rate_limiter = RateLimiter(global_rate=1000)
+        await client.catch_up()
+        posted = sorted(channel_id for channel_id, _ in server.created)
+        # Guild 1 arrives: 'votazioni-2' was renamed while the bot was down
+        await client.on_guild_available(fake_guild(1, ['votazioni', 'chat']))
+        reconciled = {guild_id: [(channel.id, type(channel).__name__) for channel in client.channel_index.get(guild_id)]
+                      for guild_id in (1, 2)}
+        return posted, reconciled
+    finally:
+        await client.http.close()
+        client.close_stores()
+        await server.stop()
+
+
+def test_bot_posts_before_ready():
+    """Test that a restarted bot catches up on the snapshotted channels and reconciles guilds as they arrive"""
+    print("Testing warm start in the bot...")
+    server = FakeDiscord(latency=0.002, global_rate=1000)
+    original = discord.http.Route.BASE, bot.CATCH_UP_HOURS
+    bot.CATCH_UP_HOURS = 25  # whatever the time, today's run is recent enough
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            posted, reconciled = asyncio.run(restart_warm(tmp, server))
+        finally:
+            discord.http.Route.BASE, bot.CATCH_UP_HOURS = original
+    assert posted == [100, 101, 200], f"Posted from the snapshot before the guild cache: {posted}"
+    assert reconciled[1] == [(100, 'SimpleNamespace')], f"Guild 1 re-indexed from the gateway: {reconciled[1]}"
+    assert reconciled[2] == [(200, 'CachedChannel')], "Guild 2 still served from the snapshot"
+    print(f"  [OK] {len(posted)} survey(s) posted before ready, guild 1 reconciled")
+    return True
+
+
+def run_tests():
+    """Run all tests"""
+    tests = [
+        ("Snapshot Round Trip", test_snapshot_round_trip),
+        ("Sharded Snapshots", test_shards_keep_their_rows),
+        ("Posting Before Ready", test_bot_posts_before_ready),
+    ]
+
+    failed = 0
+    for test_name, test_func in tests:
+        print(f"\n{test_name}")
+        try:
+            test_func()
+            print("  [PASSED]")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAILED]: {str(e)}")
+
+    print(f"\nTest Results: {len(tests) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests())
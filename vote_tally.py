@@ -0,0 +1,134 @@
+"""
+Live vote tallies of the bot's polls
+Raw poll vote add/remove gateway events update one small counter array per poll
+message, so a tally is always available without paging through the voters API.
+The counters are snapshotted to SQLite periodically and reloaded on start.
+"""
+
+import sqlite3
+import time
+from array import array
+
+DEFAULT_SNAPSHOT_INTERVAL = 60.0  # seconds
+RETENTION_DAYS = 7  # counters of older polls are dropped
+
+
+class TrackedPoll:
+    """Counters of one poll message: counts[i] = votes for answer ID i + 1"""
+
+    __slots__ = ('message_id', 'channel_id', 'poll_date', 'counts')
+
+    def __init__(self, message_id, channel_id, poll_date, counts):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.poll_date = poll_date
+        self.counts = counts
+
+
+class VoteTally:
+    """
+    Message ID -> array-backed vote counters, one slot per answer.
+    Only polls registered with track() are counted; votes on other polls are ignored.
+    """
+
+    def __init__(self, path, answers):
+        self.path = path
+        self.answers = answers
+        self._polls = {}   # message_id -> TrackedPoll
+        self._dirty = set()
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS poll_tallies ('
+            ' message_id INTEGER PRIMARY KEY,'
+            ' channel_id INTEGER NOT NULL,'
+            ' poll_date TEXT NOT NULL,'
+            ' counts BLOB NOT NULL,'
+            ' updated_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        self._conn.commit()
+        self._load()
+        self.snapshots = 0
+
+    def _load(self):
+        rows = self._conn.execute('SELECT message_id, channel_id, poll_date, counts FROM poll_tallies')
+        for message_id, channel_id, poll_date, blob in rows:
+            counts = array('I')
+            counts.frombytes(blob)
+            self._polls[message_id] = TrackedPoll(message_id, channel_id, poll_date, counts)
+
+    def __len__(self):
+        return len(self._polls)
+
+    def track(self, message_id, channel_id, poll_date, answer_count=None):
+        """Start counting the votes of a poll the bot just posted (answer_count: len(answers) by default)"""
+        if message_id not in self._polls:
+            counts = array('I', bytes(4 * (answer_count or len(self.answers))))
+            self._polls[message_id] = TrackedPoll(message_id, channel_id, poll_date, counts)
+            self._dirty.add(message_id)
+
+    def is_tracked(self, message_id):
+        return message_id in self._polls
+
+    def add_vote(self, message_id, answer_id):
+        """Count a vote (answer IDs are 1-based, in TIME_OPTIONS order); False if not our poll"""
+        poll = self._polls.get(message_id)
+        if poll is None or not 1 <= answer_id <= len(poll.counts):
+            return False
+        poll.counts[answer_id - 1] += 1
+        self._dirty.add(message_id)
+        return True
+
+    def remove_vote(self, message_id, answer_id):
+        """Uncount a vote; a removal of a vote cast while the bot was offline is ignored"""
+        poll = self._polls.get(message_id)
+        if poll is None or not 1 <= answer_id <= len(poll.counts):
+            return False
+        if poll.counts[answer_id - 1] > 0:
+            poll.counts[answer_id - 1] -= 1
+            self._dirty.add(message_id)
+        return True
+
+    def tally(self, message_id, answers=None):
+        """{answer: votes} of one poll (labelled with `answers`, self.answers by default), None if not tracked"""
+        poll = self._polls.get(message_id)
+        if poll is None:
+            return None
+        return dict(zip(answers or self.answers, poll.counts))
+
+    def polls_of_channel(self, channel_id):
+        """Tracked polls of one channel, newest date first"""
+        polls = [poll for poll in self._polls.values() if poll.channel_id == channel_id]
+        return sorted(polls, key=lambda poll: poll.poll_date, reverse=True)
+
+    def snapshot(self):
+        """Write the counters changed since the last snapshot in one transaction"""
+        if not self._dirty:
+            return 0
+        now = time.time()
+        rows = [
+            (poll.message_id, poll.channel_id, poll.poll_date, poll.counts.tobytes(), now)
+            for poll in (self._polls.get(message_id) for message_id in self._dirty)
+            if poll is not None
+        ]
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO poll_tallies VALUES (?, ?, ?, ?, ?)', rows)
+        self._dirty.clear()
+        self.snapshots += 1
+        return len(rows)
+
+    def forget_before(self, poll_date):
+        """Drop the counters of polls older than `poll_date` (YYYY-MM-DD) from memory and disk"""
+        old = [message_id for message_id, poll in self._polls.items() if poll.poll_date < poll_date]
+        for message_id in old:
+            del self._polls[message_id]
+            self._dirty.discard(message_id)
+        with self._conn:
+            self._conn.execute('DELETE FROM poll_tallies WHERE poll_date < ?', (poll_date,))
+        return len(old)
+
+    def close(self):
+        self.snapshot()
+        self._conn.close()
@@ -0,0 +1,88 @@
+"""
+Warm-start snapshot of the channels that receive the daily poll
+After a restart the guild cache fills one GUILD_CREATE at a time, and on_ready
+only fires once every guild arrived. The channel index is saved to SQLite
+whenever it changed and loaded at startup as stand-in channels, so the
+scheduler, catch-up, retries and harvester start right after login. Each
+guild's stand-ins are replaced by its real channels when the gateway delivers
+the guild, and the whole index is rebuilt from the cache on ready.
+Open polls need no snapshot: the ledger and the vote tallies already load them.
+"""
+
+import sqlite3
+import time
+
+import discord
+
+from ledger import shard_rows
+
+MAX_AGE = 7 * 86400  # seconds; an older snapshot is ignored
+
+
+class CachedChannel(discord.PartialMessageable):
+    """A snapshotted channel: ID, name and guild, enough to post and send summaries without the guild cache"""
+
+    def __init__(self, state, channel_id, guild_id, name):
+        super().__init__(state, channel_id, guild_id, discord.ChannelType.text)
+        self.name = name
+
+    @property
+    def guild(self):
+        return self._state._get_guild(self.guild_id) or discord.Object(self.guild_id)
+
+
+class TargetSnapshot:
+    """
+    (guild_id, channel_id, name) rows of the indexed channels.
+    With shard_ids/shard_count (shard_launcher.py) each process only reads
+    and replaces the rows of its own shards.
+    """
+
+    def __init__(self, path, shard_ids=None, shard_count=None, max_age=MAX_AGE):
+        self.shard_ids = list(shard_ids) if shard_ids is not None and shard_count else None
+        self.shard_count = shard_count
+        self.max_age = max_age
+        self.saved_version = None
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS warm_targets ('
+            ' channel_id INTEGER PRIMARY KEY,'
+            ' guild_id INTEGER NOT NULL,'
+            ' name TEXT NOT NULL,'
+            ' saved_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        self._conn.commit()
+
+    def _own_rows(self):
+        """WHERE clause and parameters selecting this process's shards"""
+        where, params = shard_rows(self.shard_ids, self.shard_count)
+        return f' WHERE {where}', params
+
+    def restore(self, state, now=None):
+        """Channel ID -> CachedChannel of the last snapshot, {} when there is none or it is too old"""
+        now = time.time() if now is None else now
+        where, params = self._own_rows()
+        rows = self._conn.execute(f'SELECT channel_id, guild_id, name, saved_at FROM warm_targets{where}',
+                                  params).fetchall()
+        if not rows or now - max(row[3] for row in rows) > self.max_age:
+            return {}
+        return {channel_id: CachedChannel(state, channel_id, guild_id, name)
+                for channel_id, guild_id, name, _ in rows}
+
+    def save(self, index, now=None):
+        """Replace the snapshot with the index's channels; does nothing if the index didn't change"""
+        if index.version == self.saved_version:
+            return False
+        now = time.time() if now is None else now
+        where, params = self._own_rows()
+        with self._conn:
+            self._conn.execute(f'DELETE FROM warm_targets{where}', params)
+            self._conn.executemany('INSERT OR REPLACE INTO warm_targets VALUES (?, ?, ?, ?)',
+                                   [(channel.id, guild_id, channel.name, now) for guild_id, channel in index.items()])
+        self.saved_version = index.version
+        return True
+
+    def close(self):
+        self._conn.close()